@@ -12,6 +12,7 @@ from app.views.session import session_bp
 from app.views.questions import questions_bp
 from .views.evaluate import eval_bp
 from app.views.statistics import stats_bp
+from app.views.uploads import upload_bp
 
 
 def create_app():
@@ -32,5 +33,6 @@ def create_app():
     app.register_blueprint(questions_bp)
     app.register_blueprint(eval_bp)
     app.register_blueprint(stats_bp)
+    app.register_blueprint(upload_bp)
 
     return app
@@ -3,11 +3,31 @@
 # app/config.py
 
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def _load_xunfei_credentials():
+    """
+    讯飞账号池：
+      XUNFEI_CREDENTIALS 为 JSON 数组，每项形如
+        {"appid": "...", "api_key": "...", "api_secret": "...", "weight": 1, "max_concurrency": 50}
+      未配置时退化为单账号（XUNFEI_APPID / XUNFEI_API_KEY / XUNFEI_API_SECRET）
+    """
+    raw = os.getenv("XUNFEI_CREDENTIALS")
+    if raw:
+        return json.loads(raw)
+    if os.getenv("XUNFEI_APPID"):
+        return [{
+            "appid":      os.getenv("XUNFEI_APPID"),
+            "api_key":    os.getenv("XUNFEI_API_KEY"),
+            "api_secret": os.getenv("XUNFEI_API_SECRET"),
+        }]
+    return []
+
 class BaseConfig:
     # —— 基础 Flask 配置 ——
     SECRET_KEY = os.getenv("SECRET_KEY", "change_this_in_prod")  # 用于会话签名，生产环境务必覆盖
@@ -40,12 +60,117 @@ class BaseConfig:
     OBS_ENDPOINT   = os.getenv("OBS_ENDPOINT")
     OBS_BUCKET     = os.getenv("OBS_BUCKET")
 
+    # —— 用户录音写后上传（本地暂存 + Celery）——
+    AUDIO_SPOOL_DIR            = os.getenv("AUDIO_SPOOL_DIR",
+                                           os.path.join(os.path.expanduser("~"), "spool", "user_audio"))  # 需与 Celery worker 同机或共享卷
+    AUDIO_SPOOL_MAX_BYTES      = int(os.getenv("AUDIO_SPOOL_MAX_BYTES", str(2 * 1024 ** 3)))  # 超出后拒绝新录音（503）
+    AUDIO_SPOOL_RESCAN_AGE     = float(os.getenv("AUDIO_SPOOL_RESCAN_AGE", "300"))      # 滞留超过该秒数的文件重新投递
+    AUDIO_SPOOL_USAGE_REFRESH  = float(os.getenv("AUDIO_SPOOL_USAGE_REFRESH", "30"))    # 容量检查的全量扫描间隔（秒），其间按进程内计数
+    AUDIO_SPOOL_DRAIN_INTERVAL = float(os.getenv("AUDIO_SPOOL_DRAIN_INTERVAL", "60"))   # drain_spool 调度间隔（秒）
+    AUDIO_UPLOAD_QUEUE         = os.getenv("AUDIO_UPLOAD_QUEUE", "celery")             # 可指向专用队列：celery worker -Q audio_upload
+    AUDIO_UPLOAD_CONCURRENCY   = int(os.getenv("AUDIO_UPLOAD_CONCURRENCY", "8"))       # 集群同时上传数上限
+    AUDIO_UPLOAD_LEASE         = float(os.getenv("AUDIO_UPLOAD_LEASE", "120"))         # 上传许可租约秒数
+    AUDIO_UPLOAD_MAX_RETRIES   = int(os.getenv("AUDIO_UPLOAD_MAX_RETRIES", "8"))       # 超过后标记 failed
+    AUDIO_UPLOAD_RETRY_BASE    = float(os.getenv("AUDIO_UPLOAD_RETRY_BASE", "2"))      # 指数退避基数（秒），上限 10 分钟
+    AUDIO_DIRECT_UPLOAD_EXPIRES = int(os.getenv("AUDIO_DIRECT_UPLOAD_EXPIRES", "900"))   # 直传 PUT 签名 URL 有效期（秒）
+    AUDIO_DIRECT_MAX_BYTES      = int(os.getenv("AUDIO_DIRECT_MAX_BYTES", str(20 * 1024 ** 2)))  # 直传录音大小上限
+    AUDIO_DIRECT_AWAITING_TTL   = float(os.getenv("AUDIO_DIRECT_AWAITING_TTL", str(24 * 3600)))  # 超过该秒数仍未完成的直传记录由 drain_spool 收尾
+
+    # —— 可续传分片上传 ——
+    RESUMABLE_UPLOAD_DIR           = os.getenv("RESUMABLE_UPLOAD_DIR",
+                                               os.path.join(os.path.expanduser("~"), "spool", "uploads"))  # 需共享卷或按 upload_id 粘滞路由
+    RESUMABLE_UPLOAD_DIR_MAX_BYTES = int(os.getenv("RESUMABLE_UPLOAD_DIR_MAX_BYTES", str(2 * 1024 ** 3)))  # 超出后拒绝新建上传（503）
+    RESUMABLE_UPLOAD_USAGE_REFRESH = float(os.getenv("RESUMABLE_UPLOAD_USAGE_REFRESH", "30"))  # 目录占用全量扫描校准间隔（秒）
+    RESUMABLE_UPLOAD_MAX_BYTES     = int(os.getenv("RESUMABLE_UPLOAD_MAX_BYTES", str(50 * 1024 ** 2)))  # 单个上传总大小上限
+    RESUMABLE_CHUNK_MAX_BYTES      = int(os.getenv("RESUMABLE_CHUNK_MAX_BYTES", str(1024 ** 2)))        # 单个分片上限，也作为建议分片大小
+    RESUMABLE_UPLOAD_TTL           = int(os.getenv("RESUMABLE_UPLOAD_TTL", str(24 * 3600)))   # 无写入超过该秒数的上传过期
+    RESUMABLE_CHUNK_LEASE          = int(os.getenv("RESUMABLE_CHUNK_LEASE", "300"))           # 分片写入锁租约（秒）
+    RESUMABLE_FINALIZE_LEASE       = float(os.getenv("RESUMABLE_FINALIZE_LEASE", "300"))      # 收尾租约（秒），到期后可重新收尾
+    RESUMABLE_CLEANUP_INTERVAL     = float(os.getenv("RESUMABLE_CLEANUP_INTERVAL", "3600"))   # 过期分片清理间隔（秒）
+
     # —— 科大讯飞评测 ——
     XUNFEI_API_KEY     = os.getenv("XUNFEI_API_KEY")
     XUNFEI_API_SECRET  = os.getenv("XUNFEI_API_SECRET")
     XUNFEI_APPID       = os.getenv("XUNFEI_APPID")
     XUNFEI_HOST        = os.getenv("XUNFEI_HOST")
     XUNFEI_REQUEST_LINE = os.getenv("XUNFEI_REQUEST_LINE")
+    XUNFEI_SCHEME       = os.getenv("XUNFEI_SCHEME", "wss")                # 本地联调 / 压测模拟器时可设为 ws
+    XUNFEI_CREDENTIALS  = _load_xunfei_credentials()                     # 多账号池，见 _load_xunfei_credentials
+    XUNFEI_QUOTA_COOLDOWN   = float(os.getenv("XUNFEI_QUOTA_COOLDOWN", "60"))    # 账号触发流控后暂停使用的秒数
+    XUNFEI_FAILURE_COOLDOWN = float(os.getenv("XUNFEI_FAILURE_COOLDOWN", "15"))  # 连续失败后暂停使用的秒数
+    XUNFEI_MAX_SESSIONS = int(os.getenv("XUNFEI_MAX_SESSIONS", "200"))   # 单进程并发评测会话上限
+    XUNFEI_OPEN_TIMEOUT = float(os.getenv("XUNFEI_OPEN_TIMEOUT", "10"))  # 建连超时（秒）
+    XUNFEI_SESSION_TIMEOUT   = float(os.getenv("XUNFEI_SESSION_TIMEOUT", "15"))  # 上传完成后等待结果的秒数
+    XUNFEI_TOTAL_TIMEOUT     = float(os.getenv("XUNFEI_TOTAL_TIMEOUT", "60"))    # 含重试的总截止秒数
+    XUNFEI_RETRIES           = int(os.getenv("XUNFEI_RETRIES", "2"))             # 失败重试次数
+    XUNFEI_RETRY_BACKOFF     = float(os.getenv("XUNFEI_RETRY_BACKOFF", "0.2"))   # 退避基数（秒，带抖动）
+    XUNFEI_HEDGE             = os.getenv("XUNFEI_HEDGE", "False") == "True"      # 超过 p95 时发起对冲会话
+    XUNFEI_BREAKER_THRESHOLD = int(os.getenv("XUNFEI_BREAKER_THRESHOLD", "5"))   # 连续失败多少次熔断
+    XUNFEI_BREAKER_COOLDOWN  = float(os.getenv("XUNFEI_BREAKER_COOLDOWN", "30")) # 熔断后冷却秒数
+    XUNFEI_PACING_MODE   = os.getenv("XUNFEI_PACING_MODE", "adaptive").lower()  # realtime / burst / adaptive
+    XUNFEI_FRAME_BYTES   = int(os.getenv("XUNFEI_FRAME_BYTES", "1280"))   # 每帧音频字节数
+    XUNFEI_BURST_SPEEDUP = float(os.getenv("XUNFEI_BURST_SPEEDUP", "4"))  # 相对实时的最大上传倍速
+    XUNFEI_ADAPTIVE_STEP = float(os.getenv("XUNFEI_ADAPTIVE_STEP", "0.25"))  # adaptive 模式每次成功后提升的倍速
+    XUNFEI_AUDIO_ENCODING = os.getenv("XUNFEI_AUDIO_ENCODING", "raw").lower()  # raw / speex-wb（需 ffmpeg 带 libspeex）
+    XUNFEI_SPEEX_QUALITY  = int(os.getenv("XUNFEI_SPEEX_QUALITY", "7"))   # speex-wb 质量 0-10
+
+    # —— 集群级讯飞并发控制 ——
+    ISE_GOVERNOR_ENABLED   = os.getenv("ISE_GOVERNOR_ENABLED", "True") == "True"
+    # 全集群同时进行的评测会话上限，默认取账号池各账号 max_concurrency 之和
+    XUNFEI_MAX_CONCURRENCY = int(os.getenv(
+        "XUNFEI_MAX_CONCURRENCY",
+        str(sum(int(c.get("max_concurrency", 50)) for c in XUNFEI_CREDENTIALS) or 50)
+    ))
+    ISE_QUEUE_TIMEOUT      = float(os.getenv("ISE_QUEUE_TIMEOUT", "10"))     # 最长排队秒数
+    ISE_SLOT_LEASE         = float(os.getenv("ISE_SLOT_LEASE", "120"))       # 许可租约秒数（worker 崩溃后自动回收）
+
+    # —— 评测结果缓存（音频哈希 + 题干 + 参数）——
+    ISE_CACHE_ENABLED     = os.getenv("ISE_CACHE_ENABLED", "True") == "True"
+    ISE_CACHE_TTL         = int(os.getenv("ISE_CACHE_TTL", str(7 * 24 * 3600)))  # 秒
+    ISE_CACHE_MAX_ENTRIES = int(os.getenv("ISE_CACHE_MAX_ENTRIES", "50000"))     # 超出后淘汰最旧条目
+
+    # —— Whisper 转写 ——
+    WHISPER_MODEL     = os.getenv("WHISPER_MODEL", "tiny")
+    # 推理服务的模型档位，精度从高到低，"模型:最大预计完成秒数"，最后一档兜底；为空时只用 WHISPER_MODEL
+    # 例如 "small:1.5,base:3,tiny"：预计 1.5 秒内能完成用 small，3 秒内用 base，否则用 tiny
+    WHISPER_MODEL_TIERS = os.getenv("WHISPER_MODEL_TIERS", "")
+    WHISPER_CACHE_DIR = os.getenv("WHISPER_CACHE_DIR",
+                                  os.path.join(os.path.expanduser("~"), ".cache", "whisper"))  # 可指向共享目录
+    WHISPER_PRELOAD   = os.getenv("WHISPER_PRELOAD", "True") == "True"   # run.py 启动时预加载
+    WHISPER_WARMUP    = os.getenv("WHISPER_WARMUP", "True") == "True"    # 预加载后做一次预热推理
+    WHISPER_BACKEND   = os.getenv("WHISPER_BACKEND", "local")            # local：进程内推理；server：独立推理服务（须另行启动 python -m app.utils.whisper_server）
+    WHISPER_SERVER_ADDRESS  = os.getenv("WHISPER_SERVER_ADDRESS", "/tmp/whisper.sock")  # Unix socket 路径或 host:port
+    WHISPER_SERVER_TIMEOUT  = float(os.getenv("WHISPER_SERVER_TIMEOUT", "60"))        # 单次转写最长等待（秒）
+    WHISPER_BATCH_SIZE      = int(os.getenv("WHISPER_BATCH_SIZE", "8"))               # 每批最多合并的请求数
+    WHISPER_BATCH_WINDOW_MS = float(os.getenv("WHISPER_BATCH_WINDOW_MS", "20"))       # 首个请求到达后的凑批窗口
+    WHISPER_WORKERS         = int(os.getenv("WHISPER_WORKERS", "1"))                  # 同时推理的批次数（local 时为并发转写数）
+    WHISPER_THREADS_PER_JOB = int(os.getenv("WHISPER_THREADS_PER_JOB", "0"))          # 每个推理任务的 torch 线程数，0 = 核数 / workers
+    WHISPER_LATENCY_BUDGET  = float(os.getenv("WHISPER_LATENCY_BUDGET", "5"))         # 预计完成时间超过该秒数时返回 429
+
+    # —— 转写结果缓存（样本哈希 + 模型 + 解码参数）——
+    TRANSCRIBE_CACHE_ENABLED       = os.getenv("TRANSCRIBE_CACHE_ENABLED", "True") == "True"
+    TRANSCRIBE_CACHE_TTL           = int(os.getenv("TRANSCRIBE_CACHE_TTL", str(7 * 24 * 3600)))  # 秒
+    TRANSCRIBE_CACHE_MAX_ENTRIES   = int(os.getenv("TRANSCRIBE_CACHE_MAX_ENTRIES", "50000"))     # Redis 条目上限
+    TRANSCRIBE_CACHE_LOCAL_ENTRIES = int(os.getenv("TRANSCRIBE_CACHE_LOCAL_ENTRIES", "1024"))    # 进程内 LRU 条目数，0 关闭
+
+    # —— 静音裁剪（VAD）——
+    VAD_ENABLED    = os.getenv("VAD_ENABLED", "True") == "True"       # 关闭时只统计语音时长不裁剪
+    VAD_FRAME_MS   = int(os.getenv("VAD_FRAME_MS", "30"))             # 分帧长度
+    VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "200"))          # 语音两侧保留的静音
+    VAD_MARGIN_DB  = float(os.getenv("VAD_MARGIN_DB", "12"))          # 高于噪声底多少 dB 视为语音
+    VAD_FLOOR_DB   = float(os.getenv("VAD_FLOOR_DB", "-55"))          # 绝对阈值下限（dBFS）
+
+    # —— 录音质量预检（不合格直接 422，不调用讯飞）——
+    QUALITY_CHECK_ENABLED      = os.getenv("QUALITY_CHECK_ENABLED", "True") == "True"
+    QUALITY_MIN_DURATION       = float(os.getenv("QUALITY_MIN_DURATION", "0.5"))        # 最短录音秒数
+    QUALITY_MIN_SPEECH_SECONDS = float(os.getenv("QUALITY_MIN_SPEECH_SECONDS", "0.3"))  # 最短有效语音秒数
+    QUALITY_MIN_SPEECH_RATIO   = float(os.getenv("QUALITY_MIN_SPEECH_RATIO", "0.05"))    # 语音时长占比下限
+    QUALITY_MIN_RMS_DB         = float(os.getenv("QUALITY_MIN_RMS_DB", "-45"))          # 语音区间 RMS 下限（dBFS）
+    QUALITY_MAX_CLIPPING_RATIO = float(os.getenv("QUALITY_MAX_CLIPPING_RATIO", "0.01")) # 削波样本比例上限
+
+    # —— 异步评测任务 ——
+    ISE_JOB_TTL            = int(os.getenv("ISE_JOB_TTL", "3600"))             # 任务状态保留秒数
+    ISE_JOB_STREAM_TIMEOUT = int(os.getenv("ISE_JOB_STREAM_TIMEOUT", "120"))   # SSE 最长保持秒数
 
     # —— 邮件服务配置 ——
     MAIL_SERVER = os.getenv("MAIL_SERVER")
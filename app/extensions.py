@@ -44,6 +44,20 @@ def init_app_extensions(app):
         result_expires  = app.config["CELERY_RESULT_EXPIRES"],
         timezone        = app.config["CELERY_TIMEZONE"],
         enable_utc      = app.config["CELERY_ENABLE_UTC"],
+        # 定时补投滞留的用户录音：celery -A celery_app beat
+        beat_schedule   = {
+            "drain-audio-spool": {
+                "task":     "audio.drain_spool",
+                "schedule": app.config["AUDIO_SPOOL_DRAIN_INTERVAL"],
+                "options":  {"queue": app.config["AUDIO_UPLOAD_QUEUE"]},
+            },
+            # 清理过期未完成的分片上传（worker 需能访问 RESUMABLE_UPLOAD_DIR）
+            "cleanup-resumable-uploads": {
+                "task":     "uploads.cleanup",
+                "schedule": app.config["RESUMABLE_CLEANUP_INTERVAL"],
+                "options":  {"queue": app.config["AUDIO_UPLOAD_QUEUE"]},
+            },
+        },
     )
 
     # —— Redis 客户端 ——
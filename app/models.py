@@ -161,6 +161,8 @@ class PracticeRecord(db.Model):
     )
     attempted_at     = db.Column(db.DateTime, default=datetime.now, nullable=False)
     user_audio_key   = db.Column(db.String(256), nullable=True)
+    # 录音上传状态：pending 已暂存待上传 / uploaded 已存档（user_audio_key 有值）/ failed 重试耗尽
+    upload_status    = db.Column(db.String(16), nullable=False, default='uploaded', server_default='uploaded')
 
     # —— 新增评分字段 ——
     accuracy_score   = db.Column(db.Float, nullable=False, default=0.0)
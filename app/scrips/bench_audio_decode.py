@@ -0,0 +1,88 @@
+"""
+脚本：bench_audio_decode.py
+功能：
+ 1. 生成指定采样率 / 声道数的 16 位 WAV（正弦 + 噪声）。
+ 2. 对比上传音频 → 16kHz 单声道 PCM 的两条路径：
+    - ffmpeg：两个临时文件 + fork ffmpeg（原 transcode_to_pcm 的做法）
+    - in-process：app/utils/audio.py 内存解码 + 多相重采样
+ 3. 打印单次平均耗时；本机没有 ffmpeg 时只测进程内路径。
+
+依赖：
+  numpy；ffmpeg 可选。需在项目根目录运行
+
+示例：
+  python -m app.scrips.bench_audio_decode
+  python -m app.scrips.bench_audio_decode --rate 44100 --channels 2 --seconds 8 --repeat 20
+"""
+import io
+import os
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from app.utils import audio
+
+
+def build_wav(rate: int, channels: int, seconds: float) -> bytes:
+    t = np.arange(int(rate * seconds)) / rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.02 * np.random.default_rng(0).standard_normal(len(t))
+    frames = np.repeat(tone[:, None], channels, axis=1)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes((frames * 32767).astype('<i2').tobytes())
+    return buf.getvalue()
+
+
+def ffmpeg_transcode(wav_bytes: bytes) -> bytes:
+    fd_src, src_path = tempfile.mkstemp(suffix='.wav')
+    fd_dst, dst_path = tempfile.mkstemp(suffix='.wav')
+    os.close(fd_src); os.close(fd_dst)
+    try:
+        with open(src_path, 'wb') as fp:
+            fp.write(wav_bytes)
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', src_path,
+                        '-ar', '16000', '-ac', '1', dst_path], check=True)
+        with wave.open(dst_path, 'rb') as wf:
+            return wf.readframes(wf.getnframes())
+    finally:
+        os.remove(src_path)
+        os.remove(dst_path)
+
+
+def bench(fn, arg, repeat: int) -> float:
+    """返回单次调用的平均毫秒数"""
+    fn(arg)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传音频转码基准测试")
+    parser.add_argument("--rate",     type=int,   default=44100)
+    parser.add_argument("--channels", type=int,   default=2)
+    parser.add_argument("--seconds",  type=float, default=5.0)
+    parser.add_argument("--repeat",   type=int,   default=20)
+    args = parser.parse_args()
+
+    wav = build_wav(args.rate, args.channels, args.seconds)
+    print(f"WAV {args.rate}Hz x {args.channels}ch, {args.seconds}s, {len(wav) / 1024:.0f} KB")
+
+    t_new = bench(audio.load_pcm16, wav, args.repeat)
+    print(f"in-process : {t_new:8.2f} ms")
+    if shutil.which('ffmpeg'):
+        t_ff = bench(ffmpeg_transcode, wav, args.repeat)
+        print(f"ffmpeg     : {t_ff:8.2f} ms  ({t_ff / t_new:.1f}x slower)")
+    else:
+        print("ffmpeg     : 未安装，跳过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+脚本：bench_ise_client.py
+功能：
+ 1. 在本进程内启动 ise_simulator（或通过 --external 连接已运行的模拟器）。
+ 2. 用 N 个线程并发调用 websocket_thread（与 Flask worker 的调用方式一致），共完成 M 次评测。
+ 3. 统计并打印：
+    - 吞吐量（次/秒）、成功 / 失败数
+    - 单次评测延迟 p50 / p95 / p99 / max
+    - 运行期间进程线程数峰值、RSS 内存峰值
+    - 模拟器侧统计（会话数、流控、协议错误、收到的音频字节）
+ 用于容量规划，以及对 ISE 客户端改动做离线回归。
+
+依赖：
+  pip install websockets
+  需在项目根目录运行（会导入 app 包，需要 .env 中的基础配置）
+
+示例：
+  python -m app.scrips.bench_ise_client --concurrency 100 --sessions 500 --audio-seconds 3
+  python -m app.scrips.bench_ise_client --pacing burst --latency 0.5 --error-rate 0.02
+  python -m app.scrips.bench_ise_client --external 127.0.0.1:8765
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import get_config
+from app.utils import xunfei, ise_pacing
+from app.utils.xunfei import websocket_thread
+from app.utils.xunfei_async import IseUnavailable
+from app.scrips.ise_simulator import IseSimulator, REQUEST_LINE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="讯飞 ISE 客户端压测（本地模拟器）")
+    parser.add_argument("--concurrency",   type=int,   default=50,  help="并发调用线程数")
+    parser.add_argument("--sessions",      type=int,   default=200, help="总评测次数")
+    parser.add_argument("--audio-seconds", type=float, default=3.0, help="每次评测的音频时长")
+    parser.add_argument("--pacing",        default="realtime", choices=("realtime", "burst", "adaptive"))
+    parser.add_argument("--latency",       type=float, default=0.3, help="模拟器返回延迟（秒）")
+    parser.add_argument("--error-rate",    type=float, default=0.0, help="模拟器随机错误率")
+    parser.add_argument("--max-concurrency", type=int, default=0,   help="模拟器并发上限，0 为不限")
+    parser.add_argument("--port",          type=int,   default=18765)
+    parser.add_argument("--external",      default=None, help="使用已运行的模拟器 host:port")
+    return parser.parse_args()
+
+
+def point_client_at(host: str, pacing: str, concurrency: int):
+    """
+    把已导入的 ISE 客户端指向模拟器。
+    以 python -m 运行时 app 包（及其配置、xunfei 模块常量）已先于本脚本导入，
+    设置环境变量已来不及，这里直接改写相应的模块级配置。
+    """
+    xunfei.HOST         = host
+    xunfei.SCHEME       = "ws"
+    xunfei.REQUEST_LINE = REQUEST_LINE
+    get_config().XUNFEI_CREDENTIALS = [{
+        "appid": "bench", "api_key": "bench-key", "api_secret": "bench-secret",
+        "max_concurrency": max(concurrency, 1),
+    }]
+    ise_pacing._pacer = ise_pacing.Pacer(mode=pacing)
+
+
+def rss_mb():
+    """当前进程常驻内存（MB），不支持的平台返回 None"""
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+    except ImportError:
+        return None
+
+
+class Sampler(threading.Thread):
+    """每 50ms 采样一次线程数与 RSS，记录峰值"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stop_event   = threading.Event()
+        self.peak_threads = 0
+        self.peak_rss     = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            rss = rss_mb()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss, rss)
+            time.sleep(0.05)
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    args = parse_args()
+    point_client_at(args.external or f"127.0.0.1:{args.port}", args.pacing, args.concurrency)
+
+    simulator = None
+    if not args.external:
+        simulator = IseSimulator(port=args.port, latency=args.latency, jitter=args.latency / 4,
+                                 error_rate=args.error_rate, max_concurrency=args.max_concurrency)
+        simulator.start_in_thread()
+
+    audio = b"\x00\x01" * int(16000 * args.audio_seconds)
+    text  = "The quick brown fox jumps over the lazy dog"
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            ok = websocket_thread(audio, text) is not None
+        except IseUnavailable:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    baseline_threads = threading.active_count()
+    baseline_rss     = rss_mb()
+    sampler = Sampler()
+    sampler.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.sessions)))
+    wall = time.perf_counter() - start
+    sampler.stop_event.set()
+    sampler.join()
+
+    latencies = [lat for ok, lat in results if ok]
+    failed    = sum(1 for ok, _ in results if not ok)
+
+    print(f"并发 {args.concurrency}，总计 {args.sessions} 次，音频 {args.audio_seconds}s，节奏 {args.pacing}")
+    print(f"  成功 / 失败        : {len(latencies)} / {failed}")
+    print(f"  总耗时             : {wall:.2f} s")
+    print(f"  吞吐量             : {args.sessions / wall:.1f} 次/秒")
+    if latencies:
+        print(f"  延迟 p50/p95/p99   : {percentile(latencies, 0.5):.3f} / "
+              f"{percentile(latencies, 0.95):.3f} / {percentile(latencies, 0.99):.3f} s")
+        print(f"  延迟 max           : {max(latencies):.3f} s")
+    print(f"  线程数 基线 / 峰值  : {baseline_threads} / {sampler.peak_threads}"
+          f"（含 {args.concurrency} 个调用线程{'与模拟器线程' if simulator else ''}）")
+    if baseline_rss is not None:
+        print(f"  RSS 基线 / 峰值     : {baseline_rss:.1f} / {sampler.peak_rss:.1f} MB")
+    if simulator is not None:
+        print(f"  模拟器统计          : {simulator.stats}")
+
+
+if __name__ == '__main__':
+    main()
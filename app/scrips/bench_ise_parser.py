@@ -0,0 +1,174 @@
+"""
+脚本：bench_ise_parser.py
+功能：
+ 1. 生成与讯飞 ISE 返回结构一致的多句 XML（read_chapter → sentence → word → syll → phone），并做 Base64 编码。
+ 2. 对比两条解析路径的耗时：
+    - baseline：Base64 解码 + etree_to_dict 通用 dict+ 层层 .get() 扁平化（原 ise_evaluate 逻辑）
+    - ise_parser：沿固定路径直接读取属性为 NamedTuple 记录，再 to_dict()
+ 3. 校验两条路径得到的 summary 与 words 一致。
+
+依赖：
+  无（仅标准库 + 项目代码），需在项目根目录运行
+
+示例：
+  python -m app.scrips.bench_ise_parser
+  python -m app.scrips.bench_ise_parser --sentences 40 --words 25 --repeat 50
+"""
+import time
+import random
+import base64
+import argparse
+import xml.etree.ElementTree as ET
+from app.utils import ise_parser
+
+PHONES = ["hh", "ax", "l", "ow", "w", "er", "d", "ih", "s", "t", "ae", "k", "n", "iy"]
+
+
+def build_sample_xml(sentences: int = 10, words: int = 15, seed: int = 0) -> str:
+    """构造讯飞 en_vip read_sentence 格式的评测结果 XML（明文）"""
+    rnd = random.Random(seed)
+
+    def score():
+        return f"{rnd.uniform(1, 5):.6f}"
+
+    parts = []
+    pos = 0
+    gidx = 0
+    for s in range(sentences):
+        word_parts = []
+        for w in range(words):
+            sylls = []
+            for _ in range(rnd.randint(1, 3)):
+                phones = []
+                for _ in range(rnd.randint(2, 4)):
+                    phones.append(
+                        f'<phone beg_pos="{pos}" content="{rnd.choice(PHONES)}" '
+                        f'dp_message="0" end_pos="{pos + 5}" />'
+                    )
+                    pos += 5
+                sylls.append(
+                    f'<syll beg_pos="{pos - 10}" content="x" end_pos="{pos}" '
+                    f'serr_msg="0" syll_accent="0" syll_score="{score()}">' + "".join(phones) + "</syll>"
+                )
+            word_parts.append(
+                f'<word beg_pos="{pos - 20}" content="word{gidx}" dp_message="0" end_pos="{pos}" '
+                f'global_index="{gidx}" index="{w}" pitch="0" property="0" total_score="{score()}" '
+                f'accuracy_score="{score()}" fluency_score="{score()}">' + "".join(sylls) + "</word>"
+            )
+            gidx += 1
+        parts.append(
+            f'<sentence beg_pos="0" content="s{s}" end_pos="{pos}" index="{s}" '
+            f'total_score="{score()}" word_count="{words}">' + "".join(word_parts) + "</sentence>"
+        )
+    return (
+        '<?xml version="1.0" ?><xml_result><read_sentence lan="en" type="study" version="7,0,0,1024">'
+        '<rec_paper><read_chapter accuracy_score="3.5" beg_pos="0" content="..." end_pos="' + str(pos) + '" '
+        'except_info="0" fluency_score="3.2" integrity_score="4.8" is_rejected="false" '
+        'sentence_count="' + str(sentences) + '" standard_score="3.9" total_score="3.7" '
+        'word_count="' + str(gidx) + '">' + "".join(parts) +
+        "</read_chapter></rec_paper></read_sentence></xml_result>"
+    )
+
+
+def etree_to_dict(elem):
+    """原 xunfei.etree_to_dict：把 XML 递归转成通用 dict（仅作对比基线保留）"""
+    d = {}
+    if elem.attrib:
+        d['@attrib'] = dict(elem.attrib)
+    children = list(elem)
+    if children:
+        dd = {}
+        for child in children:
+            child_res = etree_to_dict(child)
+            tag = child.tag
+            if tag in dd:
+                if not isinstance(dd[tag], list):
+                    dd[tag] = [dd[tag]]
+                dd[tag].append(child_res[tag])
+            else:
+                dd[tag] = child_res[tag]
+        d.update(dd)
+    text = (elem.text or '').strip()
+    if text:
+        d['#text'] = text
+    return {elem.tag: d}
+
+
+def decode_and_parse(xml_b64: str) -> dict:
+    """原 xunfei.decode_and_parse：Base64 解码后整棵转 dict"""
+    return etree_to_dict(ET.fromstring(base64.b64decode(xml_b64).decode('utf-8')))
+
+
+def baseline(xml_b64: str) -> dict:
+    """原 ise_evaluate 的解析方式（sentence 为列表时逐句展开，以便与新路径结果可比）"""
+    parsed = decode_and_parse(xml_b64)
+    if 'read_sentence' not in parsed:
+        keys = list(parsed.keys())
+        if len(keys) == 1:
+            parsed = parsed[keys[0]]
+    chapter = parsed.get('read_sentence', {}).get('rec_paper', {}).get('read_chapter', {})
+    attrib = chapter.get('@attrib', {})
+    summary = {
+        'total_score':     float(attrib.get('total_score', 0)),
+        'standard_score':  float(attrib.get('standard_score', 0)),
+        'fluency_score':   float(attrib.get('fluency_score', 0)),
+        'accuracy_score':  float(attrib.get('accuracy_score', 0)),
+        'integrity_score': float(attrib.get('integrity_score', 0)),
+        'is_rejected':     attrib.get('is_rejected') == 'true',
+        'except_info':     int(attrib.get('except_info', 0)),
+    }
+    sentences = chapter.get('sentence', [])
+    if isinstance(sentences, dict):
+        sentences = [sentences]
+    words = []
+    for sentence in sentences:
+        word_list = sentence.get('word', [])
+        if isinstance(word_list, dict):
+            word_list = [word_list]
+        for w in word_list:
+            w_at = w.get('@attrib', {})
+            words.append({
+                'text':         w_at.get('content', ''),
+                'score':        float(w_at.get('total_score', 0)),
+                'accuracy':     float(w_at.get('accuracy_score', 0)),
+                'fluency':      float(w_at.get('fluency_score', 0)),
+                'global_index': int(w_at.get('global_index', 0))
+            })
+    return {'summary': summary, 'words': words}
+
+
+def bench(fn, arg, repeat: int) -> float:
+    """返回单次调用的平均毫秒数"""
+    fn(arg)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ISE XML 解析基准测试")
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--words",     type=int, default=20)
+    parser.add_argument("--repeat",    type=int, default=30)
+    args = parser.parse_args()
+
+    xml = build_sample_xml(args.sentences, args.words)
+    xml_b64 = base64.b64encode(xml.encode("utf-8")).decode("ascii")
+    print(f"XML 大小: {len(xml) / 1024:.1f} KB, 句子 {args.sentences}, 单词 {args.sentences * args.words}")
+
+    expected = baseline(xml_b64)
+    actual   = ise_parser.parse(xml_b64).to_dict()
+    assert expected == actual, "两条解析路径结果不一致"
+
+    t_base   = bench(baseline, xml_b64, args.repeat)
+    t_new    = bench(lambda x: ise_parser.parse(x, detail=False).to_dict(), xml_b64, args.repeat)
+    t_detail = bench(lambda x: ise_parser.parse(x).to_dict(detail=True), xml_b64, args.repeat)
+
+    print(f"baseline (etree_to_dict)      : {t_base:8.2f} ms")
+    print(f"ise_parser                    : {t_new:8.2f} ms  ({t_base / t_new:.2f}x)")
+    print(f"ise_parser + 音节/音素明细     : {t_detail:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
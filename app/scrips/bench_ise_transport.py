@@ -0,0 +1,99 @@
+"""
+脚本：bench_ise_transport.py
+功能：
+ 1. 对同一段 16kHz 单声道音频分别按 raw 与 speex-wb 编码、分帧，统计实际上线的字节数
+    （首帧 + 全部 auw 帧 JSON + 尾帧，即 WebSocket 负载），以及按 --uplink-kbps 估算的上传耗时。
+ 2. 在本进程内启动 ise_simulator，两种编码各跑 --sessions 次完整评测，对比端到端延迟 p50 / p95
+    （含 speex 编码耗时；本机回环没有带宽瓶颈，受限链路上的收益以第 1 项为准）。
+ speex-wb 需要带 libspeex 的 ffmpeg；不可用时只输出 raw 的结果。
+
+依赖：
+  pip install websockets；ffmpeg（--enable-libspeex）可选。需在项目根目录运行
+
+示例：
+  python -m app.scrips.bench_ise_transport
+  python -m app.scrips.bench_ise_transport --wav sample.wav --uplink-kbps 256 --pacing burst
+"""
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import audio, speex
+from app.utils.xunfei import build_payload, build_first_frame, LAST_FRAME, CHUNK_SIZE
+from app.utils.xunfei_async import evaluate
+from app.scrips.ise_simulator import IseSimulator
+from app.scrips.bench_ise_client import point_client_at, percentile
+
+
+def speech_like(seconds: float) -> bytes:
+    """带音节包络的谐波信号，比纯正弦更接近语音的编码难度"""
+    t = np.arange(int(16000 * seconds)) / 16000
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    voice = sum(np.sin(2 * np.pi * k * np.cumsum(f0) / 16000) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None)
+    noise = 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    return audio.to_pcm16(0.25 * voice * envelope + noise)
+
+
+def wire_bytes(payload, text: str) -> int:
+    return (len(build_first_frame(text, "bench", payload.params)) +
+            sum(len(f) for f in payload.frames) + len(LAST_FRAME))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="讯飞 ISE 上传编码对比（raw vs speex-wb）")
+    parser.add_argument("--wav",         default=None, help="使用指定录音，缺省生成 5 秒合成语音")
+    parser.add_argument("--seconds",     type=float, default=5.0)
+    parser.add_argument("--uplink-kbps", type=float, default=512, help="估算上传耗时所用的链路带宽")
+    parser.add_argument("--sessions",    type=int,   default=20)
+    parser.add_argument("--concurrency", type=int,   default=5)
+    parser.add_argument("--pacing",      default="burst", choices=("realtime", "burst", "adaptive"))
+    parser.add_argument("--port",        type=int,   default=18766)
+    args = parser.parse_args()
+
+    if args.wav:
+        with open(args.wav, "rb") as fp:
+            pcm = audio.load_pcm16(fp.read())
+    else:
+        pcm = speech_like(args.seconds)
+    text = "The quick brown fox jumps over the lazy dog"
+
+    try:
+        speex.encode_wb(pcm[:3200])
+        encodings = ("raw", "speex-wb")
+    except speex.SpeexEncodeError as e:
+        print(f"speex-wb 不可用（{e}），只测 raw")
+        encodings = ("raw",)
+
+    print(f"音频 {len(pcm) / 32000:.2f}s，PCM {len(pcm)} 字节，链路 {args.uplink_kbps:g} kbps")
+    for enc in encodings:
+        start   = time.perf_counter()
+        payload = build_payload(pcm, enc, CHUNK_SIZE)
+        cost    = (time.perf_counter() - start) * 1000
+        total   = wire_bytes(payload, text)
+        print(f"  {enc:9s}: 音频 {payload.audio_bytes:7d} B，上线 {total:7d} B，"
+              f"{len(payload.frames)} 帧，编码 {cost:6.1f} ms，"
+              f"链路传输约 {total * 8 / args.uplink_kbps / 1000:.2f} s")
+
+    point_client_at(f"127.0.0.1:{args.port}", args.pacing, args.concurrency)
+    IseSimulator(port=args.port, latency=0.2, jitter=0.05).start_in_thread()
+
+    for enc in encodings:
+        def one(_):
+            t0 = time.perf_counter()
+            ok = evaluate(pcm, text, encoding=enc) is not None
+            return ok, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(one, range(args.sessions)))
+        latencies = [lat for ok, lat in results if ok]
+        if not latencies:
+            print(f"  {enc:9s}: 全部失败")
+            continue
+        print(f"  {enc:9s}: 成功 {len(latencies)}/{args.sessions}，端到端 p50 {percentile(latencies, 0.5):.3f} s，"
+              f"p95 {percentile(latencies, 0.95):.3f} s（节奏 {args.pacing}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+脚本：ise_simulator.py
+功能：
+ 1. 在本地启动一个 WebSocket 服务，按讯飞 ISE 流式接口的帧协议工作：
+    - 首帧 cmd=ssb：校验 common.app_id、business.sub/ent/category/aue/auf/text
+    - 音频帧 cmd=auw：校验 aus 顺序（1 → 2... → 4）、status 与 Base64 音频
+    - 尾帧 status=2 后返回 Base64 编码的评测 XML（read_chapter/sentence/word/syll/phone，单词取自评测文本）
+ 2. 可配置：结果延迟与抖动、随机错误率、并发上限（超出返回 11203 并发流控）。
+ 3. 可选校验 URL 中的 hmac-sha256 签名（提供 --api-secret 时）。
+ 4. 供 app/scrips/bench_ise_client.py 压测，以及离线回归测试 ISE 客户端。
+
+依赖：
+  pip install websockets
+
+使用：
+  python -m app.scrips.ise_simulator --port 8765 --latency 0.3 --error-rate 0.01 --max-concurrency 50
+  然后让客户端指向模拟器：
+    XUNFEI_HOST=127.0.0.1:8765
+    XUNFEI_SCHEME=ws
+    XUNFEI_REQUEST_LINE="GET /v2/open-ise HTTP/1.1"
+"""
+import hmac
+import json
+import random
+import asyncio
+import base64
+import hashlib
+import argparse
+import binascii
+import logging
+import threading
+import urllib.parse
+from xml.sax.saxutils import quoteattr
+
+from websockets.asyncio.server import serve
+
+logging.basicConfig(format='[%(levelname)s] %(asctime)s - %(message)s', level=logging.INFO)
+
+REQUEST_LINE = "GET /v2/open-ise HTTP/1.1"
+VALID_AUE = ("raw", "speex-wb;7", "speex;7")
+
+
+def build_result_xml(text: str, rnd: random.Random) -> str:
+    """按讯飞 en_vip read_sentence 的结构生成评测 XML，单词取自评测文本"""
+    words = [w.strip(".,!?;:\"'") for w in text.lstrip("\ufeff").split()] or ["empty"]
+
+    def score():
+        return f"{rnd.uniform(2.5, 5):.6f}"
+
+    pos = 0
+    parts = []
+    for i, word in enumerate(words):
+        phones = []
+        for ch in (word.lower() or "x")[:4]:
+            phones.append(f'<phone beg_pos="{pos}" content={quoteattr(ch)} dp_message="0" end_pos="{pos + 6}" />')
+            pos += 6
+        syll = (f'<syll beg_pos="{pos - 6 * len(phones)}" content={quoteattr(word.lower())} end_pos="{pos}" '
+                f'serr_msg="0" syll_accent="0" syll_score="{score()}">' + "".join(phones) + "</syll>")
+        parts.append(
+            f'<word beg_pos="{pos - 6 * len(phones)}" content={quoteattr(word)} dp_message="0" '
+            f'end_pos="{pos}" global_index="{i}" index="{i}" pitch="0" property="0" '
+            f'total_score="{score()}" accuracy_score="{score()}" fluency_score="{score()}">' + syll + "</word>"
+        )
+    return (
+        '<?xml version="1.0" ?><xml_result><read_sentence lan="en" type="study" version="7,0,0,1024">'
+        f'<rec_paper><read_chapter accuracy_score="{score()}" beg_pos="0" content={quoteattr(text)} '
+        f'end_pos="{pos}" except_info="0" fluency_score="{score()}" integrity_score="{score()}" '
+        f'is_rejected="false" sentence_count="1" standard_score="{score()}" total_score="{score()}" '
+        f'word_count="{len(words)}"><sentence beg_pos="0" content={quoteattr(text)} end_pos="{pos}" '
+        f'index="0" total_score="{score()}" word_count="{len(words)}">' + "".join(parts) +
+        "</sentence></read_chapter></rec_paper></read_sentence></xml_result>"
+    )
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class IseSimulator:
+    """
+    讯飞 ISE 模拟服务。
+    stats 中记录会话数、成功数、注入错误数、流控次数、协议错误数与收到的音频字节数。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 latency: float = 0.3, jitter: float = 0.1,
+                 error_rate: float = 0.0, max_concurrency: int = 0,
+                 api_secret: str = None, seed: int = None):
+        self.host            = host
+        self.port            = port
+        self.latency         = latency
+        self.jitter          = jitter
+        self.error_rate      = error_rate
+        self.max_concurrency = max_concurrency
+        self.api_secret      = api_secret
+        self.rnd             = random.Random(seed)
+        self.active          = 0
+        self.stats = {
+            "sessions": 0, "ok": 0, "injected_errors": 0,
+            "throttled": 0, "protocol_errors": 0, "audio_bytes": 0,
+        }
+
+    # ——— 签名校验 ———
+    def _check_signature(self, connection, request):
+        if not self.api_secret:
+            return None
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(request.path).query)
+        try:
+            date = query["date"][0]
+            host = query["host"][0]
+            auth = base64.b64decode(query["authorization"][0]).decode()
+            sig  = auth.split('signature="', 1)[1].rstrip('"')
+        except (KeyError, IndexError, ValueError, binascii.Error):
+            return connection.respond(401, "missing or malformed authorization\n")
+        origin   = f"host: {host}\ndate: {date}\n{REQUEST_LINE}"
+        expected = base64.b64encode(
+            hmac.new(self.api_secret.encode(), origin.encode(), hashlib.sha256).digest()).decode()
+        if not hmac.compare_digest(sig, expected):
+            return connection.respond(401, "signature mismatch\n")
+        return None
+
+    # ——— 帧校验 ———
+    @staticmethod
+    def _check_first(frame: dict) -> str:
+        business = frame.get("business") or {}
+        if not (frame.get("common") or {}).get("app_id"):
+            raise ProtocolError("common.app_id missing")
+        if business.get("cmd") != "ssb":
+            raise ProtocolError("first frame must be cmd=ssb")
+        if business.get("sub") != "ise" or not business.get("ent") or not business.get("category"):
+            raise ProtocolError("business.sub/ent/category invalid")
+        if business.get("aue") not in VALID_AUE:
+            raise ProtocolError(f"unsupported aue {business.get('aue')!r}")
+        if business.get("aue") == "raw" and business.get("auf") != "audio/L16;rate=16000":
+            raise ProtocolError("auf must be audio/L16;rate=16000 for raw audio")
+        text = business.get("text")
+        if not text:
+            raise ProtocolError("business.text missing")
+        if (frame.get("data") or {}).get("status") != 0:
+            raise ProtocolError("first frame data.status must be 0")
+        return text
+
+    @staticmethod
+    def _check_audio(frame: dict, expect_first: bool) -> tuple:
+        """返回 (音频字节数, 是否尾帧)"""
+        business = frame.get("business") or {}
+        data     = frame.get("data") or {}
+        if business.get("cmd") != "auw":
+            raise ProtocolError("audio frame must be cmd=auw")
+        aus, status = business.get("aus"), data.get("status")
+        if status == 2:
+            if aus != 4:
+                raise ProtocolError("last frame must have aus=4")
+            return len(base64.b64decode(data.get("data") or "", validate=True)), True
+        if status != 1:
+            raise ProtocolError(f"unexpected data.status {status!r}")
+        if aus != (1 if expect_first else 2):
+            raise ProtocolError(f"unexpected aus {aus!r}")
+        try:
+            chunk = base64.b64decode(data.get("data") or "", validate=True)
+        except (binascii.Error, ValueError):
+            raise ProtocolError("audio data is not valid base64")
+        return len(chunk), False
+
+    async def handler(self, ws):
+        self.stats["sessions"] += 1
+        sid = f"ise{self.stats['sessions']:08d}"
+        self.active += 1
+        try:
+            if self.max_concurrency and self.active > self.max_concurrency:
+                self.stats["throttled"] += 1
+                await ws.send(json.dumps({"code": 11203, "message": "licc limit", "sid": sid}))
+                return
+
+            try:
+                text = self._check_first(json.loads(await ws.recv()))
+                await ws.send(json.dumps({"code": 0, "message": "success", "sid": sid,
+                                          "data": {"status": 1}}))
+                first = True
+                async for message in ws:
+                    size, last = self._check_audio(json.loads(message), first)
+                    self.stats["audio_bytes"] += size
+                    first = False
+                    if last:
+                        break
+                else:
+                    return
+            except (ProtocolError, ValueError, KeyError) as e:
+                self.stats["protocol_errors"] += 1
+                await ws.send(json.dumps({"code": 10163, "message": f"param validate error: {e}", "sid": sid}))
+                return
+
+            await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+            if self.rnd.random() < self.error_rate:
+                self.stats["injected_errors"] += 1
+                await ws.send(json.dumps({"code": 10114, "message": "simulated engine error", "sid": sid}))
+                return
+
+            xml = build_result_xml(text, self.rnd)
+            self.stats["ok"] += 1
+            await ws.send(json.dumps({
+                "code": 0, "message": "success", "sid": sid,
+                "data": {"status": 2, "data": base64.b64encode(xml.encode()).decode()},
+            }))
+        finally:
+            self.active -= 1
+
+    async def serve_forever(self, ready: threading.Event = None):
+        async with serve(self.handler, self.host, self.port,
+                         process_request=self._check_signature, max_size=None):
+            logging.info("ISE simulator listening on ws://%s:%s/v2/open-ise", self.host, self.port)
+            if ready is not None:
+                ready.set()
+            await asyncio.Future()
+
+    def start_in_thread(self) -> threading.Thread:
+        """在后台线程中运行模拟器（供压测脚本在同一进程内使用）"""
+        ready = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve_forever(ready)),
+                                  name="ise-simulator", daemon=True)
+        thread.start()
+        ready.wait(5)
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="讯飞 ISE 协议本地模拟器")
+    parser.add_argument("--host",            default="127.0.0.1")
+    parser.add_argument("--port",            type=int,   default=8765)
+    parser.add_argument("--latency",         type=float, default=0.3, help="尾帧后返回结果的延迟（秒）")
+    parser.add_argument("--jitter",          type=float, default=0.1, help="延迟抖动（秒）")
+    parser.add_argument("--error-rate",      type=float, default=0.0, help="随机返回引擎错误的概率")
+    parser.add_argument("--max-concurrency", type=int,   default=0,   help="并发上限，超出返回 11203；0 为不限")
+    parser.add_argument("--api-secret",      default=None, help="提供时校验 URL 签名")
+    args = parser.parse_args()
+
+    simulator = IseSimulator(args.host, args.port, args.latency, args.jitter,
+                             args.error_rate, args.max_concurrency, args.api_secret)
+    try:
+        asyncio.run(simulator.serve_forever())
+    except KeyboardInterrupt:
+        logging.info("stats: %s", simulator.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# 进程内音频解码与重采样
+
+# app/utils/audio.py
+
+"""
+上传音频 → 16kHz 单声道，全程在内存中完成，不再为每个请求创建临时文件、fork ffmpeg：
+  - WAV：直接解析 RIFF 块，支持 8/16/24/32 位整型 PCM、32/64 位浮点及 WAVE_FORMAT_EXTENSIBLE
+  - FLAC / MP3 / OGG：安装了 soundfile（libsndfile ≥ 1.1 支持 MP3）时在进程内解码
+  - 其它格式（m4a / mp4 / ADPCM 等）或上述解码失败时，才回退到 ffmpeg
+移动端上传的大多已是 16kHz 单声道 16 位 WAV：passthrough_pcm16 只读头部，直接切出 PCM 数据。
+
+声道下混为各声道均值；重采样为 Kaiser 窗 sinc 低通的多相（polyphase）实现：
+按 gcd 约分得到 up/down，每个输出相位对应一组滤波器系数，
+用 sliding_window_view 构造输入窗口视图后做一次矩阵-向量乘，不逐点循环也不复制数据。
+"""
+
+import io
+import os
+import struct
+import tempfile
+import subprocess
+from math import gcd
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import soundfile
+except ImportError:          # 可选依赖：未安装时 FLAC/MP3 走 ffmpeg
+    soundfile = None
+
+TARGET_RATE = 16000
+
+WAVE_FORMAT_PCM        = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 每侧滤波器长度（以低速率侧的零点数计）与 Kaiser 窗参数，约 80dB 阻带衰减
+FILTER_HALF_WIDTH = 16
+KAISER_BETA       = 8.0
+
+
+class AudioDecodeError(Exception):
+    """音频无法解码（格式不支持或数据损坏）"""
+
+
+# ——— WAV 解析 ———
+
+def _wav_layout(data: bytes):
+    """
+    只解析 RIFF 头部，返回 (fmt, data_start, data_end)，
+    fmt 为 (format_tag, channels, sample_rate, block_align, bits_per_sample)。
+    """
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise AudioDecodeError("not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, pos)
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            if size < 16 or body + 16 > len(data):
+                raise AudioDecodeError("fmt chunk too short")
+            tag, channels, rate, _, block_align, bits = struct.unpack_from('<HHIIHH', data, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 40 and body + 26 <= len(data):
+                tag = struct.unpack_from('<H', data, body + 24)[0]   # SubFormat GUID 前两字节
+            fmt = (tag, channels, rate, block_align, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise AudioDecodeError("data chunk before fmt chunk")
+            # 流式写出的 WAV 常把 data 长度写成 0 或 0xFFFFFFFF，以实际剩余字节为准
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(len(data), body + size)
+            return fmt, body, end
+        pos = body + size + (size & 1)   # 块按偶数字节对齐
+
+    raise AudioDecodeError("no data chunk")
+
+
+def _read_wav(data: bytes):
+    """
+    解析 RIFF/WAVE，返回 (samples[frames, channels] float32, sample_rate)。
+    不支持的编码抛出 AudioDecodeError，由调用方决定是否回退。
+    """
+    fmt, start, end = _wav_layout(data)
+    return _pcm_to_float(memoryview(data)[start:end], *fmt)
+
+
+def passthrough_pcm16(data: bytes, rate: int = TARGET_RATE):
+    """
+    快速路径：上传的已经是指定采样率、单声道、16 位整型 PCM 的 WAV 时，
+    只嗅探头部并直接切出 data 块返回，不做任何样本级处理；否则返回 None。
+    """
+    try:
+        (tag, channels, src_rate, _, bits), start, end = _wav_layout(data)
+    except AudioDecodeError:
+        return None
+    if tag != WAVE_FORMAT_PCM or channels != 1 or bits != 16 or src_rate != rate:
+        return None
+    return data[start:end - (end - start) % 2]
+
+
+def _pcm_to_float(raw, tag: int, channels: int, rate: int, block_align: int, bits: int):
+    if channels < 1 or rate < 1:
+        raise AudioDecodeError("invalid channel count or sample rate")
+    width = bits // 8
+    if block_align != width * channels:
+        raise AudioDecodeError(f"unsupported block alignment {block_align} for {bits}-bit x {channels}")
+    usable = len(raw) - len(raw) % block_align
+    raw = raw[:usable]
+
+    if tag == WAVE_FORMAT_PCM:
+        if bits == 8:
+            samples = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif bits == 16:
+            samples = np.frombuffer(raw, '<i2').astype(np.float32) / 32768.0
+        elif bits == 24:
+            # 3 字节补成 4 字节（低位补 0）后按 int32 读取，再算术右移完成符号扩展
+            padded = np.zeros((usable // 3, 4), np.uint8)
+            padded[:, 1:] = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+            samples = (padded.view('<i4').ravel() >> 8).astype(np.float32) / 8388608.0
+        elif bits == 32:
+            samples = (np.frombuffer(raw, '<i4') / 2147483648.0).astype(np.float32)
+        else:
+            raise AudioDecodeError(f"unsupported PCM bit depth {bits}")
+    elif tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        samples = np.frombuffer(raw, '<f4' if bits == 32 else '<f8').astype(np.float32)
+    else:
+        raise AudioDecodeError(f"unsupported WAV format tag 0x{tag:04x}")
+
+    return samples.reshape(-1, channels), rate
+
+
+# ——— 解码入口 ———
+
+def decode(data: bytes):
+    """
+    进程内解码，返回 (samples[frames, channels] float32，取值 [-1, 1)，sample_rate)。
+    无法在进程内解码时抛出 AudioDecodeError。
+    """
+    if data[:4] == b'RIFF':
+        return _read_wav(data)
+    if soundfile is None:
+        raise AudioDecodeError("soundfile is not installed")
+    try:
+        samples, rate = soundfile.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    except Exception as e:       # libsndfile 对未知格式抛出的异常类型不统一
+        raise AudioDecodeError(str(e))
+    return samples, rate
+
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    """[frames, channels] → [frames]，多声道取均值"""
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+# ——— 多相重采样 ———
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """
+    设计 up/down 重采样的低通滤波器并拆成 up 个相位，
+    返回形状为 [up, taps_per_phase] 的系数矩阵（每行已倒序，便于直接与输入窗口做点积）。
+    """
+    ratio  = max(up, down)
+    half   = FILTER_HALF_WIDTH * ratio
+    k      = np.arange(-half, half + 1)
+    cutoff = 1.0 / ratio
+    h = cutoff * np.sinc(cutoff * k) * np.kaiser(len(k), KAISER_BETA) * up
+
+    taps = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    return np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+
+
+def resample(x: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """单声道 float32 信号的有理数倍重采样，输出长度为 ceil(len(x) * dst / src)"""
+    if src_rate == dst_rate or len(x) == 0:
+        return x.astype(np.float32, copy=False)
+
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    bank  = _polyphase_filter(up, down)
+    taps  = bank.shape[1]
+    delay = FILTER_HALF_WIDTH * max(up, down)     # 线性相位滤波器的群延迟（上采样域）
+
+    n_out = -(-len(x) * up // down)
+    # 第 n 个输出对应上采样域位置 t = n*down + delay：相位 t % up，最新的输入下标 t // up
+    t     = np.arange(n_out, dtype=np.int64) * down + delay
+    need  = max(int(t[-1] // up) + taps, taps - 1 + len(x))
+    xp = np.zeros(need, dtype=np.float32)
+    xp[taps - 1:taps - 1 + len(x)] = x
+    windows = sliding_window_view(xp, taps)        # windows[b] 覆盖 x[b - taps + 1 .. b]
+
+    y = np.empty(n_out, dtype=np.float32)
+    # 输出下标按 n % up 分组：同组相位相同，输入起点等差（步长 down），一组一次矩阵乘
+    for r in range(min(up, n_out)):
+        base = int(t[r] // up)
+        rows = windows[base::down][:len(range(r, n_out, up))]
+        y[r::up] = rows @ bank[t[r] % up]
+    return y
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """float32 [-1, 1) → 16 位小端 PCM 字节"""
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768.0).round().astype('<i2').tobytes()
+
+
+def pcm16_to_wav(pcm: bytes, rate: int = TARGET_RATE) -> bytes:
+    """单声道 16 位 PCM → 标准 44 字节头的 WAV（存档用户录音）"""
+    header = struct.pack('<4sI4s4sIHHIIHH4sI',
+                         b'RIFF', 36 + len(pcm), b'WAVE',
+                         b'fmt ', 16, 1, 1, rate, rate * 2, 2, 16,
+                         b'data', len(pcm))
+    return header + pcm
+
+
+# ——— ffmpeg 回退 ———
+
+def _ffmpeg_decode(data: bytes, rate: int) -> np.ndarray:
+    """
+    仅用于进程内无法解码的格式。输入写临时文件（mp4/m4a 的 moov 可能在文件末尾，需要可寻址输入），
+    输出直接从 stdout 读取 s16le，省去第二个临时文件。
+    """
+    fd, src_path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', src_path,
+               '-f', 's16le', '-ac', '1', '-ar', str(rate), 'pipe:1']
+        try:
+            out = subprocess.run(cmd, check=True, capture_output=True).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise AudioDecodeError(f"ffmpeg decode failed: {e}")
+    finally:
+        try:
+            os.remove(src_path)
+        except OSError:
+            pass
+    return np.frombuffer(out, '<i2').astype(np.float32) / 32768.0
+
+
+def load_audio(data: bytes, rate: int = TARGET_RATE) -> np.ndarray:
+    """
+    任意上传音频 → 指定采样率的单声道 float32 数组（与 whisper.load_audio 的输出格式一致）。
+    优先进程内解码，失败时回退 ffmpeg；两者都失败抛出 AudioDecodeError。
+    """
+    try:
+        samples, src_rate = decode(data)
+    except AudioDecodeError:
+        return _ffmpeg_decode(data, rate)
+    return resample(to_mono(samples), src_rate, rate)
+
+
+def load_pcm16(data: bytes, rate: int = TARGET_RATE) -> bytes:
+    """任意上传音频 → 指定采样率的单声道 16 位 PCM 字节（讯飞 aue=raw 所需格式）"""
+    pcm = passthrough_pcm16(data, rate)
+    if pcm is not None:
+        return pcm
+    return to_pcm16(load_audio(data, rate))
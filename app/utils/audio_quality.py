@@ -0,0 +1,116 @@
+# 录音质量预检：在调用讯飞之前拒绝无法评测的录音
+
+# app/utils/audio_quality.py
+
+"""
+过短、削波、全静音或音量过低的录音送去讯飞，只会在几秒后拿回 0 分，还要占用并发配额、付会话费用。
+这里用 NumPy 在解码后立刻算出几项指标，不合格时直接返回结构化的 422：
+  duration       原始时长（秒）
+  speech_ratio   语音帧时长 / 原始时长（由 VAD 给出）
+  rms_db         语音区间的 RMS 电平（dBFS）
+  clipping_ratio 幅值接近满量程（≥ CLIP_LEVEL）的样本比例
+阈值见 app/config.py 的 QUALITY_*；拒绝原因计入 Redis，供 /api/evaluate/ise/queue 查看。
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from flask import current_app
+import app.extensions as ext
+
+CLIP_LEVEL = 0.99
+REJECTIONS_KEY = "audio:quality_rejections"   # HASH：reason → 次数
+
+# reason → 提示信息
+REASONS = {
+    "too_short":  "Recording is too short",
+    "silent":     "No speech detected in the recording",
+    "too_quiet":  "Recording volume is too low",
+    "clipped":    "Recording is distorted (clipping), please move away from the microphone",
+    "low_speech": "Recording contains too little speech",
+}
+
+
+class QualityReport(NamedTuple):
+    duration:       float
+    speech_seconds: float
+    speech_ratio:   float
+    rms_db:         float
+    clipping_ratio: float
+    reason:         Optional[str]    # None 表示通过
+
+    @property
+    def message(self) -> str:
+        return REASONS.get(self.reason, "")
+
+    def to_dict(self) -> dict:
+        return {
+            'reason':  self.reason,
+            'metrics': {
+                'duration':        round(self.duration, 3),
+                'speech_duration': round(self.speech_seconds, 3),
+                'speech_ratio':    round(self.speech_ratio, 4),
+                'rms_db':          round(self.rms_db, 1),
+                'clipping_ratio':  round(self.clipping_ratio, 5),
+            },
+        }
+
+
+def _thresholds() -> dict:
+    cfg = current_app.config
+    return {
+        'min_duration':     float(cfg.get('QUALITY_MIN_DURATION', 0.5)),
+        'min_speech':       float(cfg.get('QUALITY_MIN_SPEECH_SECONDS', 0.3)),
+        'min_speech_ratio': float(cfg.get('QUALITY_MIN_SPEECH_RATIO', 0.05)),
+        'min_rms_db':       float(cfg.get('QUALITY_MIN_RMS_DB', -45.0)),
+        'max_clipping':     float(cfg.get('QUALITY_MAX_CLIPPING_RATIO', 0.01)),
+    }
+
+
+def assess(samples: np.ndarray, span) -> QualityReport:
+    """
+    samples 为单声道 float32，span 为 vad.detect 的结果。
+    按 时长 → 静音 → 音量 → 削波 → 语音占比 的顺序给出第一个不合格原因。
+    """
+    t = _thresholds()
+    duration = span.total_seconds
+    speech   = samples[span.start:span.end]
+
+    rms_db = float(10.0 * np.log10(np.dot(speech, speech) / len(speech) + 1e-12)) if len(speech) else -120.0
+    clipping_ratio = float(np.count_nonzero(np.abs(samples) >= CLIP_LEVEL) / len(samples)) if len(samples) else 0.0
+    speech_ratio   = span.speech_seconds / duration if duration else 0.0
+
+    if duration < t['min_duration']:
+        reason = "too_short"
+    elif span.speech_seconds == 0:
+        reason = "silent"
+    elif rms_db < t['min_rms_db']:
+        reason = "too_quiet"
+    elif clipping_ratio > t['max_clipping']:
+        reason = "clipped"
+    elif span.speech_seconds < t['min_speech']:
+        reason = "too_short"
+    elif speech_ratio < t['min_speech_ratio']:
+        reason = "low_speech"
+    else:
+        reason = None
+
+    return QualityReport(duration, span.speech_seconds, speech_ratio, rms_db, clipping_ratio, reason)
+
+
+def enabled() -> bool:
+    return bool(current_app.config.get('QUALITY_CHECK_ENABLED', True))
+
+
+def record_rejection(reason: str):
+    """拒绝计数，Redis 故障不影响请求"""
+    if ext.redis_client is None:
+        return
+    try:
+        ext.redis_client.hincrby(REJECTIONS_KEY, reason, 1)
+    except Exception:
+        current_app.logger.warning("Failed to record quality rejection", exc_info=True)
+
+
+def rejection_stats() -> dict:
+    return {reason: int(count) for reason, count in ext.redis_client.hgetall(REJECTIONS_KEY).items()}
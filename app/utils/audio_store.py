@@ -0,0 +1,403 @@
+# 用户录音存档：本地持久化暂存（spool）+ Celery 后台写入 OBS
+
+# app/utils/audio_store.py
+
+"""
+原流程中 create_practice_record 在请求里同步 putObject，OBS 慢则请求慢，OBS 故障则回滚整条记录。
+现在改为写后上传（write-behind）：
+
+  1. 请求内：录音写入本地暂存目录 AUDIO_SPOOL_DIR（临时文件 + fsync + 原子 rename），
+     PracticeRecord 以 upload_status="pending" 提交，随即返回
+  2. Celery 任务 audio.upload 从暂存目录读取并上传到 userVoice/{record_id}.wav，
+     成功后写入 user_audio_key、upload_status="uploaded" 并删除暂存文件
+  3. 失败按指数退避重试，超过 AUDIO_UPLOAD_MAX_RETRIES 次记为 "failed"，暂存文件保留
+  4. 定时任务 audio.drain_spool 扫描暂存目录：重新投递滞留的文件（包括投递失败、重试耗尽的），
+     清理已上传或记录未能提交的残留文件；仍在退避等待重试的记录（RETRY_KEY）不重复投递
+
+并发限制：集群内同时上传数不超过 AUDIO_UPLOAD_CONCURRENCY（Redis 租约 ZSET），
+超出时任务短暂延后重试，不占用失败重试次数；Celery worker 的并发数不必与之相同。
+背压：暂存目录总大小超过 AUDIO_SPOOL_MAX_BYTES 时拒绝新的录音（SpoolFull → 503），
+而不是把本地磁盘写满。总大小用进程内计数（app/utils/dir_usage.py），
+每 AUDIO_SPOOL_USAGE_REFRESH 秒才全量扫描一次目录，不在每个请求里逐个 stat。
+
+暂存目录必须位于运行 Celery worker 的主机上（或共享卷），web 与 worker 同机部署时默认即可。
+
+客户端直传（录音字节不经过 web 与 worker）：
+  1. 创建记录时 upload_status="awaiting"，返回 userVoice/{record_id}.wav 的 PUT 签名 URL（direct_upload()）
+  2. 客户端直接 PUT 到 OBS，完成后回调；complete_direct() 对对象做 HEAD，
+     大小须与客户端声明一致且不超过 AUDIO_DIRECT_MAX_BYTES，通过后置为 "uploaded"
+  3. 校验不通过时记录保持 awaiting，客户端可重新 PUT（或重新申请 URL）后再次回调
+  4. 超过 AUDIO_DIRECT_AWAITING_TTL 仍为 awaiting 的记录由 audio.drain_spool 收尾（expire_awaiting()）
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+import app.extensions as ext
+from app.utils.obs_client import client as obs_client
+from app.utils.presigned import generate_presigned_url
+from app.utils.dir_usage import DirectoryUsage
+
+USER_AUDIO_PREFIX = "userVoice/"
+
+STATUS_PENDING  = "pending"
+STATUS_UPLOADED = "uploaded"
+STATUS_FAILED   = "failed"
+STATUS_AWAITING = "awaiting"     # 等待客户端直传 OBS
+
+WAV_HEADER_BYTES = 44
+
+STATS_KEY    = "audio_upload:stats"      # HASH：spooled / uploaded / retries / throttled / failed / rejected / direct_*
+INFLIGHT_KEY = "audio_upload:inflight"   # ZSET：member=任务 ID，score=租约到期时间(ms)
+RETRY_KEY    = "audio_upload:retry_at"   # ZSET：member=record_id，score=退避后的下次尝试时间(秒)
+
+# KEYS: inflight ; ARGV: now_ms, token, limit, lease_ms
+_ACQUIRE_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]))
+if redis.call('ZSCORE', KEYS[1], ARGV[2]) then return 1 end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then return 0 end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[4]), ARGV[2])
+return 1
+"""
+
+
+class SpoolFull(Exception):
+    """暂存目录已超过容量上限"""
+
+
+class UploadMismatch(Exception):
+    """直传校验失败：OBS 上没有对象，或大小与声明不符"""
+
+
+def user_audio_key(record_id: str) -> str:
+    """OBS 存储路径：userVoice/{record_id}.wav"""
+    return f"{USER_AUDIO_PREFIX}{record_id}.wav"
+
+
+def incr_stat(field: str, amount: int = 1):
+    """统计计数，Redis 故障不影响上传"""
+    if ext.redis_client is None:
+        return
+    try:
+        ext.redis_client.hincrby(STATS_KEY, field, amount)
+    except Exception:
+        current_app.logger.warning("Failed to record audio upload stats", exc_info=True)
+
+
+# ——— 暂存目录 ———
+
+def spool_dir() -> str:
+    path = current_app.config.get("AUDIO_SPOOL_DIR")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_path(record_id: str) -> str:
+    return os.path.join(spool_dir(), f"{record_id}.wav")
+
+
+def _spool_entries() -> list:
+    """[(record_id, 大小, 修改时间)]，忽略写入中的临时文件"""
+    entries = []
+    with os.scandir(spool_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".wav"):
+                st = entry.stat()
+                entries.append((entry.name[:-4], st.st_size, st.st_mtime))
+    return entries
+
+
+_usage = DirectoryUsage(lambda: sum(size for _, size, _ in _spool_entries()))
+
+
+def spool_bytes() -> int:
+    """暂存目录总字节数（进程内计数，定期全量扫描校准）"""
+    return _usage.total(float(current_app.config.get("AUDIO_SPOOL_USAGE_REFRESH", 30)))
+
+
+def spool_usage() -> dict:
+    entries = _spool_entries()
+    oldest  = min((mtime for _, _, mtime in entries), default=None)
+    return {
+        "files":          len(entries),
+        "bytes":          sum(size for _, size, _ in entries),
+        "oldest_seconds": round(time.time() - oldest, 1) if oldest is not None else None,
+    }
+
+
+def spool(record_id: str, data: bytes):
+    """
+    录音写入暂存目录：先写临时文件并 fsync，再原子 rename，最后 fsync 目录，
+    保证进程崩溃或断电后要么是完整文件、要么没有文件。
+    超过 AUDIO_SPOOL_MAX_BYTES 时抛出 SpoolFull。
+    """
+    limit = int(current_app.config.get("AUDIO_SPOOL_MAX_BYTES", 2 * 1024 ** 3))
+    if limit and spool_bytes() + len(data) > limit:
+        incr_stat("rejected")
+        raise SpoolFull("Audio spool is full")
+
+    path = spool_path(record_id)
+    tmp  = f"{path}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    _usage.add(len(data))
+    incr_stat("spooled")
+
+
+def discard(record_id: str):
+    path = spool_path(record_id)
+    try:
+        size = os.stat(path).st_size
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _usage.add(-size)
+
+
+def stage(record, data: bytes):
+    """
+    请求内调用：标记记录为待上传并写入暂存目录。
+    record 需已 flush（拿到 record_id）；调用方随后 commit，再调用 enqueue()。
+    """
+    record.upload_status  = STATUS_PENDING
+    record.user_audio_key = None
+    spool(record.record_id, data)
+
+
+def enqueue(record_id: str) -> bool:
+    """投递上传任务；失败只记日志，由 audio.drain_spool 定时补投"""
+    try:
+        ext.celery.send_task("audio.upload", args=[record_id], ignore_result=True,
+                             queue=current_app.config.get("AUDIO_UPLOAD_QUEUE", "celery"))
+        return True
+    except Exception:
+        current_app.logger.exception("Failed to enqueue upload for record %s", record_id)
+        return False
+
+
+# ——— 客户端直传 ———
+
+def direct_max_bytes() -> int:
+    return int(current_app.config.get("AUDIO_DIRECT_MAX_BYTES", 20 * 1024 ** 2))
+
+
+def direct_upload(record_id: str) -> dict:
+    """
+    userVoice/{record_id}.wav 的 PUT 签名 URL。
+    Content-Type 参与签名，客户端 PUT 时必须原样带上 headers 中的请求头。
+    """
+    expires = int(current_app.config.get("AUDIO_DIRECT_UPLOAD_EXPIRES", 900))
+    headers = {"Content-Type": "audio/wav"}
+    url = generate_presigned_url(user_audio_key(record_id), method='PUT', expires=expires, headers=headers)
+    return {"url": url, "method": "PUT", "headers": headers, "expires_in": expires}
+
+
+def head_object(object_key: str):
+    """OBS 对象大小（字节），对象不存在返回 None；其他 OBS 错误抛出 RuntimeError"""
+    resp = obs_client.getObjectMetadata(current_app.config['OBS_BUCKET'], object_key)
+    if resp.status == 404:
+        return None
+    if resp.status >= 300:
+        raise RuntimeError(f"OBS head failed: status={resp.status}, message={resp.errorMessage}")
+    return int(resp.body.contentLength)
+
+
+def _direct_size_ok(size: int) -> bool:
+    return WAV_HEADER_BYTES < size <= direct_max_bytes()
+
+
+def complete_direct(record, size: int) -> int:
+    """
+    客户端 PUT 完成后的校验与收尾，返回对象大小；调用方负责 commit。
+    已是 uploaded 时直接返回（回调可重复调用）。
+    对象不存在、大小与声明不符时抛出 UploadMismatch，记录保持 awaiting；
+    超过 AUDIO_DIRECT_MAX_BYTES 或不足一个 WAV 头的对象同时从 OBS 删除。
+    """
+    object_key = user_audio_key(record.record_id)
+    actual = head_object(object_key)
+    if record.upload_status == STATUS_UPLOADED and actual is not None:
+        return actual
+
+    if actual is None:
+        raise UploadMismatch("录音尚未上传到 OBS")
+    if not _direct_size_ok(actual):
+        obs_client.deleteObject(current_app.config['OBS_BUCKET'], object_key)
+        incr_stat("direct_rejected")
+        raise UploadMismatch(f"录音大小 {actual} 字节超出允许范围")
+    if actual != size:
+        incr_stat("direct_rejected")
+        raise UploadMismatch(f"录音大小不符：声明 {size} 字节，OBS 上为 {actual} 字节")
+
+    record.user_audio_key = object_key
+    record.upload_status  = STATUS_UPLOADED
+    incr_stat("direct_uploaded")
+    return actual
+
+
+def expire_awaiting(max_age: float) -> dict:
+    """
+    创建超过 max_age 秒仍为 awaiting 的直传记录（客户端未上传，或上传后回调丢失）：
+      OBS 上已有大小合规的对象 → 视为回调丢失，置为 uploaded
+      否则                     → 置为 failed（删除大小越界的对象），不再等待
+    OBS 出错的记录跳过，下次再试。
+    """
+    from app.models import PracticeRecord
+
+    cutoff  = datetime.now() - timedelta(seconds=max_age)
+    result  = {"adopted": 0, "expired": 0}
+    records = PracticeRecord.query.filter(PracticeRecord.upload_status == STATUS_AWAITING,
+                                          PracticeRecord.attempted_at < cutoff).all()
+    for record in records:
+        object_key = user_audio_key(record.record_id)
+        try:
+            actual = head_object(object_key)
+            if actual is not None and not _direct_size_ok(actual):
+                obs_client.deleteObject(current_app.config['OBS_BUCKET'], object_key)
+        except Exception:
+            current_app.logger.warning("Failed to check direct upload %s", record.record_id, exc_info=True)
+            continue
+        if actual is not None and _direct_size_ok(actual):
+            record.user_audio_key = object_key
+            record.upload_status  = STATUS_UPLOADED
+            result["adopted"] += 1
+        else:
+            record.upload_status  = STATUS_FAILED
+            result["expired"] += 1
+    ext.db.session.commit()
+    return result
+
+
+# ——— 上传（Celery worker 内执行） ———
+
+def acquire_slot(token: str) -> bool:
+    """集群级上传并发许可；租约到期自动回收（worker 崩溃时不会永久占用）"""
+    limit    = int(current_app.config.get("AUDIO_UPLOAD_CONCURRENCY", 8))
+    lease_ms = int(float(current_app.config.get("AUDIO_UPLOAD_LEASE", 120)) * 1000)
+    script   = ext.redis_client.register_script(_ACQUIRE_LUA)
+    return bool(script(keys=[INFLIGHT_KEY], args=[int(time.time() * 1000), token, limit, lease_ms]))
+
+
+def release_slot(token: str):
+    ext.redis_client.zrem(INFLIGHT_KEY, token)
+
+
+def schedule_retry(record_id: str, countdown: float):
+    """任务进入退避重试：记下下次尝试时间，drain 在此之前不再重复投递"""
+    ext.redis_client.zadd(RETRY_KEY, {record_id: time.time() + countdown})
+
+
+def _clear_retry(record_id: str):
+    ext.redis_client.zrem(RETRY_KEY, record_id)
+
+
+def put_object(bucket: str, object_key: str, data: bytes):
+    """同步上传，OBS 返回非 2xx 时抛出 RuntimeError"""
+    resp = obs_client.putObject(bucket, object_key, data)
+    if resp.status >= 300:
+        raise RuntimeError(f"OBS upload failed: status={resp.status}, message={resp.errorMessage}")
+
+
+def upload(record_id: str) -> str:
+    """
+    上传一条暂存录音并更新记录，返回最终状态：
+      uploaded：上传成功（或此前已上传）
+      missing ：暂存文件不存在（已被其他任务处理）
+      orphaned：记录不存在，不上传（暂存文件由 drain 清理），避免 OBS 上留下无主对象
+    OBS 错误向上抛出，由任务决定是否重试。
+    """
+    from app.models import PracticeRecord
+
+    record = PracticeRecord.query.get(record_id)
+    if record is None:
+        _clear_retry(record_id)
+        return "orphaned"
+    if record.upload_status == STATUS_UPLOADED:
+        discard(record_id)
+        return STATUS_UPLOADED
+
+    try:
+        with open(spool_path(record_id), "rb") as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        _clear_retry(record_id)
+        return "missing"
+
+    object_key = user_audio_key(record_id)
+    put_object(current_app.config['OBS_BUCKET'], object_key, data)
+
+    record.user_audio_key = object_key
+    record.upload_status  = STATUS_UPLOADED
+    ext.db.session.commit()
+    discard(record_id)
+    _clear_retry(record_id)
+    incr_stat("uploaded")
+    return STATUS_UPLOADED
+
+
+def mark_failed(record_id: str):
+    """重试耗尽：记录标为 failed，暂存文件保留给 drain_spool 之后再试"""
+    from app.models import PracticeRecord
+
+    record = PracticeRecord.query.get(record_id)
+    if record is not None and record.upload_status != STATUS_UPLOADED:
+        record.upload_status = STATUS_FAILED
+        ext.db.session.commit()
+    _clear_retry(record_id)
+    incr_stat("failed")
+
+
+def drain(min_age: float) -> dict:
+    """
+    扫描修改时间早于 min_age 秒的暂存文件：
+      记录不存在（请求写入暂存后未能提交）→ 删除
+      已上传（上传后删除文件前崩溃）      → 删除
+      任务仍在退避等待重试                → 跳过（避免重复任务）
+      pending / failed                    → 更新文件时间并重新投递（避免下次扫描重复投递）
+    """
+    from app.models import PracticeRecord
+
+    now    = time.time()
+    cutoff = now - min_age
+    result = {"requeued": 0, "orphaned": 0, "cleaned": 0, "backoff": 0}
+    # 暂存文件已被其他途径删除的记录不会再被扫描到，一天前的重试时间直接清掉
+    ext.redis_client.zremrangebyscore(RETRY_KEY, "-inf", now - 24 * 3600)
+    for record_id, _, mtime in _spool_entries():
+        if mtime >= cutoff:
+            continue
+        record = PracticeRecord.query.get(record_id)
+        if record is None:
+            discard(record_id)
+            _clear_retry(record_id)
+            result["orphaned"] += 1
+        elif record.upload_status == STATUS_UPLOADED:
+            discard(record_id)
+            _clear_retry(record_id)
+            result["cleaned"] += 1
+        elif (ext.redis_client.zscore(RETRY_KEY, record_id) or 0) > now:
+            result["backoff"] += 1
+        else:
+            _clear_retry(record_id)
+            os.utime(spool_path(record_id))
+            if enqueue(record_id):
+                result["requeued"] += 1
+    return result
+
+
+def stats() -> dict:
+    """背压指标：暂存目录积压、在途上传数与累计计数"""
+    counts = {k: int(v) for k, v in ext.redis_client.hgetall(STATS_KEY).items()}
+    ext.redis_client.zremrangebyscore(INFLIGHT_KEY, '-inf', int(time.time() * 1000))
+    return dict(spool_usage(),
+                inflight=ext.redis_client.zcard(INFLIGHT_KEY),
+                concurrency=int(current_app.config.get("AUDIO_UPLOAD_CONCURRENCY", 8)),
+                max_bytes=int(current_app.config.get("AUDIO_SPOOL_MAX_BYTES", 2 * 1024 ** 3)),
+                **counts)
@@ -0,0 +1,80 @@
+# 熔断器：下游持续失败时快速失败，避免 worker 被拖死
+
+# app/utils/circuit_breaker.py
+
+"""
+三种状态：
+  closed    ：正常放行，统计连续失败次数
+  open      ：连续失败达到阈值后打开，cooldown 秒内所有调用直接失败
+  half_open ：冷却结束后只放行一个探测请求，成功则关闭，失败则重新打开
+"""
+
+import time
+import threading
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name              = name
+        self.failure_threshold = failure_threshold
+        self.cooldown          = cooldown
+        self._lock      = threading.Lock()
+        self._state     = "closed"
+        self._failures  = 0
+        self._opened_at = 0.0
+        self._probing   = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self):
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state   = "half_open"
+            self._probing = False
+
+    def before_call(self):
+        """调用前检查；被拒绝时抛出 CircuitOpenError"""
+        with self._lock:
+            self._refresh()
+            if self._state == "open":
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            if self._state == "half_open":
+                if self._probing:
+                    raise CircuitOpenError(f"{self.name} circuit is half-open, probe in progress")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state    = "closed"
+            self._failures = 0
+            self._probing  = False
+
+    def record_neutral(self):
+        """调用被取消或结果与下游健康无关（如流控）：不改变状态，只归还半开探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._state     = "open"
+                self._opened_at = time.monotonic()
+                self._probing   = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "name":     self.name,
+                "state":    self._state,
+                "failures": self._failures,
+            }
@@ -0,0 +1,56 @@
+# 目录占用字节数：进程内计数 + 定期全量扫描校准
+
+# app/utils/dir_usage.py
+
+"""
+暂存目录的容量上限要在每个上传请求里检查，逐个 stat 整个目录的代价随积压线性增长。
+这里在进程内维护一个字节计数：
+  - 首次使用及每隔 refresh 秒全量扫描一次（校准其他进程 / worker 写入、删除造成的偏差）
+  - 两次扫描之间由本进程的写入、删除增减计数
+同一目录被多个进程共享时，两次扫描之间看不到其他进程删除的文件，计数只会偏大，背压偏保守。
+"""
+
+import time
+import threading
+
+
+class DirectoryUsage:
+
+    def __init__(self, scan):
+        """scan：返回目录当前总字节数的函数"""
+        self._scan       = scan
+        self._bytes      = 0
+        self._scanned_at = None
+        self._lock       = threading.Lock()
+
+    def _refresh(self, refresh: float):
+        now = time.monotonic()
+        if self._scanned_at is None or now - self._scanned_at >= refresh:
+            self._bytes      = self._scan()
+            self._scanned_at = now
+
+    def total(self, refresh: float) -> int:
+        """当前估计的总字节数；距上次扫描超过 refresh 秒时重新扫描"""
+        with self._lock:
+            self._refresh(refresh)
+            return self._bytes
+
+    def try_add(self, delta: int, limit: int, refresh: float) -> bool:
+        """总量加上 delta 不超过 limit 时计入并返回 True，否则不变并返回 False（检查与计入在同一把锁内）"""
+        with self._lock:
+            self._refresh(refresh)
+            if self._bytes + delta > limit:
+                return False
+            self._bytes += delta
+            return True
+
+    def add(self, delta: int):
+        """本进程写入（正数）或删除（负数）的字节数；尚未扫描过时忽略，首次 total() 会扫描"""
+        with self._lock:
+            if self._scanned_at is not None:
+                self._bytes = max(0, self._bytes + delta)
+
+    def invalidate(self):
+        """下次 total() 强制重新扫描"""
+        with self._lock:
+            self._scanned_at = None
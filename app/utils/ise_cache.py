@@ -0,0 +1,96 @@
+# 讯飞评测结果缓存（内容寻址）
+
+# app/utils/ise_cache.py
+
+"""
+同一段音频 + 同一题干 + 同一组评测参数，讯飞返回的分数是确定的，
+客户端重试、用户重复点击"评测"、QA 回放任务都不必再开一次 WebSocket 会话。
+
+缓存结构（Redis）：
+  ise_cache:{sha256}   → 解析后的 { summary, words } JSON，带 TTL
+  ise_cache:index      → ZSET，member=sha256，score=写入时间；超出条目上限时淘汰最旧的
+  ise_cache:hits / ise_cache:misses → 命中统计
+"""
+
+import json
+import time
+import hashlib
+from flask import current_app
+import app.extensions as ext
+from app.utils.xunfei import ISE_PARAMS
+
+KEY_PREFIX = "ise_cache:"
+INDEX_KEY  = "ise_cache:index"
+HITS_KEY   = "ise_cache:hits"
+MISSES_KEY = "ise_cache:misses"
+
+
+def make_key(audio_bytes: bytes, text: str, params: dict = None) -> str:
+    """
+    计算缓存键：sha256(转码后 PCM) + 题干 + 评测参数
+    参数以排序后的 JSON 参与哈希，保证顺序无关。
+    """
+    h = hashlib.sha256()
+    h.update(audio_bytes)
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(params if params is not None else ISE_PARAMS,
+                        sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _enabled() -> bool:
+    return bool(current_app.config.get("ISE_CACHE_ENABLED", True)) and ext.redis_client is not None
+
+
+def get(digest: str):
+    """命中返回 dict，未命中或 Redis 异常返回 None（缓存故障不影响评测）"""
+    if not _enabled():
+        return None
+    try:
+        raw = ext.redis_client.get(KEY_PREFIX + digest)
+        ext.redis_client.incr(HITS_KEY if raw is not None else MISSES_KEY)
+    except Exception:
+        current_app.logger.warning("ISE cache read failed", exc_info=True)
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def put(digest: str, result: dict):
+    """写入缓存并按条目上限淘汰最旧的记录"""
+    if not _enabled():
+        return
+    ttl         = int(current_app.config.get("ISE_CACHE_TTL", 7 * 24 * 3600))
+    max_entries = int(current_app.config.get("ISE_CACHE_MAX_ENTRIES", 50000))
+    payload     = json.dumps(result, ensure_ascii=False)
+    try:
+        pipe = ext.redis_client.pipeline()
+        pipe.setex(KEY_PREFIX + digest, ttl, payload)
+        pipe.zadd(INDEX_KEY, {digest: time.time()})
+        # 顺带清理索引里已经因 TTL 过期的成员
+        pipe.zremrangebyscore(INDEX_KEY, 0, time.time() - ttl)
+        pipe.zcard(INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        overflow = size - max_entries
+        if overflow > 0:
+            evicted = [member for member, _ in ext.redis_client.zpopmin(INDEX_KEY, overflow)]
+            if evicted:
+                ext.redis_client.delete(*(KEY_PREFIX + d for d in evicted))
+    except Exception:
+        current_app.logger.warning("ISE cache write failed", exc_info=True)
+
+
+def stats() -> dict:
+    """命中率统计，供运维查看"""
+    hits, misses = ext.redis_client.mget(HITS_KEY, MISSES_KEY)
+    hits, misses = int(hits or 0), int(misses or 0)
+    size = ext.redis_client.zcard(INDEX_KEY)
+    total = hits + misses
+    return {
+        "hits":     hits,
+        "misses":   misses,
+        "entries":  size,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,245 @@
+# 讯飞评测集群级并发控制（Redis 分布式信号量 + 公平排队）
+
+# app/utils/ise_governor.py
+
+"""
+讯飞按 APPID 限制并发连接数，而每个 Flask / Celery worker 各自调用 websocket_thread，
+突发流量下很容易超过配额，最终表现为 "Evaluation failed"。
+这里把配额变成集群共享的信号量，超出的请求在 Redis 中排队等待：
+
+  ise_gov:holders       ZSET  member=ticket, score=租约到期时间(ms)   —— 正在占用的会话
+  ise_gov:waiting       ZSET  member=ticket, score=排队优先级         —— 等待队列
+  ise_gov:deadlines     ZSET  member=ticket, score=截止时间(ms)       —— 过期自动出队
+  ise_gov:user_waiting  HASH  user → 该用户排队中的请求数
+  ise_gov:avg_ms        STRING 会话耗时 EWMA，用于估算等待时间
+
+公平性：ticket 的优先级 = 该用户已在排队的请求数 × 1e13 + 入队时间，
+即每个用户的第 1 个请求先于任何用户的第 2 个请求，实现按用户轮转。
+截止感知：入队时按 (队列位置 / 并发上限) × 平均会话耗时 估算等待时间，
+超过调用方截止时间的直接拒绝，不再白等。
+worker 崩溃时，占用的租约与排队的 ticket 都会按时间自动清理。
+
+对冲会话（见 xunfei_async._hedged_attempt）同样计入上限：ise_slot 产出的 IseSlot
+可以不排队地再申请一个许可（try_extra），只有空闲配额多于排队人数时才批准，否则放弃对冲。
+"""
+
+import time
+import random
+from contextlib import contextmanager
+from flask import current_app
+import app.extensions as ext
+from app.utils.id_generator import gen_nanoid
+
+HOLDERS_KEY      = "ise_gov:holders"
+WAITING_KEY      = "ise_gov:waiting"
+DEADLINES_KEY    = "ise_gov:deadlines"
+USER_WAITING_KEY = "ise_gov:user_waiting"
+AVG_KEY          = "ise_gov:avg_ms"
+REJECTED_KEY     = "ise_gov:rejected"
+
+# 公共清理逻辑：过期租约、过期排队 ticket（同时回收用户计数）
+_CLEANUP_LUA = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+for _, t in ipairs(expired) do
+    if redis.call('ZREM', KEYS[2], t) == 1 then
+        local user = string.match(t, '^(.-)|')
+        if user then redis.call('HINCRBY', KEYS[4], user, -1) end
+    end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+"""
+
+# KEYS: holders, waiting, deadlines, user_waiting
+# ARGV: now, ticket, user（与 ticket 前缀一致，出队时据此回收计数）, deadline
+_ENQUEUE_LUA = _CLEANUP_LUA + """
+local rank = tonumber(redis.call('HINCRBY', KEYS[4], ARGV[3], 1)) - 1
+if rank < 0 then rank = 0 end
+redis.call('ZADD', KEYS[2], rank * 1e13 + now, ARGV[2])
+redis.call('ZADD', KEYS[3], tonumber(ARGV[4]), ARGV[2])
+return redis.call('ZRANK', KEYS[2], ARGV[2])
+"""
+
+# KEYS: holders, waiting, deadlines, user_waiting
+# ARGV: now, ticket, limit, lease_ms
+# 返回 1=获得许可，0=继续等待，-1=ticket 已过期
+_ACQUIRE_LUA = _CLEANUP_LUA + """
+local ticket = ARGV[2]
+if redis.call('ZSCORE', KEYS[2], ticket) == false then return -1 end
+local free = tonumber(ARGV[3]) - redis.call('ZCARD', KEYS[1])
+if free <= 0 then return 0 end
+if redis.call('ZRANK', KEYS[2], ticket) < free then
+    redis.call('ZREM', KEYS[2], ticket)
+    redis.call('ZREM', KEYS[3], ticket)
+    local user = string.match(ticket, '^(.-)|')
+    if user then redis.call('HINCRBY', KEYS[4], user, -1) end
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ticket)
+    return 1
+end
+return 0
+"""
+
+# KEYS: holders, waiting, deadlines, user_waiting
+# ARGV: now, ticket, limit, lease_ms
+# 额外会话不排队、不插队：空闲配额须多于排队中的请求数，返回 1=获得许可，0=放弃
+_TRY_EXTRA_LUA = _CLEANUP_LUA + """
+local free = tonumber(ARGV[3]) - redis.call('ZCARD', KEYS[1]) - redis.call('ZCARD', KEYS[2])
+if free <= 0 then return 0 end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[2])
+return 1
+"""
+
+# KEYS: waiting, deadlines, user_waiting ; ARGV: ticket
+_CANCEL_LUA = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    local user = string.match(ARGV[1], '^(.-)|')
+    if user then redis.call('HINCRBY', KEYS[3], user, -1) end
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+"""
+
+
+class SlotUnavailable(Exception):
+    """在截止时间内没能拿到讯飞会话配额"""
+
+
+_scripts = {}
+
+
+def _script(name: str, source: str):
+    # 按 Redis 客户端缓存已注册的脚本（fork 后 redis_client 会重新创建）
+    client = ext.redis_client
+    cached = _scripts.get(name)
+    if cached is None or cached[0] is not client:
+        cached = (client, client.register_script(source))
+        _scripts[name] = cached
+    return cached[1]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _keys() -> list:
+    return [HOLDERS_KEY, WAITING_KEY, DEADLINES_KEY, USER_WAITING_KEY]
+
+
+def _record_duration(elapsed_ms: float):
+    """更新会话耗时 EWMA（alpha=0.2）"""
+    try:
+        prev = ext.redis_client.get(AVG_KEY)
+        avg  = elapsed_ms if prev is None else 0.8 * float(prev) + 0.2 * elapsed_ms
+        ext.redis_client.set(AVG_KEY, int(avg))
+    except Exception:
+        current_app.logger.warning("Failed to record ISE session duration", exc_info=True)
+
+
+class IseSlot:
+    """
+    ise_slot 已获得的许可；对冲等额外会话通过 try_extra() 再申请一个，用完 release_extra()。
+    两者只访问 Redis，不依赖 Flask 上下文，可在评测事件循环的线程池中调用。
+    """
+
+    def __init__(self, user: str, limit: int, lease_ms: int):
+        self.user     = user
+        self.limit    = limit
+        self.lease_ms = lease_ms
+
+    def try_extra(self):
+        """不排队地申请一个额外许可，成功返回 ticket，配额已满或 Redis 异常返回 None"""
+        ticket = f"{self.user}|{gen_nanoid()}"
+        try:
+            granted = _script("try_extra", _TRY_EXTRA_LUA)(
+                keys=_keys(), args=[_now_ms(), ticket, self.limit, self.lease_ms])
+        except Exception:
+            return None
+        return ticket if granted == 1 else None
+
+    def release_extra(self, ticket: str):
+        ext.redis_client.zrem(HOLDERS_KEY, ticket)
+
+
+@contextmanager
+def ise_slot(user: str, timeout: float = None):
+    """
+    获取一个集群级讯飞会话许可，退出时释放：
+
+        with ise_slot(user_id) as slot:
+            xml = websocket_thread(..., extra_slots=slot)
+
+    产出 IseSlot（未启用并发控制时为 None，对冲不受限制）。
+
+    user    ：公平排队的维度（用户 ID，匿名请求可用客户端 IP）
+    timeout ：最长排队秒数，默认 ISE_QUEUE_TIMEOUT；超时抛出 SlotUnavailable
+    """
+    cfg = current_app.config
+    if not cfg.get("ISE_GOVERNOR_ENABLED", True):
+        yield
+        return
+
+    limit    = int(cfg.get("XUNFEI_MAX_CONCURRENCY", 50))
+    lease_ms = int(float(cfg.get("ISE_SLOT_LEASE", 120)) * 1000)
+    timeout  = float(cfg.get("ISE_QUEUE_TIMEOUT", 10) if timeout is None else timeout)
+
+    name     = (user or 'anonymous').replace('|', '_')
+    ticket   = f"{name}|{gen_nanoid()}"
+    deadline = _now_ms() + int(timeout * 1000)
+
+    position = _script("enqueue", _ENQUEUE_LUA)(
+        keys=_keys(), args=[_now_ms(), ticket, name, deadline])
+
+    # 截止感知：预计等待时间已超过截止时间则直接拒绝
+    avg_ms = ext.redis_client.get(AVG_KEY)
+    if avg_ms is not None and position >= limit:
+        expected_ms = (position // limit) * float(avg_ms)
+        if expected_ms > timeout * 1000:
+            _script("cancel", _CANCEL_LUA)(
+                keys=[WAITING_KEY, DEADLINES_KEY, USER_WAITING_KEY], args=[ticket])
+            ext.redis_client.incr(REJECTED_KEY)
+            raise SlotUnavailable(f"ISE queue too long (position {position})")
+
+    acquire = _script("acquire", _ACQUIRE_LUA)
+    delay = 0.02
+    try:
+        while True:
+            status = acquire(keys=_keys(), args=[_now_ms(), ticket, limit, lease_ms])
+            if status == 1:
+                break
+            if status == -1 or _now_ms() >= deadline:
+                ext.redis_client.incr(REJECTED_KEY)
+                raise SlotUnavailable("Timed out waiting for an ISE slot")
+            # 指数退避 + 抖动，避免大量等待者同时轮询 Redis
+            time.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, 0.25)
+    except SlotUnavailable:
+        _script("cancel", _CANCEL_LUA)(
+            keys=[WAITING_KEY, DEADLINES_KEY, USER_WAITING_KEY], args=[ticket])
+        raise
+
+    started = time.monotonic()
+    try:
+        yield IseSlot(name, limit, lease_ms)
+    finally:
+        ext.redis_client.zrem(HOLDERS_KEY, ticket)
+        _record_duration((time.monotonic() - started) * 1000)
+
+
+def queue_stats() -> dict:
+    """当前集群评测并发与排队情况"""
+    now  = _now_ms()
+    pipe = ext.redis_client.pipeline()
+    pipe.zcount(HOLDERS_KEY, now, "+inf")
+    pipe.zcount(DEADLINES_KEY, now, "+inf")
+    pipe.hgetall(USER_WAITING_KEY)
+    pipe.get(AVG_KEY)
+    pipe.get(REJECTED_KEY)
+    active, waiting, per_user, avg_ms, rejected = pipe.execute()
+    return {
+        "limit":          int(current_app.config.get("XUNFEI_MAX_CONCURRENCY", 50)),
+        "active":         active,
+        "waiting":        waiting,
+        "waiting_users":  sum(1 for v in per_user.values() if int(v) > 0),
+        "avg_session_ms": int(float(avg_ms)) if avg_ms is not None else None,
+        "rejected":       int(rejected or 0),
+    }
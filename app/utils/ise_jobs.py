@@ -0,0 +1,87 @@
+# 异步评测任务状态存储（Redis）
+
+# app/utils/ise_jobs.py
+
+"""
+任务状态保存在 Redis 哈希 ise_job:{job_id} 中：
+  status     : queued / running / done / failed
+  result     : 成功时为 { summary, words } 的 JSON；录音质量预检不通过时为 { reason, metrics }
+  error      : 失败时的错误信息
+  code       : 失败时的状态码（与 Result 一致）
+  created_at / updated_at
+
+每次状态变化同时 PUBLISH 到 ise_job:{job_id}:events，供 SSE 接口实时推送。
+"""
+
+import json
+import time
+from flask import current_app
+import app.extensions as ext
+
+JOB_PREFIX = "ise_job:"
+
+# 终态：到达后 SSE 流结束
+FINAL_STATES = ("done", "failed")
+
+
+def _job_key(job_id: str) -> str:
+    return JOB_PREFIX + job_id
+
+
+def channel(job_id: str) -> str:
+    return JOB_PREFIX + job_id + ":events"
+
+
+def _ttl() -> int:
+    return int(current_app.config.get("ISE_JOB_TTL", 3600))
+
+
+def create_job(job_id: str, question_id: str):
+    now = time.time()
+    key = _job_key(job_id)
+    pipe = ext.redis_client.pipeline()
+    pipe.hset(key, mapping={
+        "status":      "queued",
+        "question_id": question_id,
+        "created_at":  now,
+        "updated_at":  now,
+    })
+    pipe.expire(key, _ttl())
+    pipe.execute()
+
+
+def update_job(job_id: str, status: str, result: dict = None,
+               error: str = None, code: int = None):
+    """更新任务状态并广播；在 Celery worker 中调用"""
+    key = _job_key(job_id)
+    fields = {"status": status, "updated_at": time.time()}
+    if result is not None:
+        fields["result"] = json.dumps(result, ensure_ascii=False)
+    if error is not None:
+        fields["error"] = error
+    if code is not None:
+        fields["code"] = code
+
+    pipe = ext.redis_client.pipeline()
+    pipe.hset(key, mapping=fields)
+    pipe.expire(key, _ttl())
+    pipe.publish(channel(job_id), status)
+    pipe.execute()
+
+
+def get_job(job_id: str):
+    """返回任务快照 dict，不存在（或已过期）返回 None"""
+    raw = ext.redis_client.hgetall(_job_key(job_id))
+    if not raw:
+        return None
+    job = {
+        "job_id":      job_id,
+        "status":      raw.get("status"),
+        "question_id": raw.get("question_id"),
+    }
+    if "result" in raw:
+        job["result"] = json.loads(raw["result"])
+    if "error" in raw:
+        job["error"] = raw["error"]
+        job["code"]  = int(raw.get("code", 500))
+    return job
@@ -0,0 +1,99 @@
+# 讯飞 ISE 音频上传节奏控制
+
+# app/utils/ise_pacing.py
+
+"""
+原实现每 1280 字节固定 sleep 40ms，即严格按录音时长实时上传。
+这里把"帧间隔"抽象成可选的节奏模式：
+  - realtime：按音频时长实时发送（与原实现等价）
+  - burst   ：按 XUNFEI_BURST_SPEEDUP 倍速发送（讯飞要求的上限通过配置给出）
+  - adaptive：在 1 倍速与 burst 倍速之间自适应（AIMD）
+              会话成功则逐步加速，出现错误码 / 连接异常则减半回退
+"""
+
+import threading
+from app.config import get_config
+
+# 16kHz、16bit、单声道 PCM 每秒字节数
+BYTES_PER_SECOND = 16000 * 2
+
+PACING_MODES = ("realtime", "burst", "adaptive")
+
+
+
+class Pacer:
+    """
+    计算每帧之间的发送间隔。
+    同一进程内所有会话共享一个 Pacer，adaptive 模式据此汇总服务端反馈。
+    """
+
+    def __init__(self, mode: str = "adaptive",
+                 frame_bytes: int = 1280,
+                 burst_speedup: float = 4.0,
+                 step: float = 0.25):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode: {mode}")
+        self.mode          = mode
+        self.frame_bytes   = frame_bytes
+        self.burst_speedup = max(1.0, burst_speedup)
+        self.step          = step
+        self._lock    = threading.Lock()
+        # adaptive 从实时速度起步，逐步试探
+        self._speedup = 1.0 if mode == "adaptive" else self._fixed_speedup()
+
+    def _fixed_speedup(self) -> float:
+        return self.burst_speedup if self.mode == "burst" else 1.0
+
+    @property
+    def speedup(self) -> float:
+        return self._speedup
+
+    def interval(self, frame_len: int = None) -> float:
+        """返回发送一帧 PCM 后需要等待的秒数"""
+        frame_len = self.frame_bytes if frame_len is None else frame_len
+        return self.delay(frame_len / BYTES_PER_SECOND)
+
+    def delay(self, audio_seconds: float) -> float:
+        """发送一段时长为 audio_seconds 的音频（任意编码）后需要等待的秒数"""
+        return audio_seconds / self._speedup
+
+    def record_success(self):
+        """一次会话正常返回结果"""
+        if self.mode != "adaptive":
+            return
+        with self._lock:
+            self._speedup = min(self.burst_speedup, self._speedup + self.step)
+
+    def record_failure(self):
+        """服务端返回错误码或连接中断，倍速减半（不低于实时）"""
+        if self.mode != "adaptive":
+            return
+        with self._lock:
+            self._speedup = max(1.0, self._speedup / 2)
+
+    def stats(self) -> dict:
+        return {
+            "mode":        self.mode,
+            "frame_bytes": self.frame_bytes,
+            "speedup":     round(self._speedup, 3),
+        }
+
+
+_pacer = None
+_pacer_lock = threading.Lock()
+
+
+def get_pacer() -> Pacer:
+    """进程级共享 Pacer，按 app/config.py（XUNFEI_PACING_MODE 等）懒创建"""
+    global _pacer
+    if _pacer is None:
+        with _pacer_lock:
+            if _pacer is None:
+                cfg = get_config()
+                _pacer = Pacer(
+                    mode          = cfg.XUNFEI_PACING_MODE,
+                    frame_bytes   = cfg.XUNFEI_FRAME_BYTES,
+                    burst_speedup = cfg.XUNFEI_BURST_SPEEDUP,
+                    step          = cfg.XUNFEI_ADAPTIVE_STEP,
+                )
+    return _pacer
@@ -0,0 +1,199 @@
+# 讯飞 ISE 评测结果 XML 专用解析器
+
+# app/utils/ise_parser.py
+
+"""
+原流程先用 etree_to_dict 把整棵 XML 递归转成通用 dict，再在视图里层层 .get() 取值，
+且只处理了单句（sentence 为 dict）的情况，音节 / 音素信息全部丢弃。
+
+这里只沿 rec_paper 下的固定路径
+  read_chapter → sentence → word → syll → phone
+直接读取属性构造紧凑的 NamedTuple 记录，不生成任何中间 dict，并支持多句结果。
+解析本身使用 C 实现的 ET.fromstring：实测 iterparse 的逐事件回调在这种
+几百 KB、元素密集的文档上反而比一次性建树更慢（见 app/scrips/bench_ise_parser.py）。
+
+XML 结构示例（en_vip / read_sentence）：
+  <xml_result><read_sentence><rec_paper>
+    <read_chapter total_score=".." accuracy_score=".." ...>
+      <sentence index="0" ...>
+        <word content="hello" global_index="0" total_score=".." dp_message="0" ...>
+          <syll content="hh ax" syll_score=".." ...>
+            <phone content="hh" dp_message="0" beg_pos=".." end_pos=".."/>
+"""
+
+import base64
+import binascii
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Tuple
+
+class Phone(NamedTuple):
+    content:    str
+    beg_pos:    int     # 讯飞时间单位为帧（10ms）
+    end_pos:    int
+    dp_message: int     # 0 正常 16 漏读 32 增读 64 回读 128 替换
+
+
+class Syllable(NamedTuple):
+    content: str
+    score:   float
+    beg_pos: int
+    end_pos: int
+    phones:  Tuple[Phone, ...]
+
+
+class Word(NamedTuple):
+    content:        str
+    total_score:    float
+    accuracy_score: float
+    fluency_score:  float
+    global_index:   int
+    sentence_index: int
+    dp_message:     int
+    beg_pos:        int
+    end_pos:        int
+    syllables:      Tuple[Syllable, ...]
+
+
+class Summary(NamedTuple):
+    total_score:     float
+    standard_score:  float
+    fluency_score:   float
+    accuracy_score:  float
+    integrity_score: float
+    is_rejected:     bool = False   # 讯飞判定为乱读 / 无效录音，分数不可信
+    except_info:     int  = 0       # 异常码：28673 无语音或音量小、28676 乱读、28680 信噪比低、28690 截幅
+
+
+class IseResult(NamedTuple):
+    summary: Summary
+    words:   Tuple[Word, ...]
+
+    def to_dict(self, detail: bool = False) -> dict:
+        """
+        转为接口返回格式；字段与原有 summary / words 保持一致。
+        detail=True 时每个词额外带上 syllables（含 phones）。
+        """
+        words = []
+        for w in self.words:
+            item = {
+                'text':         w.content,
+                'score':        w.total_score,
+                'accuracy':     w.accuracy_score,
+                'fluency':      w.fluency_score,
+                'global_index': w.global_index,
+            }
+            if detail:
+                item['sentence_index'] = w.sentence_index
+                item['dp_message']     = w.dp_message
+                item['beg_pos']        = w.beg_pos
+                item['end_pos']        = w.end_pos
+                item['syllables'] = [{
+                    'content': s.content,
+                    'score':   s.score,
+                    'beg_pos': s.beg_pos,
+                    'end_pos': s.end_pos,
+                    'phones':  [p._asdict() for p in s.phones],
+                } for s in w.syllables]
+            words.append(item)
+        return {
+            'summary': self.summary._asdict(),
+            'words':   words,
+        }
+
+
+def _f(attrib: dict, name: str) -> float:
+    try:
+        return float(attrib.get(name, 0))
+    except ValueError:
+        return 0.0
+
+
+def _i(attrib: dict, name: str) -> int:
+    try:
+        return int(attrib.get(name, 0))
+    except ValueError:
+        return 0
+
+
+def _to_bytes(xml_b64_or_str) -> bytes:
+    """讯飞 data.data 一般为 Base64；若不是合法 Base64 则当作原始 XML"""
+    if isinstance(xml_b64_or_str, bytes):
+        raw = xml_b64_or_str
+    else:
+        raw = xml_b64_or_str.encode('utf-8')
+    if raw.lstrip().startswith(b'<'):
+        return raw
+    try:
+        return base64.b64decode(raw, validate=True)
+    except (binascii.Error, ValueError):
+        return raw
+
+
+def _phones(syll) -> Tuple[Phone, ...]:
+    return tuple(
+        Phone(
+            content    = at.get('content', ''),
+            beg_pos    = _i(at, 'beg_pos'),
+            end_pos    = _i(at, 'end_pos'),
+            dp_message = _i(at, 'dp_message'),
+        )
+        for at in (p.attrib for p in syll.iter('phone'))
+    )
+
+
+def _syllables(word) -> Tuple[Syllable, ...]:
+    result = []
+    for syll in word.iter('syll'):
+        at = syll.attrib
+        result.append(Syllable(
+            content = at.get('content', ''),
+            score   = _f(at, 'syll_score'),
+            beg_pos = _i(at, 'beg_pos'),
+            end_pos = _i(at, 'end_pos'),
+            phones  = _phones(syll),
+        ))
+    return tuple(result)
+
+
+def parse(xml_b64_or_str, detail: bool = True) -> IseResult:
+    """
+    解析讯飞返回的 data.data，返回 IseResult。
+    detail=False 时跳过音节 / 音素记录的构造（Word.syllables 为空元组）。
+    XML 非法时抛出 xml.etree.ElementTree.ParseError。
+    """
+    root  = ET.fromstring(_to_bytes(xml_b64_or_str))
+    paper = root if root.tag == 'rec_paper' else next(root.iter('rec_paper'), None)
+    chapter = paper.find('read_chapter') if paper is not None else None
+    if chapter is None:
+        return IseResult(summary=Summary(0.0, 0.0, 0.0, 0.0, 0.0), words=())
+
+    at = chapter.attrib
+    summary = Summary(
+        total_score     = _f(at, 'total_score'),
+        standard_score  = _f(at, 'standard_score'),
+        fluency_score   = _f(at, 'fluency_score'),
+        accuracy_score  = _f(at, 'accuracy_score'),
+        integrity_score = _f(at, 'integrity_score'),
+        is_rejected     = at.get('is_rejected') == 'true',
+        except_info     = _i(at, 'except_info'),
+    )
+
+    words = []
+    for sentence in chapter.iter('sentence'):
+        sentence_index = _i(sentence.attrib, 'index')
+        for word in sentence.iter('word'):
+            at = word.attrib
+            words.append(Word(
+                content        = at.get('content', ''),
+                total_score    = _f(at, 'total_score'),
+                accuracy_score = _f(at, 'accuracy_score'),
+                fluency_score  = _f(at, 'fluency_score'),
+                global_index   = _i(at, 'global_index'),
+                sentence_index = sentence_index,
+                dp_message     = _i(at, 'dp_message'),
+                beg_pos        = _i(at, 'beg_pos'),
+                end_pos        = _i(at, 'end_pos'),
+                syllables      = _syllables(word) if detail else (),
+            ))
+
+    return IseResult(summary=summary, words=tuple(words))
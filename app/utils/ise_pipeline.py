@@ -0,0 +1,160 @@
+# 讯飞评测流水线：解码重采样 → 质量预检 → 静音裁剪 → 缓存 → WebSocket 评测 → 解析
+
+# app/utils/ise_pipeline.py
+
+"""
+把 /api/evaluate/ise 的处理流程从视图中抽出来，
+同步接口与 Celery 异步任务共用同一套实现。
+出错时抛出 EvaluationError，由调用方映射为 Result.error 或任务失败状态。
+"""
+
+import xml.etree.ElementTree as ET
+from flask import current_app
+import app.extensions as ext
+from app.utils import audio
+from app.utils import vad
+from app.utils import audio_quality
+from app.utils.xunfei import websocket_thread
+from app.utils import ise_parser
+from app.utils import ise_cache
+from app.utils.ise_governor import ise_slot, SlotUnavailable
+from app.utils.xunfei_async import IseUnavailable
+
+
+TRANSCODE_STATS_KEY = "audio:transcode_stats"   # HASH：passthrough / transcoded 计数
+
+
+class EvaluationError(Exception):
+    """评测流程中的业务错误，code 与 Result 的状态码一致"""
+
+    def __init__(self, code: int, msg: str, data: dict = None):
+        super().__init__(msg)
+        self.code = code
+        self.msg  = msg
+        self.data = data
+
+
+def _count_transcode(field: str):
+    """快速路径命中统计，Redis 故障不影响评测"""
+    if ext.redis_client is None:
+        return
+    try:
+        ext.redis_client.hincrby(TRANSCODE_STATS_KEY, field, 1)
+    except Exception:
+        current_app.logger.warning("Failed to record transcode stats", exc_info=True)
+
+
+def transcode_to_pcm(wav_bytes: bytes) -> bytes:
+    """
+    把任意采样率／声道的上传音频转为 16kHz 单声道 PCM 数据。
+    已经是 16kHz 单声道 16 位 PCM 的 WAV 只嗅探头部、直接切出数据块（快速路径）；
+    其余进程内解码与重采样（见 app/utils/audio.py），仅特殊格式回退 ffmpeg。
+    """
+    pcm = audio.passthrough_pcm16(wav_bytes)
+    if pcm is not None:
+        _count_transcode("passthrough")
+        return pcm
+
+    _count_transcode("transcoded")
+    try:
+        return audio.to_pcm16(audio.load_audio(wav_bytes))
+    except audio.AudioDecodeError:
+        raise EvaluationError(500, "Audio transcoding failed")
+
+
+def transcode_stats() -> dict:
+    """快速路径命中率，供 /ise/queue 查看"""
+    raw = ext.redis_client.hgetall(TRANSCODE_STATS_KEY)
+    passthrough = int(raw.get("passthrough", 0))
+    transcoded  = int(raw.get("transcoded", 0))
+    total = passthrough + transcoded
+    return {
+        "passthrough": passthrough,
+        "transcoded":  transcoded,
+        "hit_rate":    round(passthrough / total, 4) if total else 0.0,
+    }
+
+
+def prepare_pcm(pcm: bytes):
+    """
+    16kHz PCM → 质量预检 → 去掉首尾静音，返回 (PCM, vad.SpeechSpan)。
+    录音不合格时抛出 EvaluationError(422)，data 为 { reason, metrics }，不会调用讯飞。
+    VAD_ENABLED=False 时只统计语音时长，不裁剪。
+    """
+    samples = vad.pcm16_to_float(pcm)
+    span    = vad.detect(samples, **vad.config_options())
+    if audio_quality.enabled():
+        report = audio_quality.assess(samples, span)
+        if report.reason:
+            audio_quality.record_rejection(report.reason)
+            raise EvaluationError(422, report.message, data=report.to_dict())
+    if vad.enabled():
+        pcm = pcm[span.start * 2:span.end * 2]
+    return pcm, span
+
+
+def parse_ise_result(xml_b64_or_str: str, detail: bool = False) -> dict:
+    """
+    讯飞返回的 data.data → { summary, words }
+    detail=True 时 words 中附带 syllables / phones 明细。
+    """
+    try:
+        return ise_parser.parse(xml_b64_or_str, detail=detail).to_dict(detail=detail)
+    except ET.ParseError:
+        raise EvaluationError(500, "Invalid evaluation result")
+
+
+def _has_detail(result: dict) -> bool:
+    return all('syllables' in w for w in result['words'])
+
+
+def strip_detail(result: dict) -> dict:
+    """去掉逐词的音节 / 音素明细，只保留原有字段"""
+    return {
+        'summary': result['summary'],
+        'words': [{k: w[k] for k in ('text', 'score', 'accuracy', 'fluency', 'global_index')}
+                  for w in result['words']],
+    }
+
+
+def evaluate_pcm(audio_bytes: bytes, text: str, client_id: str = None,
+                 detail: bool = False) -> dict:
+    """
+    16kHz 单声道 PCM → { summary, words }
+    先查内容寻址缓存，未命中再在集群并发配额内调用讯飞并回写缓存。
+    client_id 为公平排队的维度（用户 ID 或客户端 IP）；
+    detail=True 时逐词返回音节 / 音素明细。带明细的缓存条目可同时服务两种请求，
+    不带明细的条目遇到 detail 请求时视为未命中。
+    """
+    cache_key = ise_cache.make_key(audio_bytes, text)
+    cached = ise_cache.get(cache_key)
+    if cached is not None:
+        if not detail:
+            return strip_detail(cached)
+        if _has_detail(cached):
+            return cached
+
+    try:
+        with ise_slot(client_id) as slot:
+            xml_b64_or_str = websocket_thread(audio_bytes, text, extra_slots=slot)
+    except SlotUnavailable:
+        raise EvaluationError(503, "Evaluation service busy, please retry later")
+    except IseUnavailable:
+        raise EvaluationError(503, "Evaluation service temporarily unavailable")
+    if not xml_b64_or_str:
+        raise EvaluationError(500, "Evaluation failed")
+
+    result = parse_ise_result(xml_b64_or_str, detail)
+    ise_cache.put(cache_key, result)
+    return result
+
+
+def evaluate_wav(wav_bytes: bytes, text: str, client_id: str = None,
+                 detail: bool = False) -> dict:
+    """
+    上传的 WAV 原始字节 → 转码 → 质量预检 → 裁剪首尾静音 → 评测
+    返回的 dict 额外带 audio: { duration, speech_duration, trim_start, trim_end }（秒）。
+    """
+    pcm, span = prepare_pcm(transcode_to_pcm(wav_bytes))
+    result = evaluate_pcm(pcm, text, client_id, detail)
+    return dict(result, audio=span.to_dict())
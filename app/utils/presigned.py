@@ -6,16 +6,19 @@ from app.utils.obs_client import client as obs_client  # 已初始化的 ObsClie
 
 def generate_presigned_url(object_key: str,
                            method: str = 'GET',
-                           expires: int = 3600) -> str:
+                           expires: int = 3600,
+                           headers: dict = None) -> str:
     """
     通用签名 URL 生成器，仅返回签名 URL 字符串
+    headers 参与签名（如 PUT 的 Content-Type），客户端请求时必须带上完全相同的头
     """
     # 调用 OBS SDK 生成签名，resp 里包含 signedUrl 和 headers
     resp = obs_client.createSignedUrl(
         method     = method,
         bucketName = current_app.config['OBS_BUCKET'],
         objectKey  = object_key,
-        expires    = expires
+        expires    = expires,
+        headers    = headers
     )
 
     # SDK v1 返回 dict-like 或对象，取其 signedUrl 属性／键
@@ -9,20 +9,30 @@ class Result:
     常用响应状态码及含义：
       200 -> 成功
       201 -> 资源已创建
+      202 -> 已受理（异步处理中）
       400 -> 请求参数错误
       401 -> 身份验证失败
       403 -> 没有访问权限
       404 -> 资源未找到
+      409 -> 状态冲突（如分片上传偏移不一致）
+      422 -> 内容无法处理（如录音质量不合格）
+      429 -> 请求过多（过载保护，配合 Retry-After 响应头）
       500 -> 服务器内部错误
+      503 -> 服务繁忙，请稍后重试
     """
     CODE_MESSAGES = {
         200: "成功",
         201: "资源已创建",
+        202: "已受理",
         400: "请求参数错误",
         401: "身份验证失败",
         403: "没有访问权限",
         404: "资源未找到",
-        500: "服务器内部错误"
+        409: "状态冲突",
+        422: "内容无法处理",
+        429: "请求过多",
+        500: "服务器内部错误",
+        503: "服务繁忙"
     }
 
     def __init__(self, code: int = 200, msg: str = None, data=None):
@@ -47,6 +57,11 @@ class Result:
         """201 资源已创建"""
         return jsonify(Result(201, msg, data).to_dict())
 
+    @staticmethod
+    def accepted(data=None, msg: str = None):
+        """202 已受理，结果稍后获取"""
+        return jsonify(Result(202, msg, data).to_dict())
+
     @staticmethod
     def error(code: int, msg: str = None, data=None):
         """4xx/5xx 统一错误返回"""
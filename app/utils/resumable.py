@@ -0,0 +1,342 @@
+# 可续传的分片上传：分片落盘 + Redis 记录偏移
+
+# app/utils/resumable.py
+
+"""
+/api/evaluate/ise、/api/statistics/practice_records 都是一次性 multipart 上传，
+移动网络在 90% 处断开就得整段重传。分片上传协议（接口见 app/views/uploads.py）：
+
+  1. 创建：声明用途（purpose）、总字节数（length）与题目等参数，拿到 upload_id
+  2. 按偏移写入：PUT 时带 Upload-Offset，必须等于服务端已确认的偏移；
+     连接中途断开时已收到的字节照样落盘并推进偏移，客户端查询后从断点继续
+  3. 查询：返回服务端已确认的偏移
+  4. 收尾：偏移到达 length 后，把拼好的文件交给原有的评测 / 记录代码（见 PURPOSES）
+
+状态保存在 Redis 哈希 upload:{upload_id}：
+  purpose / length / offset / status / meta(JSON) / created_at，
+  以及收尾完成后的 result / result_status（重复收尾直接返回同一结果）
+  每次写入刷新 TTL（RESUMABLE_UPLOAD_TTL），过期未完成的上传由 cleanup() 删除残留文件
+分片写入 RESUMABLE_UPLOAD_DIR/{upload_id}.part：先截断到已确认偏移（丢弃上次崩溃时未确认的尾部），
+写入后 fsync 再推进 Redis 中的偏移，保证偏移之前的字节一定已落盘。
+创建时按声明的 length 在进程内字节计数（DirectoryUsage）中预留容量，每 RESUMABLE_UPLOAD_USAGE_REFRESH 秒全量扫描校准。
+
+同一上传的写入与收尾互斥（Redis 租约锁），客户端超时重发的分片不会与仍在写入的旧请求交错。
+分片目录必须是共享卷，或由负载均衡按 upload_id 粘滞到同一台主机。
+"""
+
+import os
+import json
+import time
+import uuid
+from flask import current_app
+from werkzeug.exceptions import ClientDisconnected
+import app.extensions as ext
+from app.utils.id_generator import gen_nanoid
+from app.utils.dir_usage import DirectoryUsage
+
+STATE_PREFIX = "upload:"
+
+# ise：只评测；record：评测并保存练习记录；practice_record：按客户端给出的评分保存练习记录
+PURPOSES = ("ise", "record", "practice_record")
+
+STATUS_UPLOADING  = "uploading"
+STATUS_FINALIZING = "finalizing"
+STATUS_FINALIZED  = "finalized"
+
+_READ_BLOCK = 64 * 1024
+
+# KEYS: lock ; ARGV: token
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+# KEYS: state ; ARGV: now, lease
+# 返回 1 开始收尾；0 已收尾；-1 不存在；-2 未传完；-3 其他请求正在收尾
+_BEGIN_FINALIZE_LUA = """
+local s = redis.call('HMGET', KEYS[1], 'status', 'offset', 'length', 'finalize_until')
+if not s[1] then return -1 end
+if s[1] == 'finalized' then return 0 end
+if s[1] == 'finalizing' and tonumber(s[4]) > tonumber(ARGV[1]) then return -3 end
+if tonumber(s[2]) ~= tonumber(s[3]) then return -2 end
+redis.call('HSET', KEYS[1], 'status', 'finalizing', 'finalize_until', tonumber(ARGV[1]) + tonumber(ARGV[2]))
+return 1
+"""
+
+
+class UploadNotFound(Exception):
+    """上传不存在或已过期"""
+
+
+class UploadBusy(Exception):
+    """同一上传的另一个请求正在写入或收尾"""
+
+
+class OffsetMismatch(Exception):
+    """客户端给出的偏移与服务端已确认的偏移不一致"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload offset mismatch, expected {offset}")
+        self.offset = offset
+
+
+class Incomplete(Exception):
+    """尚未传完就请求收尾"""
+
+
+class UploadsFull(Exception):
+    """分片目录已超过容量上限"""
+
+
+def _state_key(upload_id: str) -> str:
+    return STATE_PREFIX + upload_id
+
+
+def _lock_key(upload_id: str) -> str:
+    return STATE_PREFIX + upload_id + ":lock"
+
+
+def _ttl() -> int:
+    return int(current_app.config.get("RESUMABLE_UPLOAD_TTL", 24 * 3600))
+
+
+def max_bytes() -> int:
+    return int(current_app.config.get("RESUMABLE_UPLOAD_MAX_BYTES", 50 * 1024 ** 2))
+
+
+def chunk_max_bytes() -> int:
+    return int(current_app.config.get("RESUMABLE_CHUNK_MAX_BYTES", 1024 ** 2))
+
+
+# ——— 分片目录 ———
+
+def upload_dir() -> str:
+    path = current_app.config.get("RESUMABLE_UPLOAD_DIR")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(upload_dir(), f"{upload_id}.part")
+
+
+def _part_entries() -> list:
+    """[(upload_id, 大小, 修改时间)]"""
+    entries = []
+    with os.scandir(upload_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".part"):
+                st = entry.stat()
+                entries.append((entry.name[:-5], st.st_size, st.st_mtime))
+    return entries
+
+
+def _reserved_bytes(size: int, length) -> int:
+    """未收尾的上传按声明的 length 占用（创建时已预留），状态已过期的残留文件按实际大小"""
+    return max(size, int(length or 0))
+
+
+def _scan_usage() -> int:
+    entries = _part_entries()
+    if not entries:
+        return 0
+    pipe = ext.redis_client.pipeline()
+    for upload_id, _, _ in entries:
+        pipe.hget(_state_key(upload_id), "length")
+    return sum(_reserved_bytes(size, length)
+               for (_, size, _), length in zip(entries, pipe.execute()))
+
+
+# 分片目录占用（含已预留未写入的字节）：创建时的容量检查不再逐个 stat，两次全量扫描之间由创建 / 删除增减
+_usage = DirectoryUsage(_scan_usage)
+
+
+def _usage_refresh() -> float:
+    return float(current_app.config.get("RESUMABLE_UPLOAD_USAGE_REFRESH", 30))
+
+
+def parts_bytes() -> int:
+    return _usage.total(_usage_refresh())
+
+
+def _remove_part(upload_id: str):
+    path = part_path(upload_id)
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _usage.add(-_reserved_bytes(size, ext.redis_client.hget(_state_key(upload_id), "length")))
+
+
+# ——— 状态 ———
+
+def create(purpose: str, length: int, meta: dict) -> dict:
+    """
+    创建上传并预留空文件，返回状态快照。
+    未收尾上传声明的总字节数加上 length 超过 RESUMABLE_UPLOAD_DIR_MAX_BYTES 时抛出 UploadsFull；
+    检查通过即在计数中预留 length，并发创建不会合计超额（跨进程的偏差由定期全量扫描校准）。
+    """
+    limit = int(current_app.config.get("RESUMABLE_UPLOAD_DIR_MAX_BYTES", 2 * 1024 ** 3))
+    if limit and not _usage.try_add(length, limit, _usage_refresh()):
+        raise UploadsFull("Resumable upload directory is full")
+
+    upload_id = gen_nanoid()
+    try:
+        open(part_path(upload_id), "wb").close()
+    except OSError:
+        if limit:
+            _usage.add(-length)
+        raise
+
+    key  = _state_key(upload_id)
+    pipe = ext.redis_client.pipeline()
+    pipe.hset(key, mapping={
+        "purpose":    purpose,
+        "length":     length,
+        "offset":     0,
+        "status":     STATUS_UPLOADING,
+        "meta":       json.dumps(meta, ensure_ascii=False),
+        "created_at": time.time(),
+    })
+    pipe.expire(key, _ttl())
+    pipe.execute()
+    return get(upload_id)
+
+
+def get(upload_id: str):
+    """状态快照 dict，不存在（或已过期）返回 None"""
+    raw = ext.redis_client.hgetall(_state_key(upload_id))
+    if not raw:
+        return None
+    state = {
+        "upload_id":  upload_id,
+        "purpose":    raw.get("purpose"),
+        "length":     int(raw["length"]),
+        "offset":     int(raw["offset"]),
+        "status":     raw.get("status"),
+        "meta":       json.loads(raw.get("meta") or "{}"),
+        "expires_in": max(ext.redis_client.ttl(_state_key(upload_id)), 0),
+    }
+    if raw.get("result") is not None:
+        state["result"]        = json.loads(raw["result"])
+        state["result_status"] = int(raw["result_status"])
+    return state
+
+
+def _acquire(upload_id: str) -> str:
+    lease = int(current_app.config.get("RESUMABLE_CHUNK_LEASE", 300))
+    token = uuid.uuid4().hex
+    if not ext.redis_client.set(_lock_key(upload_id), token, nx=True, ex=lease):
+        raise UploadBusy("Another request is writing to this upload")
+    return token
+
+
+def _release(upload_id: str, token: str):
+    ext.redis_client.register_script(_RELEASE_LUA)(keys=[_lock_key(upload_id)], args=[token])
+
+
+# ——— 写入 ———
+
+def write_chunk(upload_id: str, offset: int, stream, content_length: int = None) -> int:
+    """
+    从 stream 读取分片写入 offset 处，返回新的已确认偏移。
+    客户端中途断开时已收到的部分照样确认（下次从新偏移继续）。
+    content_length 超出剩余字节数或单片上限时抛出 ValueError。
+    """
+    token = _acquire(upload_id)
+    try:
+        state = get(upload_id)
+        if state is None:
+            raise UploadNotFound(upload_id)
+        if state["status"] != STATUS_UPLOADING:
+            raise UploadBusy("Upload is being finalized")
+        if offset != state["offset"]:
+            raise OffsetMismatch(state["offset"])
+
+        remaining = state["length"] - offset
+        if content_length is not None and content_length > min(remaining, chunk_max_bytes()):
+            raise ValueError("Chunk exceeds the declared length or the chunk size limit")
+        limit = min(remaining, chunk_max_bytes()) if content_length is None else content_length
+
+        written = 0
+        with open(part_path(upload_id), "r+b") as fp:
+            fp.truncate(offset)
+            fp.seek(offset)
+            try:
+                while written < limit:
+                    block = stream.read(min(_READ_BLOCK, limit - written))
+                    if not block:
+                        break
+                    fp.write(block)
+                    written += len(block)
+            except ClientDisconnected:
+                current_app.logger.info("Upload %s interrupted at %d bytes", upload_id, offset + written)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        key  = _state_key(upload_id)
+        pipe = ext.redis_client.pipeline()
+        pipe.hset(key, "offset", offset + written)
+        pipe.expire(key, _ttl())
+        pipe.execute()
+        return offset + written
+    finally:
+        _release(upload_id, token)
+
+
+# ——— 收尾 ———
+
+def begin_finalize(upload_id: str) -> dict:
+    """
+    标记为收尾中并返回状态快照；已收尾时直接返回（快照带 result，调用方原样返回）。
+    收尾租约 RESUMABLE_FINALIZE_LEASE 秒，进程在收尾中崩溃时到期后可重新收尾。
+    """
+    lease = float(current_app.config.get("RESUMABLE_FINALIZE_LEASE", 300))
+    rc = ext.redis_client.register_script(_BEGIN_FINALIZE_LUA)(
+        keys=[_state_key(upload_id)], args=[time.time(), lease])
+    if rc == -1:
+        raise UploadNotFound(upload_id)
+    if rc == -2:
+        raise Incomplete(upload_id)
+    if rc == -3:
+        raise UploadBusy("Upload is being finalized")
+    return get(upload_id)
+
+
+def read(upload_id: str) -> bytes:
+    with open(part_path(upload_id), "rb") as fp:
+        return fp.read()
+
+
+def finish(upload_id: str, body: dict, status: int):
+    """收尾成功：保存响应供重复收尾返回，删除分片文件"""
+    key  = _state_key(upload_id)
+    pipe = ext.redis_client.pipeline()
+    pipe.hset(key, mapping={
+        "status":        STATUS_FINALIZED,
+        "result":        json.dumps(body, ensure_ascii=False),
+        "result_status": status,
+    })
+    pipe.expire(key, _ttl())
+    pipe.execute()
+    _remove_part(upload_id)
+
+
+def abort_finalize(upload_id: str):
+    """收尾失败（评测出错、暂存已满等）：恢复为可收尾状态，客户端可稍后重试，无需重传"""
+    ext.redis_client.hset(_state_key(upload_id), "status", STATUS_UPLOADING)
+
+
+def cleanup(min_age: float) -> int:
+    """删除状态已过期（或已收尾）且修改时间早于 min_age 秒的分片文件，返回删除数"""
+    cutoff  = time.time() - min_age
+    removed = 0
+    for upload_id, _, mtime in _part_entries():
+        if mtime >= cutoff:
+            continue
+        status = ext.redis_client.hget(_state_key(upload_id), "status")
+        if status is None or status == STATUS_FINALIZED:
+            _remove_part(upload_id)
+            removed += 1
+    return removed
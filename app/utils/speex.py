@@ -0,0 +1,83 @@
+# 讯飞 ISE 的 speex-wb 压缩传输编码
+
+# app/utils/speex.py
+
+"""
+aue=raw 时每秒音频要上传 32000 字节 PCM（Base64 后约 43KB）；
+speex-wb 质量 7 约 23.8kbps，即每 20ms 一帧、每帧 60 字节，体积约为 PCM 的 1/10。
+
+讯飞要求的 speex 数据格式："每帧前加 1 字节帧长"，帧与帧直接拼接。
+Python 没有维护中的 libspeex 绑定，这里调用 ffmpeg 的 libspeex 编码器输出 Ogg，
+再在内存中解 Ogg 页、取出逐帧数据包（跳过前两个头包：Speex header、comment），加上帧长前缀。
+ffmpeg 不可用或未编译 libspeex 时抛出 SpeexEncodeError，由调用方回退到 raw。
+"""
+
+import struct
+import subprocess
+
+FRAME_SECONDS = 0.02     # speex-wb 每帧 320 个样本 @ 16kHz
+SAMPLE_RATE   = 16000
+
+
+class SpeexEncodeError(Exception):
+    """speex 编码失败"""
+
+
+def ogg_packets(data: bytes) -> list:
+    """
+    按 Ogg 页结构拆出逻辑流中的全部数据包（只处理单一逻辑流）。
+    段表中 255 表示数据包在下一段继续，小于 255 表示数据包结束。
+    """
+    packets = []
+    partial = bytearray()
+    pos = 0
+    while pos + 27 <= len(data):
+        if data[pos:pos + 4] != b'OggS':
+            raise SpeexEncodeError("invalid Ogg page")
+        n_segments = data[pos + 26]
+        lacing = data[pos + 27:pos + 27 + n_segments]
+        body   = pos + 27 + n_segments
+        for size in lacing:
+            partial += data[body:body + size]
+            body += size
+            if size < 255:
+                packets.append(bytes(partial))
+                partial.clear()
+        pos = body
+    return packets
+
+
+def frames_from_ogg(data: bytes) -> list:
+    """ffmpeg 输出的 Ogg Speex → 逐帧数据（frames_per_packet=1 时每个数据包即一帧）"""
+    packets = ogg_packets(data)
+    if len(packets) < 2 or not packets[0].startswith(b'Speex   '):
+        raise SpeexEncodeError("not an Ogg Speex stream")
+    # Speex header 中 frames_per_packet 位于偏移 64
+    frames_per_packet = struct.unpack_from('<i', packets[0], 64)[0]
+    if frames_per_packet != 1:
+        raise SpeexEncodeError(f"unexpected frames_per_packet {frames_per_packet}")
+    return [p for p in packets[2:] if p]
+
+
+def encode_wb(pcm: bytes, quality: int = 7) -> list:
+    """16kHz 单声道 16 位 PCM → speex-wb 帧列表（每项为一帧编码数据，不含帧长前缀）"""
+    cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error',
+           '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0',
+           '-c:a', 'libspeex', '-cbr_quality', str(quality), '-frames_per_packet', '1',
+           '-f', 'ogg', 'pipe:1']
+    try:
+        out = subprocess.run(cmd, input=pcm, check=True, capture_output=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SpeexEncodeError(f"ffmpeg libspeex encode failed: {e}")
+    return frames_from_ogg(out)
+
+
+def length_prefixed(frames: list) -> bytes:
+    """讯飞 speex 格式：每帧前加 1 字节帧长"""
+    out = bytearray()
+    for frame in frames:
+        if len(frame) > 255:
+            raise SpeexEncodeError("speex frame longer than 255 bytes")
+        out.append(len(frame))
+        out += frame
+    return bytes(out)
@@ -0,0 +1,97 @@
+# 转写文本与题干的逐词对齐
+
+# app/utils/text_align.py
+
+"""
+/api/evaluate/transcribe 带 question_id 时，把 Whisper 转写结果与题干逐词对齐，
+告诉用户哪些词读对了、读错了、漏读或多读了。
+
+对齐前统一规范化：小写、去掉标点（保留词内撇号，如 don't），连字符按空格拆开。
+对齐使用词级编辑距离（Levenshtein）回溯，题干一般不超过几十个词，O(n·m) 足够快。
+op 的取值与讯飞 dp_message 的含义对应：
+  equal   读对
+  replace 替换（讯飞 128）
+  delete  漏读（讯飞 16）：expected 有、actual 无
+  insert  增读（讯飞 32）：actual 有、expected 无
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+class AlignedWord(NamedTuple):
+    op:       str
+    expected: Optional[str]
+    actual:   Optional[str]
+
+    def to_dict(self) -> dict:
+        return {'op': self.op, 'expected': self.expected, 'actual': self.actual}
+
+
+def normalize_words(text: str) -> List[str]:
+    """小写、去标点后的词序列"""
+    text = (text or "").lower().replace("’", "'").replace("-", " ")
+    return _WORD_RE.findall(text)
+
+
+def align_words(expected: List[str], actual: List[str]) -> List[AlignedWord]:
+    """最小编辑距离对齐；代价相同时依次优先 equal、delete、insert、replace（尽量多保留读对的词）"""
+    n, m = len(expected), len(actual)
+    # dist[i][j]：expected[:i] 与 actual[:j] 的编辑距离
+    dist = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        dist[i][0] = i
+    for j in range(1, m + 1):
+        dist[0][j] = j
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost = 0 if expected[i - 1] == actual[j - 1] else 1
+            dist[i][j] = min(dist[i - 1][j - 1] + cost, dist[i - 1][j] + 1, dist[i][j - 1] + 1)
+
+    ops = []
+    i, j = n, m
+    while i or j:
+        if i and j and expected[i - 1] == actual[j - 1] and dist[i][j] == dist[i - 1][j - 1]:
+            ops.append(AlignedWord("equal", expected[i - 1], actual[j - 1]))
+            i, j = i - 1, j - 1
+        elif i and dist[i][j] == dist[i - 1][j] + 1:
+            ops.append(AlignedWord("delete", expected[i - 1], None))
+            i -= 1
+        elif j and dist[i][j] == dist[i][j - 1] + 1:
+            ops.append(AlignedWord("insert", None, actual[j - 1]))
+            j -= 1
+        else:
+            ops.append(AlignedWord("replace", expected[i - 1], actual[j - 1]))
+            i, j = i - 1, j - 1
+    ops.reverse()
+    return ops
+
+
+def compare(expected_text: str, actual_text: str) -> dict:
+    """
+    返回 {
+      words:   [ { op, expected, actual }, ... ],
+      summary: { expected_words, correct, replaced, missing, extra, word_error_rate }
+    }
+    """
+    expected = normalize_words(expected_text)
+    ops = align_words(expected, normalize_words(actual_text))
+
+    counts = {"equal": 0, "replace": 0, "delete": 0, "insert": 0}
+    for w in ops:
+        counts[w.op] += 1
+    errors = counts["replace"] + counts["delete"] + counts["insert"]
+
+    return {
+        'words': [w.to_dict() for w in ops],
+        'summary': {
+            'expected_words':  len(expected),
+            'correct':         counts["equal"],
+            'replaced':        counts["replace"],
+            'missing':         counts["delete"],
+            'extra':           counts["insert"],
+            'word_error_rate': round(errors / len(expected), 4) if expected else (1.0 if errors else 0.0),
+        },
+    }
@@ -0,0 +1,169 @@
+# Whisper 转写结果缓存（内容寻址，Redis + 进程内 LRU）
+
+# app/utils/transcribe_cache.py
+
+"""
+CPU 上的 Whisper 推理是单次请求里最贵的操作，而客户端重试、用户重复提交同一段录音时结果完全相同。
+
+缓存键：sha256(裁剪后的 16kHz float32 样本) + 模型名 + whisper 版本 + language + initial_prompt
+  对解码后的样本取哈希，同一段录音换容器（wav / m4a）重新上传也能命中。
+  推理服务按负载选择模型档位，请求时还不知道会用哪一档：查找时对所有档位的键一次 MGET，
+  取精度最高的命中；写入时只写实际使用的档位。
+
+两级缓存：
+  进程内 LRU：TRANSCRIBE_CACHE_LOCAL_ENTRIES 条（0 关闭），同一 worker 内的重试不必访问 Redis
+  Redis：
+    transcribe_cache:{sha256}   → { text, language, model } JSON，带 TTL
+    transcribe_cache:index      → ZSET，member=sha256，score=写入时间；超出条目上限时淘汰最旧的
+    transcribe_cache:stats      → HASH：hits / local_hits / misses
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+import numpy as np
+from flask import current_app
+import app.extensions as ext
+from app.utils import whisper_model
+
+KEY_PREFIX = "transcribe_cache:"
+INDEX_KEY  = "transcribe_cache:index"
+STATS_KEY  = "transcribe_cache:stats"
+
+_local      = OrderedDict()     # digest → result
+_local_lock = threading.Lock()
+
+try:
+    WHISPER_VERSION = metadata.version("openai-whisper")
+except metadata.PackageNotFoundError:
+    WHISPER_VERSION = "unknown"
+
+
+def audio_digest(samples: np.ndarray) -> bytes:
+    """样本内容哈希，与模型、参数无关，同一请求的各档位键共用"""
+    return hashlib.sha256(np.ascontiguousarray(samples, dtype='<f4').tobytes()).digest()
+
+
+def make_key(audio_hash: bytes, model: str, language: str = None, initial_prompt: str = None) -> str:
+    h = hashlib.sha256(audio_hash)
+    h.update(json.dumps([model, WHISPER_VERSION, language, initial_prompt],
+                        ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _enabled() -> bool:
+    return bool(current_app.config.get("TRANSCRIBE_CACHE_ENABLED", True))
+
+
+def _candidate_models() -> list:
+    """可能产出结果的模型，精度从高到低"""
+    cfg = current_app.config
+    if cfg.get("WHISPER_BACKEND", "local") == "local":
+        return [cfg.get("WHISPER_MODEL", "tiny")]
+    return [name for name, _ in whisper_model.tiers(cfg)]
+
+
+def _count(field: str):
+    if ext.redis_client is None:
+        return
+    try:
+        ext.redis_client.hincrby(STATS_KEY, field, 1)
+    except Exception:
+        current_app.logger.warning("Transcribe cache stats update failed", exc_info=True)
+
+
+def _local_get(digest: str):
+    with _local_lock:
+        result = _local.get(digest)
+        if result is not None:
+            _local.move_to_end(digest)
+        return result
+
+
+def _local_put(digest: str, result: dict):
+    limit = int(current_app.config.get("TRANSCRIBE_CACHE_LOCAL_ENTRIES", 1024))
+    if limit <= 0:
+        return
+    with _local_lock:
+        _local[digest] = result
+        _local.move_to_end(digest)
+        while len(_local) > limit:
+            _local.popitem(last=False)
+
+
+def get(audio_hash: bytes, language: str = None, initial_prompt: str = None):
+    """命中返回 { text, language, model }，未命中或 Redis 异常返回 None（缓存故障不影响转写）"""
+    if not _enabled():
+        return None
+    digests = [make_key(audio_hash, model, language, initial_prompt) for model in _candidate_models()]
+
+    for digest in digests:
+        result = _local_get(digest)
+        if result is not None:
+            _count("local_hits")
+            return dict(result)
+
+    if ext.redis_client is None:
+        return None
+    try:
+        raws = ext.redis_client.mget([KEY_PREFIX + d for d in digests])
+    except Exception:
+        current_app.logger.warning("Transcribe cache read failed", exc_info=True)
+        return None
+
+    for digest, raw in zip(digests, raws):
+        if raw is not None:
+            result = json.loads(raw)
+            _local_put(digest, result)
+            _count("hits")
+            return dict(result)
+    _count("misses")
+    return None
+
+
+def put(audio_hash: bytes, result: dict, language: str = None, initial_prompt: str = None):
+    """按实际使用的模型写入两级缓存，Redis 按条目上限淘汰最旧的记录"""
+    if not _enabled() or not result.get('model'):
+        return
+    digest = make_key(audio_hash, result['model'], language, initial_prompt)
+    result = {k: result.get(k) for k in ('text', 'language', 'model')}
+    _local_put(digest, result)
+
+    if ext.redis_client is None:
+        return
+    ttl         = int(current_app.config.get("TRANSCRIBE_CACHE_TTL", 7 * 24 * 3600))
+    max_entries = int(current_app.config.get("TRANSCRIBE_CACHE_MAX_ENTRIES", 50000))
+    try:
+        pipe = ext.redis_client.pipeline()
+        pipe.setex(KEY_PREFIX + digest, ttl, json.dumps(result, ensure_ascii=False))
+        pipe.zadd(INDEX_KEY, {digest: time.time()})
+        pipe.zremrangebyscore(INDEX_KEY, 0, time.time() - ttl)
+        pipe.zcard(INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        overflow = size - max_entries
+        if overflow > 0:
+            evicted = [member for member, _ in ext.redis_client.zpopmin(INDEX_KEY, overflow)]
+            if evicted:
+                ext.redis_client.delete(*(KEY_PREFIX + d for d in evicted))
+    except Exception:
+        current_app.logger.warning("Transcribe cache write failed", exc_info=True)
+
+
+def stats() -> dict:
+    """命中率统计：hits 为 Redis 命中，local_hits 为进程内 LRU 命中（集群累计）"""
+    counts = {k: int(v) for k, v in ext.redis_client.hgetall(STATS_KEY).items()}
+    hits, local_hits, misses = counts.get("hits", 0), counts.get("local_hits", 0), counts.get("misses", 0)
+    total = hits + local_hits + misses
+    return {
+        "hits":          hits,
+        "local_hits":    local_hits,
+        "misses":        misses,
+        "entries":       ext.redis_client.zcard(INDEX_KEY),
+        "local_entries": len(_local),
+        "hit_rate":      round((hits + local_hits) / total, 4) if total else 0.0,
+    }
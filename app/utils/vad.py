@@ -0,0 +1,117 @@
+# 基于能量的语音活动检测（VAD）与首尾静音裁剪
+
+# app/utils/vad.py
+
+"""
+录音前后常带几秒静音：讯飞按实时节奏上传，Whisper 也要逐段解码，静音部分两边都要付费。
+这里在送往任何引擎之前裁掉首尾静音（保留少量 padding），并统计有效语音时长。
+
+算法（全部向量化，不逐帧循环）：
+  1. 按 frame_ms 分帧，计算每帧能量（dBFS）
+  2. 噪声底取帧能量的第 10 百分位；峰值与噪声底相差不到 margin_db 时整段视为没有语音（纯噪声或纯静音）
+  3. 阈值 = max(floor_db, min(噪声底 + margin_db, 峰值 - headroom))，headroom = min(6 dB, margin_db / 2)
+     —— 阈值始终高于噪声底；取 min 只是让语音较轻、几乎占满录音时，阈值不至于高过大部分语音帧
+  4. 能量高于阈值的帧为语音帧；首个到最后一个语音帧（两侧各加 padding）之外的部分裁掉
+检测不到语音时不裁剪，交给下游（及质量预检）处理。
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+from flask import current_app
+
+TARGET_RATE = 16000
+
+FRAME_MS   = 30
+PADDING_MS = 200
+MARGIN_DB  = 12.0
+FLOOR_DB   = -55.0
+# 阈值不高于峰值减去该值（且不超过 margin_db 的一半，阈值至少比噪声底高 margin_db / 2）
+SPEECH_HEADROOM_DB = 6.0
+
+
+class SpeechSpan(NamedTuple):
+    start:          int     # 保留区间起点（样本下标，已含 padding）
+    end:            int     # 保留区间终点（不含）
+    speech_seconds: float   # 语音帧总时长
+    total_seconds:  float   # 原始时长
+    rate:           int
+
+    def to_dict(self) -> dict:
+        return {
+            'duration':        round(self.total_seconds, 3),
+            'speech_duration': round(self.speech_seconds, 3),
+            'trim_start':      round(self.start / self.rate, 3),
+            'trim_end':        round(self.end / self.rate, 3),
+        }
+
+
+def frame_energy_db(samples: np.ndarray, frame: int) -> np.ndarray:
+    """float32 [-1, 1) 信号按 frame 个样本分帧的能量（dBFS），末尾不足一帧的部分补零"""
+    n_frames = -(-len(samples) // frame)
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(samples)] = samples
+    power = np.einsum('ij,ij->i', padded.reshape(n_frames, frame), padded.reshape(n_frames, frame)) / frame
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def speech_frames(energy_db: np.ndarray, margin_db: float = MARGIN_DB,
+                  floor_db: float = FLOOR_DB) -> np.ndarray:
+    """每帧是否为语音的布尔数组"""
+    noise = np.percentile(energy_db, 10)
+    peak  = energy_db.max()
+    if peak - noise < margin_db:
+        return np.zeros(len(energy_db), dtype=bool)
+    headroom  = min(SPEECH_HEADROOM_DB, margin_db / 2)
+    threshold = max(floor_db, min(noise + margin_db, peak - headroom))
+    return energy_db > threshold
+
+
+def detect(samples: np.ndarray, rate: int = TARGET_RATE, frame_ms: int = FRAME_MS,
+           padding_ms: int = PADDING_MS, margin_db: float = MARGIN_DB,
+           floor_db: float = FLOOR_DB) -> SpeechSpan:
+    """检测语音区间，返回 SpeechSpan；samples 为单声道 float32"""
+    total = len(samples)
+    if total == 0:
+        return SpeechSpan(0, 0, 0.0, 0.0, rate)
+
+    frame  = max(1, rate * frame_ms // 1000)
+    voiced = np.flatnonzero(speech_frames(frame_energy_db(samples, frame), margin_db, floor_db))
+    if len(voiced) == 0:
+        return SpeechSpan(0, total, 0.0, total / rate, rate)
+
+    pad   = rate * padding_ms // 1000
+    start = max(0, int(voiced[0]) * frame - pad)
+    end   = min(total, (int(voiced[-1]) + 1) * frame + pad)
+    return SpeechSpan(start, end, len(voiced) * frame / rate, total / rate, rate)
+
+
+def trim(samples: np.ndarray, rate: int = TARGET_RATE, **options):
+    """float32 信号 → (裁剪后的视图, SpeechSpan)"""
+    span = detect(samples, rate, **options)
+    return samples[span.start:span.end], span
+
+
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, '<i2', count=len(pcm) // 2).astype(np.float32) / 32768.0
+
+
+def trim_pcm16(pcm: bytes, rate: int = TARGET_RATE, **options):
+    """16 位 PCM 字节 → (裁剪后的 PCM 字节, SpeechSpan)"""
+    span = detect(pcm16_to_float(pcm), rate, **options)
+    return pcm[span.start * 2:span.end * 2], span
+
+
+def config_options() -> dict:
+    """从 app.config 读取 VAD 参数，作为 detect/trim 的关键字参数"""
+    cfg = current_app.config
+    return {
+        'frame_ms':   int(cfg.get('VAD_FRAME_MS', FRAME_MS)),
+        'padding_ms': int(cfg.get('VAD_PADDING_MS', PADDING_MS)),
+        'margin_db':  float(cfg.get('VAD_MARGIN_DB', MARGIN_DB)),
+        'floor_db':   float(cfg.get('VAD_FLOOR_DB', FLOOR_DB)),
+    }
+
+
+def enabled() -> bool:
+    return bool(current_app.config.get('VAD_ENABLED', True))
@@ -0,0 +1,140 @@
+# Whisper 转写客户端：调用独立推理服务，或在进程内推理
+
+# app/utils/whisper_client.py
+
+"""
+WHISPER_BACKEND：
+  local ：进程内调用 whisper_model（默认；开发环境 / 单进程部署）
+  server：请求发给 app/utils/whisper_server.py 启动的本机推理服务（Unix socket 或 TCP），
+          模型只在推理服务中加载一份，Flask worker 不再各自持有模型；
+          推理服务须与 web 进程一同部署（python -m app.utils.whisper_server），未启动时转写接口返回 503
+
+线路协议（双向相同）：
+  8 字节头 <II>：JSON 长度、负载长度
+  JSON：请求为 { op, language, initial_prompt, timeout }，
+        响应为 { text, language, model } 或 { error, code, retry_after }（model 为实际使用的模型档位）
+  负载：请求为 16kHz 单声道 float32 小端样本，响应为空
+"""
+
+import os
+import json
+import math
+import socket
+import struct
+import threading
+
+import numpy as np
+from flask import current_app
+
+from app.utils import whisper_model
+
+HEADER = struct.Struct("<II")
+
+
+class WhisperUnavailable(Exception):
+    """推理服务不可达、超时、过载（code=429，附 retry_after 秒数）或返回错误"""
+
+    def __init__(self, msg: str, code: int = 503, retry_after: int = None):
+        super().__init__(msg)
+        self.code = code
+        self.retry_after = retry_after
+
+
+# 进程内推理的并发上限（WHISPER_BACKEND=local），首次使用时按配置创建
+_local_slots = None
+_local_lock  = threading.Lock()
+
+
+# ——— 线路协议 ———
+
+def pack(header: dict, payload: bytes = b"") -> bytes:
+    body = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(body), len(payload)) + body + payload
+
+
+def parse_address(address: str):
+    """host:port → TCP 地址元组；其余视为 Unix socket 路径"""
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed by whisper server")
+        buf += chunk
+    return bytes(buf)
+
+
+def request(address: str, header: dict, payload: bytes = b"", timeout: float = 60.0) -> dict:
+    """发送一次请求并等待响应（每次请求一条短连接，本机 socket 建连开销可忽略）"""
+    family, addr = parse_address(address)
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(addr)
+            sock.sendall(pack(header, payload))
+            json_len, payload_len = HEADER.unpack(_recv_exact(sock, HEADER.size))
+            response = json.loads(_recv_exact(sock, json_len))
+            if payload_len:
+                _recv_exact(sock, payload_len)
+    except (OSError, ValueError) as e:
+        raise WhisperUnavailable(f"Whisper server unavailable: {e}")
+    if "error" in response:
+        raise WhisperUnavailable(response["error"], response.get("code", 500), response.get("retry_after"))
+    return response
+
+
+# ——— 对外接口 ———
+
+def transcribe(samples: np.ndarray, language: str = None, initial_prompt: str = None) -> dict:
+    """
+    16kHz 单声道 float32 → { text, language, model }
+    推理服务不可用时抛出 WhisperUnavailable；过载时 code=429。
+    """
+    cfg = current_app.config
+    if cfg.get("WHISPER_BACKEND", "local") == "local":
+        return _transcribe_local(cfg, samples, language, initial_prompt)
+
+    timeout = float(cfg.get("WHISPER_SERVER_TIMEOUT", 60))
+    return request(
+        cfg.get("WHISPER_SERVER_ADDRESS"),
+        {"op": "transcribe", "language": language, "initial_prompt": initial_prompt, "timeout": timeout},
+        np.ascontiguousarray(samples, dtype='<f4').tobytes(),
+        timeout=timeout,
+    )
+
+
+def _transcribe_local(cfg, samples, language, initial_prompt) -> dict:
+    """
+    进程内推理同样限制并发：最多 WHISPER_WORKERS 个请求同时推理，
+    其余最多等待 WHISPER_LATENCY_BUDGET 秒，仍拿不到名额则返回 429。
+    """
+    global _local_slots
+    if _local_slots is None:
+        with _local_lock:
+            if _local_slots is None:
+                import torch
+                workers = max(1, int(cfg.get("WHISPER_WORKERS", 1)))
+                threads = int(cfg.get("WHISPER_THREADS_PER_JOB", 0)) or max(1, (os.cpu_count() or 1) // workers)
+                torch.set_num_threads(threads)
+                _local_slots = threading.BoundedSemaphore(workers)
+
+    budget = float(cfg.get("WHISPER_LATENCY_BUDGET", 5))
+    if not _local_slots.acquire(timeout=budget):
+        raise WhisperUnavailable("Whisper is busy, please retry later", 429, max(1, math.ceil(budget)))
+    name = cfg.get("WHISPER_MODEL", "tiny")     # 进程内推理只用单一档位
+    try:
+        model  = whisper_model.get_model(cfg, current_app.logger, name)
+        result = model.transcribe(samples, language=language, initial_prompt=initial_prompt, fp16=False)
+    finally:
+        _local_slots.release()
+    return {'text': result.get('text', '').strip(), 'language': result.get('language'), 'model': name}
+
+
+def server_stats() -> dict:
+    return request(current_app.config.get("WHISPER_SERVER_ADDRESS"), {"op": "stats"}, timeout=5.0)
@@ -0,0 +1,133 @@
+# Whisper 模型加载、预热与内存统计
+
+# app/utils/whisper_model.py
+
+"""
+原实现在第一个 /transcribe 请求里懒加载模型（该用户要多等几秒），
+并把缓存目录写死为 D:\\whisper_cache，Linux 主机上根本不存在。
+
+现在：
+  - 缓存目录由 WHISPER_CACHE_DIR 配置（多台主机可指向同一个共享目录，避免各自下载权重）
+  - 独立推理服务（app/utils/whisper_server.py）启动时调用 warm_start()；
+    进程内推理（WHISPER_BACKEND=local）时，run.py 在创建 app 后调用 preload()：gunicorn --preload 时模型在 master 中加载，
+    fork 出的 worker 以写时复制方式共享权重页，而不是每个 worker 各加载一份
+  - 预热推理（1 秒静音）让首个真实请求不再承担 kernel 初始化、内存分配等一次性开销
+  - 加载耗时、加载前后 RSS 写入日志，并可通过 stats() 查询
+  - 推理服务可按 WHISPER_MODEL_TIERS 同时持有多个档位的模型（见 tiers()），按名称分别加载
+
+预热在 master 中以单线程执行：OpenMP（libgomp）线程池一旦在父进程中创建，
+fork 后的子进程再使用它可能死锁；单线程不会创建额外的工作线程，fork 后各 worker 按需重建线程池。
+"""
+
+import os
+import time
+import threading
+import numpy as np
+
+_models     = {}      # 模型名 → 模型
+_model_lock = threading.Lock()
+_stats      = {}      # 模型名 → 加载统计
+
+
+def rss_mb():
+    """当前进程常驻内存（MB），不支持的平台返回 None"""
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def tiers(config) -> list:
+    """
+    WHISPER_MODEL_TIERS="small:1.5,base:3,tiny" → [("small", 1.5), ("base", 3.0), ("tiny", inf)]
+    按精度从高到低排列；数字为选用该档位时允许的预计完成时间（秒），最后一档兜底不设上限。
+    未配置时只有 WHISPER_MODEL 一档。
+    """
+    spec = (config.get('WHISPER_MODEL_TIERS') or "").strip()
+    if not spec:
+        return [(config.get('WHISPER_MODEL', 'tiny'), float("inf"))]
+    result = []
+    for item in spec.split(","):
+        name, _, limit = item.strip().partition(":")
+        result.append((name.strip(), float(limit) if limit.strip() else float("inf")))
+    result[-1] = (result[-1][0], float("inf"))
+    return result
+
+
+def _load(config, logger, name):
+    import whisper
+
+    cache_dir = config.get('WHISPER_CACHE_DIR')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    rss_before = rss_mb()
+    started    = time.perf_counter()
+    model      = whisper.load_model(name, device="cpu", download_root=cache_dir)
+    load_seconds = time.perf_counter() - started
+
+    _stats[name] = {
+        'model':        name,
+        'cache_dir':    cache_dir,
+        'pid':          os.getpid(),
+        'load_seconds': round(load_seconds, 3),
+        'rss_before_mb': round(rss_before, 1) if rss_before is not None else None,
+        'rss_after_mb':  round(rss_mb(), 1) if rss_before is not None else None,
+    }
+    logger.info("Whisper model %s loaded in %.2fs from %s (RSS %s → %s MB)",
+                name, load_seconds, cache_dir, _stats[name]['rss_before_mb'], _stats[name]['rss_after_mb'])
+    return model
+
+
+def _warmup(model, name, logger):
+    import torch
+
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    try:
+        model.transcribe(np.zeros(16000, dtype=np.float32), language='en', fp16=False)
+    finally:
+        torch.set_num_threads(threads)
+    _stats[name]['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info("Whisper %s warmup finished in %.2fs", name, _stats[name]['warmup_seconds'])
+
+
+def get_model(config, logger, name: str = None):
+    """进程内共享的模型实例（默认 WHISPER_MODEL）；未预加载时在首次调用时加载（不做预热）"""
+    name = name or config.get('WHISPER_MODEL', 'tiny')
+    model = _models.get(name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = _load(config, logger, name)
+    return model
+
+
+def warm_start(config, logger, name: str = None):
+    """加载模型并按 WHISPER_WARMUP 预热，返回模型"""
+    name  = name or config.get('WHISPER_MODEL', 'tiny')
+    model = get_model(config, logger, name)
+    if config.get('WHISPER_WARMUP', True):
+        _warmup(model, name, logger)
+    return model
+
+
+def preload(app):
+    """
+    启动钩子：在 fork worker 之前加载模型并预热。
+    WHISPER_PRELOAD=False 时跳过（例如只跑讯飞评测的节点），模型退回到首次请求时加载；
+    WHISPER_BACKEND=server 时模型由独立推理服务持有，web 进程不加载。
+    """
+    if not app.config.get('WHISPER_PRELOAD', True):
+        return
+    if app.config.get('WHISPER_BACKEND', 'local') != 'local':
+        return
+    warm_start(app.config, app.logger)
+
+
+def stats() -> dict:
+    """各模型的加载耗时、RSS 等；models 为空表示当前进程尚未持有任何模型"""
+    return {'models': {name: dict(s) for name, s in _stats.items()},
+            'current_pid': os.getpid(), 'rss_mb': rss_mb()}
@@ -0,0 +1,432 @@
+# Whisper 独立推理服务：独占模型，跨请求微批处理
+
+# app/utils/whisper_server.py
+
+"""
+每个 Flask worker 各持一份模型、各自串行 transcribe：内存随 worker 数线性增长，
+并发请求还在同一组 CPU 核上互相争抢。这里把模型放到一个本机常驻进程里，所有 web worker
+通过 app/utils/whisper_client.py 以 Unix socket（或 TCP）调用。
+
+微批处理：
+  - 事件循环只负责收发；推理在单独的一个线程中串行执行，torch 在该线程内使用全部核心
+  - 收到第一个请求后最多再等 window_ms，或凑满 max_batch 个，组成一批
+  - 同一批中解码参数（language、initial_prompt）相同且不超过 30 秒的音频，
+    堆叠成 [B, n_mels, 3000] 的 log-mel 张量，一次 whisper.decode 完成编码器与解码器的批量前向
+  - 超过 30 秒的音频需要滑窗，仍逐条走 model.transcribe
+  - 推理进行期间到达的请求在队列中累积，下一批自然更大
+批量解码只用 temperature=0，不做 transcribe 的温度回退；口语练习的短句录音上差异可以忽略。
+
+负载调度（p99 优先于峰值吞吐）：
+  - 同时推理的批次数上限为 workers（WHISPER_WORKERS），每个推理线程的 torch 线程数为
+    threads_per_job（WHISPER_THREADS_PER_JOB，0 表示 CPU 核数 / workers），不会因并发请求过多而超额订阅线程池；
+    whisper.decode 会在模型上挂 kv-cache hook，同一模型不能并发解码，因此 workers > 1 时每个 worker 各用一份模型副本
+  - 每个请求带截止时间（客户端超时），出队时已过期的直接丢弃，不再浪费算力
+  - 准入控制：按 (排队批次数 / workers + 正在推理的占比) × 批推理耗时 EWMA 估算完成时间，
+    超过 latency_budget（WHISPER_LATENCY_BUDGET）时立即拒绝（429 + retry_after），而不是让所有请求一起变慢
+
+模型档位（WHISPER_MODEL_TIERS，见 whisper_model.tiers）：
+  每个档位一个 MicroBatcher（各自的队列、耗时 EWMA、模型副本），共享同一组推理线程与 worker 名额。
+  每个请求按档位从高到低选第一个预计完成时间不超过该档阈值的档位，都不满足时落到最后一档；
+  空闲时用高精度模型，高峰时自动降级到小模型。响应中的 model 字段为实际使用的档位。
+
+启动（web / celery 进程设置 WHISPER_BACKEND=server 后才会使用本服务，需与其一同部署、由进程管理器守护）：
+  python -m app.utils.whisper_server
+  python -m app.utils.whisper_server --address 127.0.0.1:9090 --max-batch 16 --window-ms 30
+"""
+
+import os
+import copy
+import math
+import time
+import queue
+import asyncio
+import logging
+import argparse
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+import json
+import numpy as np
+from flask import Config
+
+from app.config import get_config
+from app.utils import whisper_model
+from app.utils.whisper_client import HEADER, pack, parse_address
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+BATCH_MAX_SAMPLES = 30 * SAMPLE_RATE    # whisper 单窗口长度
+# 与 whisper.transcribe 相同的无语音判定
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD   = -1.0
+
+
+class Overloaded(Exception):
+    """预计完成时间超过延迟预算，拒绝排队"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Whisper server overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """请求在队列中等到了截止时间"""
+
+
+class _Job(NamedTuple):
+    samples:        np.ndarray
+    language:       str
+    initial_prompt: str
+    future:         asyncio.Future
+    deadline:       float            # 事件循环时间；inf 表示不限
+
+    @property
+    def options_key(self):
+        return self.language, self.initial_prompt
+
+
+def _set_threads(threads: int):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def make_executor(workers: int, threads_per_job: int) -> ThreadPoolExecutor:
+    """每个推理线程只用 threads_per_job 个 torch 线程：workers 个批次并发时总线程数不超过核数"""
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper-infer",
+                              initializer=_set_threads, initargs=(threads_per_job,))
+
+
+def default_threads(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+class MicroBatcher:
+
+    def __init__(self, model, max_batch: int = 8, window: float = 0.02,
+                 workers: int = 1, threads_per_job: int = 0, latency_budget: float = 5.0,
+                 executor: ThreadPoolExecutor = None, slots: asyncio.Semaphore = None):
+        self.model     = model
+        self.max_batch = max_batch
+        self.window    = window
+        self.workers   = max(1, workers)
+        self.threads_per_job = threads_per_job or default_threads(self.workers)
+        self.latency_budget  = latency_budget
+        self.queue     = asyncio.Queue()
+        # 多个档位共享 executor 与 slots 时，worker 名额在档位之间共用
+        self.executor  = executor or make_executor(self.workers, self.threads_per_job)
+        self.slots     = slots
+        self.replicas  = queue.SimpleQueue()
+        self.replicas.put(model)
+        for _ in range(self.workers - 1):
+            self.replicas.put(copy.deepcopy(model))
+        self.busy      = 0
+        self.holding   = 0               # 已出队、等待 worker 名额的请求数
+        self.avg_batch_seconds = None    # 批推理耗时 EWMA，首批完成前不做准入估算
+        self._tasks    = set()
+        self.stats = {"requests": 0, "batches": 0, "batched_items": 0, "max_batch_seen": 0,
+                      "infer_seconds": 0.0, "errors": 0, "rejected": 0, "expired": 0}
+
+    def estimate_seconds(self) -> float:
+        """新请求的预计完成时间：排在前面的批次 + 正在推理的批次 + 自己所在的批次"""
+        if self.avg_batch_seconds is None:
+            return 0.0
+        waves = math.ceil((self.queue.qsize() + self.holding + 1) / (self.max_batch * self.workers))
+        return (waves + self.busy / self.workers) * self.avg_batch_seconds
+
+    async def submit(self, samples: np.ndarray, language: str = None, initial_prompt: str = None,
+                     timeout: float = None) -> dict:
+        self.stats["requests"] += 1
+        expected = self.estimate_seconds()
+        if expected > self.latency_budget:
+            self.stats["rejected"] += 1
+            raise Overloaded(max(1, math.ceil(expected - self.latency_budget)))
+
+        loop     = asyncio.get_running_loop()
+        future   = loop.create_future()
+        deadline = loop.time() + timeout if timeout else math.inf
+        await self.queue.put(_Job(samples, language, initial_prompt, future, deadline))
+        return await future
+
+    async def _collect(self, first: _Job) -> list:
+        loop  = asyncio.get_running_loop()
+        batch = [first]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # 窗口结束时队列里已经积压的也一并带上
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def run(self):
+        slots = self.slots or asyncio.Semaphore(self.workers)
+        while True:
+            # 先等到本档位有请求再占 worker 名额：多个档位共享名额时，空闲档位不能占着名额空等
+            first = await self.queue.get()
+            self.holding = 1
+            try:
+                # 所有 worker 都在推理时不取新批次，其余请求留在队列中继续累积
+                await slots.acquire()
+            finally:
+                self.holding = 0
+            batch = await self._collect(first)
+            task  = asyncio.ensure_future(self._process(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _process(self, batch: list):
+        loop = asyncio.get_running_loop()
+        now  = loop.time()
+        groups = {}
+        for job in batch:
+            if job.future.done():           # 客户端已断开
+                continue
+            if job.deadline <= now:
+                self.stats["expired"] += 1
+                job.future.set_exception(DeadlineExceeded("Transcription deadline exceeded while queued"))
+                continue
+            groups.setdefault(job.options_key, []).append(job)
+
+        self.busy += 1
+        try:
+            for jobs in groups.values():
+                await self._run_group(loop, jobs)
+        finally:
+            self.busy -= 1
+
+    async def _run_group(self, loop, jobs: list):
+        started = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, self._infer, jobs)
+        except Exception as e:
+            logger.exception("Whisper batch inference failed")
+            self.stats["errors"] += 1
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats["infer_seconds"] += elapsed
+
+        self.avg_batch_seconds = elapsed if self.avg_batch_seconds is None \
+            else 0.8 * self.avg_batch_seconds + 0.2 * elapsed
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(jobs)
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(jobs))
+        for job, result in zip(jobs, results):
+            if not job.future.done():
+                job.future.set_result(result)
+
+    # ——— 推理线程 ———
+
+    def _infer(self, jobs: list) -> list:
+        model = self.replicas.get()
+        try:
+            return self._infer_with(model, jobs)
+        finally:
+            self.replicas.put(model)
+
+    def _infer_with(self, model, jobs: list) -> list:
+        import torch
+        import whisper
+
+        language, prompt = jobs[0].options_key
+        results = [None] * len(jobs)
+        short   = [i for i, job in enumerate(jobs) if len(job.samples) <= BATCH_MAX_SAMPLES]
+
+        if short:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(jobs[i].samples), n_mels=model.dims.n_mels)
+                for i in short
+            ])
+            options = whisper.DecodingOptions(language=language, prompt=prompt,
+                                              fp16=False, without_timestamps=True)
+            with torch.inference_mode():
+                decoded = whisper.decode(model, mel, options)
+            for i, res in zip(short, decoded):
+                silent = res.no_speech_prob > NO_SPEECH_THRESHOLD and res.avg_logprob < LOGPROB_THRESHOLD
+                results[i] = {'text': "" if silent else res.text.strip(), 'language': res.language}
+
+        for i, job in enumerate(jobs):
+            if results[i] is None:
+                out = model.transcribe(job.samples, language=language,
+                                       initial_prompt=prompt, fp16=False)
+                results[i] = {'text': out.get('text', '').strip(), 'language': out.get('language')}
+        return results
+
+    def snapshot(self) -> dict:
+        stats = dict(self.stats, queued=self.queue.qsize() + self.holding, busy=self.busy, workers=self.workers,
+                     threads_per_job=self.threads_per_job, latency_budget=self.latency_budget,
+                     estimated_seconds=round(self.estimate_seconds(), 3))
+        stats["avg_batch"] = round(stats["batched_items"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["infer_seconds"] = round(stats["infer_seconds"], 3)
+        return stats
+
+
+class TieredScheduler:
+    """按预计完成时间在多个模型档位之间选择；只有一档时等价于单个 MicroBatcher"""
+
+    def __init__(self, tiers: list, max_batch: int = 8, window: float = 0.02,
+                 workers: int = 1, threads_per_job: int = 0, latency_budget: float = 5.0):
+        """tiers：[(模型名, 模型, 选用该档的最大预计完成时间), ...]，按精度从高到低"""
+        workers  = max(1, workers)
+        threads  = threads_per_job or default_threads(workers)
+        executor = make_executor(workers, threads)
+        slots    = asyncio.Semaphore(workers)
+        self.tiers = [
+            (name, limit, MicroBatcher(model, max_batch, window, workers, threads, latency_budget,
+                                       executor=executor, slots=slots))
+            for name, model, limit in tiers
+        ]
+        self.selected = {name: 0 for name, _, _ in self.tiers}
+
+    def select(self):
+        for name, limit, batcher in self.tiers[:-1]:
+            if batcher.estimate_seconds() <= limit:
+                return name, batcher
+        name, _, batcher = self.tiers[-1]
+        return name, batcher
+
+    async def submit(self, samples: np.ndarray, language: str = None, initial_prompt: str = None,
+                     timeout: float = None) -> dict:
+        name, batcher = self.select()
+        self.selected[name] += 1
+        result = await batcher.submit(samples, language, initial_prompt, timeout=timeout)
+        return dict(result, model=name)
+
+    async def run(self):
+        await asyncio.gather(*(batcher.run() for _, _, batcher in self.tiers))
+
+    def describe(self) -> str:
+        _, _, first = self.tiers[0]
+        tiers = ", ".join(name if math.isinf(limit) else f"{name}≤{limit}s" for name, limit, _ in self.tiers)
+        return (f"tiers=[{tiers}], max_batch={first.max_batch}, window={first.window * 1000:.0f}ms, "
+                f"workers={first.workers} x {first.threads_per_job} threads, budget={first.latency_budget:.1f}s")
+
+    def snapshot(self) -> dict:
+        return {
+            'tiers': [dict(batcher.snapshot(), model=name, selected=self.selected[name],
+                           max_latency=None if math.isinf(limit) else limit)
+                      for name, limit, batcher in self.tiers],
+        }
+
+
+class WhisperServer:
+
+    def __init__(self, scheduler: TieredScheduler):
+        self.scheduler = scheduler
+
+    async def _transcribe(self, reader, samples: np.ndarray, header: dict):
+        """
+        排队 / 推理期间同时监听连接：请求发完后客户端不再发送数据，读到 EOF 即已断开（超时放弃或进程退出）。
+        此时取消等待中的 future，_process 出队时跳过，不再为其占用推理资源；返回 None。
+        """
+        job    = asyncio.ensure_future(self.scheduler.submit(samples, header.get("language"),
+                                                             header.get("initial_prompt"),
+                                                             timeout=header.get("timeout")))
+        hangup = asyncio.ensure_future(reader.read(1))
+        try:
+            await asyncio.wait({job, hangup}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            hangup.cancel()
+            if not job.done():
+                job.cancel()
+        if job.cancelled():
+            logger.debug("Client disconnected, transcription cancelled")
+            return None
+        return job.result()
+
+    async def handle(self, reader, writer):
+        try:
+            json_len, payload_len = HEADER.unpack(await reader.readexactly(HEADER.size))
+            header  = json.loads(await reader.readexactly(json_len))
+            payload = await reader.readexactly(payload_len) if payload_len else b""
+
+            op = header.get("op")
+            if op == "transcribe":
+                samples  = np.frombuffer(payload, dtype='<f4')
+                response = await self._transcribe(reader, samples, header)
+                if response is None:        # 客户端已断开，无需回写
+                    writer.close()
+                    return
+            elif op == "stats":
+                response = dict(self.scheduler.snapshot(), models=whisper_model.stats())
+            else:
+                response = {"error": f"unknown op {op!r}", "code": 400}
+        except Overloaded as e:
+            response = {"error": str(e), "code": 429, "retry_after": e.retry_after}
+        except DeadlineExceeded as e:
+            response = {"error": str(e), "code": 503}
+        except (asyncio.IncompleteReadError, ValueError) as e:
+            response = {"error": f"bad request: {e}", "code": 400}
+        except Exception as e:
+            response = {"error": f"inference failed: {e}", "code": 500}
+
+        try:
+            writer.write(pack(response))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, address: str):
+        family, addr = parse_address(address)
+        if isinstance(addr, tuple):
+            server = await asyncio.start_server(self.handle, *addr)
+        else:
+            if os.path.exists(addr):
+                os.remove(addr)     # 上次异常退出遗留的 socket 文件
+            server = await asyncio.start_unix_server(self.handle, path=addr)
+        asyncio.ensure_future(self.scheduler.run())
+        logger.info("Whisper server listening on %s (%s)", address, self.scheduler.describe())
+        async with server:
+            await server.serve_forever()
+
+
+def load_config() -> Config:
+    """只读取 app/config.py，不创建 Flask app（推理服务不需要数据库等扩展）"""
+    config = Config(os.path.dirname(os.path.abspath(__file__)))
+    config.from_object(get_config())
+    return config
+
+
+def main():
+    logging.basicConfig(format='[%(levelname)s] %(asctime)s - %(message)s', level=logging.INFO)
+    config = load_config()
+
+    parser = argparse.ArgumentParser(description="Whisper 推理服务（微批处理）")
+    parser.add_argument("--address",   default=config.get("WHISPER_SERVER_ADDRESS"))
+    parser.add_argument("--max-batch", type=int,   default=config.get("WHISPER_BATCH_SIZE", 8))
+    parser.add_argument("--window-ms", type=float, default=config.get("WHISPER_BATCH_WINDOW_MS", 20))
+    parser.add_argument("--workers",   type=int,   default=config.get("WHISPER_WORKERS", 1))
+    parser.add_argument("--threads",   type=int,   default=config.get("WHISPER_THREADS_PER_JOB", 0))
+    parser.add_argument("--latency-budget", type=float, default=config.get("WHISPER_LATENCY_BUDGET", 5.0))
+    args = parser.parse_args()
+
+    tiers = [(name, whisper_model.warm_start(config, logger, name), limit)
+             for name, limit in whisper_model.tiers(config)]
+
+    async def serve():
+        # asyncio.Semaphore/Queue 需在事件循环内创建
+        scheduler = TieredScheduler(tiers, args.max_batch, args.window_ms / 1000,
+                                    args.workers, args.threads, args.latency_budget)
+        await WhisperServer(scheduler).serve_forever(args.address)
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
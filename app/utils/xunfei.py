@@ -1,44 +1,48 @@
 # 调用讯飞语音评测接口
 
-import os
 import urllib
+import logging
 from datetime import datetime
-from dotenv import load_dotenv
-import wave
 import json
 import base64
-import time
 import hmac
 import hashlib
-import threading
-import xml.etree.ElementTree as ET  # 添加 XML 解析库
-import websocket
-from queue import Queue
-from flask import Flask, jsonify, send_file, after_this_request, current_app,Response,request
 import urllib.parse
+from typing import NamedTuple
+from app.config import get_config
+from app.utils import speex
 
 
-# 加载环境变量
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# 从环境变量中获取配置
-API_KEY = os.getenv('XUNFEI_API_KEY')
-API_SECRET = os.getenv('XUNFEI_API_SECRET')
-APPID = os.getenv('XUNFEI_APPID')
-HOST  = os.getenv('XUNFEI_HOST')
-REQUEST_LINE = os.getenv("XUNFEI_REQUEST_LINE")
+# 配置统一来自 app/config.py
+_cfg = get_config()
+
+API_KEY = _cfg.XUNFEI_API_KEY
+API_SECRET = _cfg.XUNFEI_API_SECRET
+APPID = _cfg.XUNFEI_APPID
+HOST  = _cfg.XUNFEI_HOST
+REQUEST_LINE = _cfg.XUNFEI_REQUEST_LINE
+# 本地联调 / 压测模拟器（app/scrips/ise_simulator.py）时可设为 ws
+SCHEME = _cfg.XUNFEI_SCHEME
 
 
 def get_rfc1123_time():
     return datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S GMT')
 
-def assemble_url_and_headers():
+def assemble_url_and_headers(api_key: str = None, api_secret: str = None):
+    """
+    生成带签名的 wss URL 与请求头。
+    api_key / api_secret 缺省时使用环境变量中的单账号配置（多账号见 xunfei_pool）。
+    """
+    api_key    = api_key or API_KEY
+    api_secret = api_secret or API_SECRET
     date       = get_rfc1123_time()
     sig_origin = f"host: {HOST}\ndate: {date}\n{REQUEST_LINE}"
-    sig_sha    = hmac.new(API_SECRET.encode(), sig_origin.encode(), hashlib.sha256).digest()
+    sig_sha    = hmac.new(api_secret.encode(), sig_origin.encode(), hashlib.sha256).digest()
     sig_base64 = base64.b64encode(sig_sha).decode()
     auth_origin = (
-        f'api_key="{API_KEY}", algorithm="hmac-sha256", ' +
+        f'api_key="{api_key}", algorithm="hmac-sha256", ' +
         f'headers="host date request-line", signature="{sig_base64}"'
     )
     auth_base64 = base64.b64encode(auth_origin.encode()).decode()
@@ -47,7 +51,7 @@ def assemble_url_and_headers():
         "date":          date,
         "host":          HOST
     })
-    url = f"wss://{HOST}/v2/open-ise?{params}"
+    url = f"{SCHEME}://{HOST}/v2/open-ise?{params}"
     headers = [
         f"Host: {HOST}",
         f"Date: {date}",
@@ -59,94 +63,139 @@ def assemble_url_and_headers():
 
 
 
-def on_open(ws, audio_bytes, text):
+# ——— 帧协议常量 ———
+CHUNK_SIZE = 1280   # 每帧音频字节数（16kHz 16bit 单声道下约 40ms）
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+# 尾帧：status=2，结束上传（内容固定，预先序列化）
+LAST_FRAME = json.dumps({
+    "business": {"cmd": "auw", "aus": 4},
+    "data":     {"status": 2}
+})
+
+
+# 上传音频编码：raw（PCM）或 speex-wb（压缩，约为 PCM 体积的 1/10，见 app/utils/speex.py）
+AUDIO_ENCODINGS = ("raw", "speex-wb")
+AUDIO_ENCODING  = _cfg.XUNFEI_AUDIO_ENCODING
+SPEEX_QUALITY   = _cfg.XUNFEI_SPEEX_QUALITY
+if AUDIO_ENCODING not in AUDIO_ENCODINGS:
+    raise ValueError(f"Unknown XUNFEI_AUDIO_ENCODING: {AUDIO_ENCODING}")
+
+
+def ise_params(encoding: str = AUDIO_ENCODING) -> dict:
+    """评测业务参数（不含文本）；aue 随上传编码变化"""
+    return {
+        "sub":       "ise",
+        "ent":       "en_vip",
+        "category":  "read_sentence",
+        "aue":       "raw" if encoding == "raw" else f"{encoding};{SPEEX_QUALITY}",
+        "auf":       "audio/L16;rate=16000",
+        "ttp_skip":  True
+    }
+
+
+# 本部署的评测业务参数，同时用作结果缓存键的一部分
+ISE_PARAMS = ise_params()
+
+
+def build_first_frame(text: str, appid: str = None, params: dict = None) -> str:
     """
-    首帧：cmd=ssb，上送文本；随后分帧上传音频
+    首帧：cmd=ssb，上送评测文本与参数（params 缺省为 ISE_PARAMS）
     """
-    def run():
-        # ——— 首帧：参数阶段 ———
-        first = {
-            "common": {"app_id": APPID},
-            "business": {
-                "cmd":       "ssb",
-                "sub":       "ise",
-                "ent":       "en_vip",
-                "category":  "read_sentence",
-                "aue":       "raw",
-                "auf":       "audio/L16;rate=16000",
-                "text":      "\uFEFF" + text,
-                "ttp_skip":  True
-            },
-            "data": {"status": 0}
-        }
-        ws.send(json.dumps(first))
-
-        # ——— 音频上传阶段 ———
-        chunk_size = 1280
-        interval   = 0.04
-        total      = len(audio_bytes)
-        sent       = 0
-        aus        = 1
-
-        while sent < total:
-            chunk = audio_bytes[sent: sent + chunk_size]
-            sent += chunk_size
-
-            frame = {
-                "business": {"cmd": "auw", "aus": aus},
-                "data":     {"status": 1, "data": base64.b64encode(chunk).decode()}
-            }
-            ws.send(json.dumps(frame))
-            aus = 2  # 后续均为中间帧
-            time.sleep(interval)
-
-        # ——— 尾帧：status=2，结束上传 ———
-        last = {
-            "business": {"cmd": "auw", "aus": 4},
-            "data":     {"status": 2}
-        }
-        ws.send(json.dumps(last))
-
-    threading.Thread(target=run).start()
-
-
-def websocket_thread(audio_bytes: bytes, text: str) -> str:
+    first = {
+        "common": {"app_id": appid or APPID},
+        "business": {
+            "cmd":  "ssb",
+            **(params or ISE_PARAMS),
+            "text": "\uFEFF" + text,
+        },
+        "data": {"status": 0}
+    }
+    return json.dumps(first)
+
+
+# 音频帧模板：只有 aus 与 data 会变化，其余部分预先拼好，避免每帧 json.dumps
+_FRAME_PREFIX = {
+    1: '{"business": {"cmd": "auw", "aus": 1}, "data": {"status": 1, "data": "',
+    2: '{"business": {"cmd": "auw", "aus": 2}, "data": {"status": 1, "data": "',
+}
+_FRAME_SUFFIX = '"}}'
+
+
+def build_audio_frames(audio_bytes: bytes, chunk_size: int = CHUNK_SIZE) -> list:
     """
-    同步 WebSocket 调用，直接返回科大讯飞 data.data 字段（XML 原始字符串）。
+    把音频字节切分为 cmd=auw 的音频帧（已序列化为 JSON 字符串）。
+    第一帧 aus=1，后续中间帧均为 aus=2。
+    通过 memoryview 切片零拷贝取块，Base64 结果直接填入预拼好的模板。
     """
-    url, headers = assemble_url_and_headers()
-    result_queue = Queue()
-
-    def on_message(ws, message):
-        msg = json.loads(message)
-        # 业务码不为 0
-        if msg.get("code") != 0:
-            result_queue.put(None)
-            ws.close()
-            return
-
-        payload = msg.get("data", {})
-        # status==2 表示最后一帧，此时 data 就是原始 XML
-        if payload.get("status") == 2 and payload.get("data") is not None:
-            xml_str = payload["data"]
-            result_queue.put(xml_str)
-            ws.close()
-
-    def on_error(ws, error):
-        result_queue.put(None)
-        ws.close()
-
-    ws_app = websocket.WebSocketApp(
-        url,
-        header     = headers,
-        on_open    = lambda ws: on_open(ws, audio_bytes, text),
-        on_message = on_message,
-        on_error   = on_error,
-        on_close   = lambda ws, code, msg: None
+    view = memoryview(audio_bytes)
+    return _auw_frames(view[sent: sent + chunk_size] for sent in range(0, len(view), chunk_size))
+
+
+def _auw_frames(chunks) -> list:
+    frames = []
+    aus    = 1
+    for chunk in chunks:
+        b64 = base64.b64encode(chunk).decode('ascii')
+        frames.append(_FRAME_PREFIX[aus] + b64 + _FRAME_SUFFIX)
+        aus = 2  # 后续均为中间帧
+    return frames
+
+
+class AudioPayload(NamedTuple):
+    """编码、分帧后待上传的音频"""
+    params:        dict    # 首帧业务参数（speex 编码失败回退 raw 时 aue 随之变化）
+    frames:        list    # 已序列化的 auw 帧
+    frame_seconds: float   # 每帧对应的音频时长，决定发送节奏
+    duration:      float   # 音频总时长（秒）
+    audio_bytes:   int     # 编码后音频字节数（不含 Base64 / JSON 开销）
+
+
+def build_payload(pcm: bytes, encoding: str = AUDIO_ENCODING,
+                  chunk_size: int = CHUNK_SIZE) -> AudioPayload:
+    """
+    16kHz 单声道 PCM → AudioPayload。
+    speex-wb 时按 chunk_size 对应的时长把若干个带帧长前缀的 speex 帧合成一个 auw 帧，
+    编码或分帧失败（如 ffmpeg 缺少 libspeex、帧长超过 255 字节）记录告警并回退为 raw。
+    """
+    duration = len(pcm) / PCM_BYTES_PER_SECOND
+    if encoding == "speex-wb":
+        per_chunk = max(1, round(chunk_size / PCM_BYTES_PER_SECOND / speex.FRAME_SECONDS))
+        try:
+            frames = speex.encode_wb(pcm, SPEEX_QUALITY)
+            chunks = [speex.length_prefixed(frames[i:i + per_chunk])
+                      for i in range(0, len(frames), per_chunk)]
+        except speex.SpeexEncodeError as e:
+            logger.warning("speex-wb encoding failed, falling back to raw: %s", e)
+        else:
+            return AudioPayload(
+                params        = ise_params(encoding),
+                frames        = _auw_frames(chunks),
+                frame_seconds = per_chunk * speex.FRAME_SECONDS,
+                duration      = duration,
+                audio_bytes   = sum(len(c) for c in chunks),
+            )
+    return AudioPayload(
+        params        = ise_params("raw"),
+        frames        = build_audio_frames(pcm, chunk_size),
+        frame_seconds = chunk_size / PCM_BYTES_PER_SECOND,
+        duration      = duration,
+        audio_bytes   = len(pcm),
     )
-    ws_app.run_forever()
 
-    return result_queue.get()  # 取到的就是 XML 字符串，或 None（出错）
+
+def websocket_thread(audio_bytes: bytes, text: str, timeout: float = None,
+                     extra_slots=None) -> str:
+    """
+    同步调用讯飞 ISE，直接返回科大讯飞 data.data 字段（XML 原始字符串），出错返回 None；
+    讯飞持续故障被熔断时抛出 xunfei_async.IseUnavailable。
+    extra_slots 为 ise_governor.IseSlot，对冲会话须先从中申请到额外许可。
+
+    保留原有函数名和返回约定，内部委托给 xunfei_async 的共享事件循环：
+    调用线程只阻塞等待结果，不再为每个请求额外创建 WebSocket / 上传线程。
+    """
+    from app.utils.xunfei_async import evaluate
+    return evaluate(audio_bytes, text, timeout=timeout, extra_slots=extra_slots)
 
 # def upload_audio():
 #     # 参数校验
@@ -172,74 +221,3 @@ def websocket_thread(audio_bytes: bytes, text: str) -> str:
 #
 #     # 直接返回原始 XML
 #     return jsonify({'data': xml_result})
-
-
-
-
-def etree_to_dict(elem):
-    d = {}
-    if elem.attrib:
-        d['@attrib'] = dict(elem.attrib)
-    children = list(elem)
-    if children:
-        dd = {}
-        for child in children:
-            child_res = etree_to_dict(child)
-            tag = child.tag
-            if tag in dd:
-                if not isinstance(dd[tag], list):
-                    dd[tag] = [dd[tag]]
-                dd[tag].append(child_res[tag])
-            else:
-                dd[tag] = child_res[tag]
-        d.update(dd)
-    text = (elem.text or '').strip()
-    if text:
-        d['#text'] = text
-    return {elem.tag: d}
-
-# app/utils/xunfei.py
-
-def decode_and_parse(xml_b64: str) -> dict:
-    """
-    接收 Base64 编码的 XML 字符串，解码、解析，并返回 dict 结果。
-    抛出 Exception（或 ParseError）时由上层捕获。
-    """
-    import base64, xml.etree.ElementTree as ET
-    xml_bytes = base64.b64decode(xml_b64)
-    xml_str   = xml_bytes.decode('utf-8')
-    root      = ET.fromstring(xml_str)
-    return etree_to_dict(root)
-
-
-
-
-# def parse_xml():
-#     """
-#     接收 JSON 格式：
-#     {
-#       "data": "<Base64 编码的 XML 字符串>"
-#     }
-#     返回解析后的 JSON 结构。
-#     """
-#     payload = request.get_json(force=True, silent=True)
-#     if not payload or 'data' not in payload:
-#         return jsonify({'error': '请在请求体中提供 Base64 编码的 data 字段'}), 400
-#
-#     xml_b64 = payload['data']
-#     # 1. 解 Base64
-#     try:
-#         xml_bytes = base64.b64decode(xml_b64)
-#         xml_str   = xml_bytes.decode('utf-8')
-#     except Exception as e:
-#         return jsonify({'error': 'Base64 解码失败', 'detail': str(e)}), 400
-#
-#     # 2. 解析 XML
-#     try:
-#         root = ET.fromstring(xml_str)
-#     except ET.ParseError as e:
-#         return jsonify({'error': 'XML 解析失败', 'detail': str(e)}), 400
-#
-#     # 3. 转成 dict / JSON
-#     parsed = etree_to_dict(root)
-#     return jsonify(parsed), 200
\ No newline at end of file
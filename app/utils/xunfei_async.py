@@ -0,0 +1,428 @@
+# 讯飞语音评测（ISE）asyncio 客户端
+
+# app/utils/xunfei_async.py
+
+"""
+所有评测会话跑在同一个后台事件循环上：
+  - 每个进程只有一个事件循环线程，N 个并发评测 = N 个协程，而不是 2N 个 OS 线程
+  - 协议与 xunfei.py 完全一致（ssb 首帧 → auw 音频帧 → 尾帧），签名复用 assemble_url_and_headers
+  - evaluate_async 供协程调用方直接 await；evaluate 为同步门面，供 Flask 视图等现有调用方使用
+"""
+
+import os
+import json
+import asyncio
+import logging
+import random
+import threading
+from collections import deque
+from typing import Optional
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus, WebSocketException
+
+from app.utils.xunfei import (
+    assemble_url_and_headers,
+    build_first_frame,
+    build_payload,
+    AudioPayload,
+    AUDIO_ENCODING,
+    LAST_FRAME,
+)
+from app.config import get_config
+from app.utils.ise_pacing import get_pacer
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.xunfei_pool import get_pool, is_quota_error
+
+logger = logging.getLogger(__name__)
+
+_cfg = get_config()
+
+# 单进程内允许同时进行的评测会话数（防止突发流量耗尽文件描述符）
+MAX_SESSIONS    = _cfg.XUNFEI_MAX_SESSIONS
+# 建立 WebSocket 连接（含 TLS 握手）的超时秒数
+OPEN_TIMEOUT    = _cfg.XUNFEI_OPEN_TIMEOUT
+# 音频上传完成后等待评测结果的最长秒数（单次尝试）
+SESSION_TIMEOUT = _cfg.XUNFEI_SESSION_TIMEOUT
+# 一次评测（含重试、对冲）的总截止秒数
+TOTAL_TIMEOUT   = _cfg.XUNFEI_TOTAL_TIMEOUT
+# 失败重试次数及退避基数（秒），退避为 [0, base * 2^n) 的随机值
+RETRIES         = _cfg.XUNFEI_RETRIES
+RETRY_BACKOFF   = _cfg.XUNFEI_RETRY_BACKOFF
+# 对冲请求：主请求超过历史 p95 仍未返回时再开一个会话
+HEDGE_ENABLED   = _cfg.XUNFEI_HEDGE
+# 熔断：连续失败次数阈值与打开后的冷却秒数
+BREAKER_THRESHOLD = _cfg.XUNFEI_BREAKER_THRESHOLD
+BREAKER_COOLDOWN  = _cfg.XUNFEI_BREAKER_COOLDOWN
+
+# 参数校验失败：请求本身有问题，重试无意义
+NON_RETRYABLE_CODES = {10163}
+# 秒级 / 并发流控：讯飞服务正常，只是账号配额用满，照常退避重试但不计入熔断
+THROTTLE_CODES = {11202, 11203}
+
+
+class IseUnavailable(Exception):
+    """讯飞评测服务被熔断，暂不发起新会话"""
+
+
+def _header_pairs(headers: list) -> list:
+    """
+    把 assemble_url_and_headers 返回的 "Name: value" 列表转成 (name, value) 对。
+    Host 由 websockets 根据 URL 自动生成，这里跳过以免重复。
+    """
+    pairs = []
+    for line in headers:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "host":
+            continue
+        pairs.append((name.strip(), value.strip()))
+    return pairs
+
+
+async def _send_audio(ws, payload: AudioPayload, text: str, appid: str, pacer):
+    """
+    首帧 + 分帧上传音频 + 尾帧；帧间隔按每帧音频时长由 pacer 决定。
+    按累计截止时间调度而非逐帧 sleep，避免发送耗时叠加造成的漂移。
+    """
+    await ws.send(build_first_frame(text, appid, payload.params))
+
+    loop     = asyncio.get_running_loop()
+    deadline = loop.time()
+    for frame in payload.frames:
+        await ws.send(frame)
+        deadline += pacer.delay(payload.frame_seconds)
+        delay = deadline - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await ws.send(LAST_FRAME)
+
+
+async def _run_session(payload: AudioPayload, text: str, cred):
+    """
+    用指定账号跑一次评测会话。
+    返回 (xml, error_code)：成功时 error_code 为 None；失败时 xml 为 None。
+    """
+    pacer = get_pacer()
+    url, headers = assemble_url_and_headers(cred.api_key, cred.api_secret)
+    async with connect(
+        url,
+        additional_headers = _header_pairs(headers),
+        open_timeout       = OPEN_TIMEOUT,
+        max_size           = None,
+    ) as ws:
+        sender = asyncio.create_task(
+            _send_audio(ws, payload, text, cred.appid, pacer))
+        try:
+            async for message in ws:
+                msg = json.loads(message)
+                # 业务码不为 0
+                if msg.get("code") != 0:
+                    logger.warning("ISE error appid=%s code=%s message=%s",
+                                   cred.appid, msg.get("code"), msg.get("message"))
+                    pacer.record_failure()
+                    return None, msg.get("code")
+
+                payload = msg.get("data") or {}
+                # status==2 表示最后一帧，此时 data 就是原始 XML
+                if payload.get("status") == 2 and payload.get("data") is not None:
+                    pacer.record_success()
+                    return payload["data"], None
+        finally:
+            sender.cancel()
+            try:
+                await sender
+            except (asyncio.CancelledError, Exception):
+                pass
+    # 服务端在给出结果前关闭了连接
+    pacer.record_failure()
+    return None, -1
+
+
+class _EvalLoop:
+    """
+    进程级后台事件循环。
+    首次使用时懒启动；fork 之后（gunicorn / celery prefork）按 pid 检测并在子进程内重建。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid  = None
+        self._semaphore = None
+
+    def _ensure_started(self):
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="xunfei-ise-loop",
+                    daemon=True,
+                )
+                thread.start()
+                self._semaphore = None
+                self._loop = loop
+                self._pid  = os.getpid()
+        return self._loop
+
+    def semaphore(self) -> asyncio.Semaphore:
+        """在事件循环线程内调用，懒创建会话并发上限"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(MAX_SESSIONS)
+        return self._semaphore
+
+    def submit(self, coro):
+        """把协程投递到后台循环，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+
+_eval_loop = _EvalLoop()
+
+
+async def _evaluate_with_failover(payload: AudioPayload, text: str, timeout: float):
+    """
+    从账号池选账号评测；账号被流控或握手被拒（鉴权失败）时换下一个账号重试，
+    每个账号最多尝试一次，全部会话须在 timeout 秒内结束（超时抛出 asyncio.TimeoutError）。
+    返回 (xml, error_code)。
+    超时与连接异常记为账号失败；被取消（对冲落败、总截止时间到）不影响账号健康状态。
+    """
+    pool     = get_pool()
+    loop     = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    tried    = []
+    xml, error_code = None, -1
+    while len(tried) < len(pool.credentials):
+        cred = pool.acquire(exclude=tried)
+        tried.append(cred)
+        try:
+            xml, error_code = await asyncio.wait_for(
+                _run_session(payload, text, cred), max(0.0, deadline - loop.time()))
+        except InvalidStatus as e:
+            xml, error_code = None, e.response.status_code
+            logger.warning("ISE handshake rejected appid=%s status=%s",
+                           cred.appid, error_code)
+        except asyncio.CancelledError:
+            pool.release(cred, ok=None)
+            raise
+        except BaseException:
+            pool.release(cred, ok=False)
+            raise
+
+        pool.release(cred, ok=xml is not None, error_code=error_code)
+        if xml is not None or not is_quota_error(error_code):
+            break
+    return xml, error_code
+
+
+class _LatencyTracker:
+    """
+    记录最近成功会话的"额外等待时间"（总耗时 - 音频上传耗时），
+    用其 p95 作为对冲请求的触发点；样本不足时不对冲。
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples     = deque(maxlen=size)
+        self._min_samples = min_samples
+
+    def record(self, excess: float):
+        self._samples.append(max(0.0, excess))
+
+    def p95(self) -> Optional[float]:
+        if len(self._samples) < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+_latency = _LatencyTracker()
+
+breaker = CircuitBreaker(
+    "xunfei-ise",
+    failure_threshold = BREAKER_THRESHOLD,
+    cooldown          = BREAKER_COOLDOWN,
+)
+
+
+def _upload_seconds(payload: AudioPayload) -> float:
+    """按当前节奏上传这段音频预计需要的秒数"""
+    return get_pacer().delay(payload.duration)
+
+
+async def _prepare_payload(audio_bytes: bytes, encoding: str) -> AudioPayload:
+    """
+    编码、分帧只做一次，重试与对冲会话共用。
+    speex 编码要起 ffmpeg 子进程，放到线程池里执行，不阻塞事件循环。
+    """
+    chunk_size = get_pacer().frame_bytes
+    if encoding == "raw":
+        return build_payload(audio_bytes, encoding, chunk_size)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, build_payload, audio_bytes, encoding, chunk_size)
+
+
+async def _attempt(payload: AudioPayload, text: str):
+    """
+    单次尝试：上传耗时 + SESSION_TIMEOUT 内必须拿到结果。
+    超时、连接异常都归为可重试错误 (None, -1)。
+    """
+    loop    = asyncio.get_running_loop()
+    upload  = _upload_seconds(payload)
+    started = loop.time()
+    try:
+        xml, error_code = await _evaluate_with_failover(payload, text, upload + SESSION_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("ISE session timed out after %.1fs", loop.time() - started)
+        get_pacer().record_failure()
+        return None, -1
+    except (OSError, WebSocketException) as e:
+        logger.warning("ISE session failed: %r", e)
+        get_pacer().record_failure()
+        return None, -1
+
+    if xml is not None:
+        _latency.record(loop.time() - started - upload)
+    return xml, error_code
+
+
+async def _hedged_attempt(payload: AudioPayload, text: str, extra_slots=None):
+    """
+    对冲：主请求在 (上传耗时 + 历史 p95 额外等待) 内没有返回时，再发起一个会话，
+    取先成功的那个，另一个取消。
+    对冲会话多占用一个讯飞并发，须先从 extra_slots（ise_governor.IseSlot）申请到额外许可，
+    集群配额已满时不对冲，继续等主请求；extra_slots 为 None 时不受限制。
+    """
+    p95 = _latency.p95() if HEDGE_ENABLED else None
+    if p95 is None:
+        return await _attempt(payload, text)
+
+    primary = asyncio.ensure_future(_attempt(payload, text))
+    done, _ = await asyncio.wait({primary}, timeout=_upload_seconds(payload) + p95)
+    if done:
+        return primary.result()
+
+    ticket = None
+    if extra_slots is not None:
+        ticket = await asyncio.get_running_loop().run_in_executor(None, extra_slots.try_extra)
+        if ticket is None:
+            logger.info("ISE hedge skipped: no free governor slot")
+            return await primary
+
+    logger.info("ISE hedging: primary slower than p95 (%.2fs)", p95)
+    pending = {primary, asyncio.ensure_future(_attempt(payload, text))}
+    result  = (None, -1)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[0] is not None:
+                    return result
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
+        if ticket is not None:
+            extra_slots.release_extra(ticket)
+
+
+async def _evaluate_resilient(audio_bytes: bytes, text: str,
+                              encoding: str = AUDIO_ENCODING, extra_slots=None) -> Optional[str]:
+    """
+    编码分帧 → 熔断检查 → (对冲)尝试 → 失败按带抖动的指数退避重试，整体不超过 TOTAL_TIMEOUT。
+    参数类错误不重试；熔断打开时抛出 IseUnavailable。
+    """
+    payload = await _prepare_payload(audio_bytes, encoding)
+    try:
+        breaker.before_call()
+    except CircuitOpenError as e:
+        raise IseUnavailable(str(e))
+
+    loop     = asyncio.get_running_loop()
+    deadline = loop.time() + TOTAL_TIMEOUT
+    # True：服务正常；False：计一次熔断失败；None：被取消或只遇到流控，不计入熔断
+    healthy  = False
+    try:
+        for attempt in range(RETRIES + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                xml, error_code = await asyncio.wait_for(
+                    _hedged_attempt(payload, text, extra_slots), remaining)
+            except asyncio.TimeoutError:
+                healthy = False
+                break
+
+            if xml is not None:
+                healthy = True
+                return xml
+            if error_code in NON_RETRYABLE_CODES:
+                # 请求本身有问题，讯飞服务是正常的
+                healthy = True
+                return None
+            healthy = None if error_code in THROTTLE_CODES else False
+
+            backoff = random.uniform(0, RETRY_BACKOFF * (2 ** attempt))
+            if attempt < RETRIES and loop.time() + backoff < deadline:
+                logger.info("ISE retry %d/%d in %.2fs (code=%s)",
+                            attempt + 1, RETRIES, backoff, error_code)
+                await asyncio.sleep(backoff)
+        return None
+    except asyncio.CancelledError:
+        healthy = None
+        raise
+    finally:
+        if healthy:
+            breaker.record_success()
+        elif healthy is None:
+            breaker.record_neutral()
+        else:
+            breaker.record_failure()
+
+
+async def evaluate_async(audio_bytes: bytes, text: str,
+                         encoding: str = None, extra_slots=None) -> Optional[str]:
+    """
+    协程版评测，返回讯飞 data.data 字段（Base64 XML），出错返回 None；
+    熔断打开时抛出 IseUnavailable。
+    encoding 为上传编码（raw / speex-wb），缺省取 XUNFEI_AUDIO_ENCODING。
+    extra_slots 为调用方持有的 ise_governor.IseSlot，对冲会话从中申请额外许可。
+    在后台循环中调用时受 MAX_SESSIONS 约束；在其他循环中调用时由调用方自行限流。
+    """
+    encoding = encoding or AUDIO_ENCODING
+    semaphore = None
+    if asyncio.get_running_loop() is _eval_loop._loop:
+        semaphore = _eval_loop.semaphore()
+    try:
+        if semaphore is None:
+            return await _evaluate_resilient(audio_bytes, text, encoding, extra_slots)
+        async with semaphore:
+            return await _evaluate_resilient(audio_bytes, text, encoding, extra_slots)
+    except IseUnavailable:
+        raise
+    except Exception:
+        logger.exception("ISE websocket session failed")
+        get_pacer().record_failure()
+        return None
+
+
+def evaluate(audio_bytes: bytes, text: str, timeout: float = None,
+             encoding: str = None, extra_slots=None) -> Optional[str]:
+    """
+    同步门面：把评测投递到共享事件循环并阻塞等待结果。
+    timeout 默认比 TOTAL_TIMEOUT 多留几秒余量；超时会取消对应会话并返回 None。
+    熔断打开时抛出 IseUnavailable，由调用方转成"服务暂不可用"。
+    """
+    if timeout is None:
+        timeout = TOTAL_TIMEOUT + 5
+    future = _eval_loop.submit(evaluate_async(audio_bytes, text, encoding, extra_slots))
+    try:
+        return future.result(timeout)
+    except IseUnavailable:
+        raise
+    except Exception:
+        future.cancel()
+        logger.exception("ISE evaluation did not complete")
+        return None
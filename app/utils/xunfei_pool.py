@@ -0,0 +1,148 @@
+# 讯飞多账号池：加权负载均衡 + 健康检查 + 自动故障转移
+
+# app/utils/xunfei_pool.py
+
+"""
+单个 APPID 的并发配额决定了评测吞吐上限，这里把多个账号组成一个池：
+  - 平滑加权轮询（与 nginx 相同的 smooth weighted round-robin）选择账号
+  - 账号返回流控类错误码（11200~11203）或握手被拒（401/403/429）时进入冷却期
+  - 其他错误连续出现 3 次也进入较短的冷却期；成功一次即清零
+  - 所有账号都在冷却时，选择最早恢复的那个，保证请求仍有去处
+
+账号配置来自 app/config.py 的 XUNFEI_CREDENTIALS；池在进程内共享，
+会在评测事件循环线程中使用，因此不依赖 Flask 应用上下文。
+"""
+
+import time
+import threading
+from app.config import get_config
+
+# 讯飞授权 / 流控类错误码：未授权或业务量超限、日流控、秒级流控、并发流控
+QUOTA_ERROR_CODES = {11200, 11201, 11202, 11203}
+# 握手阶段被拒的 HTTP 状态码（签名错误、账号无权限、限流），同样换账号
+QUOTA_HTTP_STATUSES = {401, 403, 429}
+
+# 连续失败多少次后进入冷却
+FAILURE_THRESHOLD = 3
+
+
+def is_quota_error(code) -> bool:
+    """该错误是否与账号本身相关（换一个账号可能成功）"""
+    return code in QUOTA_ERROR_CODES or code in QUOTA_HTTP_STATUSES
+
+
+class Credential:
+    """一组讯飞账号凭证及其健康状态"""
+
+    def __init__(self, appid: str, api_key: str, api_secret: str,
+                 weight: int = 1, max_concurrency: int = 50):
+        self.appid           = appid
+        self.api_key         = api_key
+        self.api_secret      = api_secret
+        self.weight          = max(1, int(weight))
+        self.max_concurrency = int(max_concurrency)
+
+        self.current_weight  = 0      # 平滑加权轮询的动态权重
+        self.failures        = 0      # 连续失败次数
+        self.cooldown_until  = 0.0    # 冷却截止时间（time.monotonic）
+        self.in_flight       = 0
+        self.successes_total = 0
+        self.failures_total  = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class CredentialPool:
+
+    def __init__(self, credentials: list, quota_cooldown: float = 60.0,
+                 failure_cooldown: float = 15.0):
+        if not credentials:
+            raise RuntimeError("No Xunfei credentials configured (XUNFEI_CREDENTIALS / XUNFEI_APPID)")
+        self.credentials      = credentials
+        self.quota_cooldown   = quota_cooldown
+        self.failure_cooldown = failure_cooldown
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=()) -> Credential:
+        """选出一个账号并计入 in_flight；exclude 为本次请求已经失败过的账号"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [c for c in self.credentials
+                          if c.healthy(now) and c not in exclude]
+            # 优先使用本进程内尚未占满自身并发配额的账号
+            candidates = [c for c in candidates if c.in_flight < c.max_concurrency] or candidates
+            if not candidates:
+                # 全部冷却：退而求其次，选最早恢复且本次未试过的账号
+                rest = [c for c in self.credentials if c not in exclude] or self.credentials
+                chosen = min(rest, key=lambda c: c.cooldown_until)
+            else:
+                total = 0
+                chosen = None
+                for c in candidates:
+                    c.current_weight += c.weight
+                    total += c.weight
+                    if chosen is None or c.current_weight > chosen.current_weight:
+                        chosen = c
+                chosen.current_weight -= total
+            chosen.in_flight += 1
+            return chosen
+
+    def release(self, cred: Credential, ok, error_code: int = None):
+        """
+        会话结束后回报结果，更新健康状态。
+        ok 为 None 表示会话被取消（对冲落败、调用方超时），只归还 in_flight，不计成功也不计失败。
+        """
+        with self._lock:
+            cred.in_flight = max(0, cred.in_flight - 1)
+            if ok is None:
+                return
+            if ok:
+                cred.failures = 0
+                cred.successes_total += 1
+                return
+
+            cred.failures += 1
+            cred.failures_total += 1
+            now = time.monotonic()
+            if is_quota_error(error_code):
+                cred.cooldown_until = now + self.quota_cooldown
+            elif cred.failures >= FAILURE_THRESHOLD:
+                cred.cooldown_until = now + self.failure_cooldown
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        return [{
+            "appid":     c.appid,
+            "weight":    c.weight,
+            "healthy":   c.healthy(now),
+            "cooldown":  round(max(0.0, c.cooldown_until - now), 1),
+            "in_flight": c.in_flight,
+            "successes": c.successes_total,
+            "failures":  c.failures_total,
+        } for c in self.credentials]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> CredentialPool:
+    """进程级共享账号池，按 app/config.py 懒创建"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                cfg = get_config()
+                _pool = CredentialPool(
+                    [Credential(
+                        appid           = c["appid"],
+                        api_key         = c["api_key"],
+                        api_secret      = c["api_secret"],
+                        weight          = c.get("weight", 1),
+                        max_concurrency = c.get("max_concurrency", 50),
+                    ) for c in cfg.XUNFEI_CREDENTIALS],
+                    quota_cooldown   = cfg.XUNFEI_QUOTA_COOLDOWN,
+                    failure_cooldown = cfg.XUNFEI_FAILURE_COOLDOWN,
+                )
+    return _pool
@@ -9,17 +9,29 @@
 # app/views/evaluate.py
 
 import os
-import tempfile
-import wave
-import subprocess
-import shlex
-import whisper
-from flask import Blueprint, request, current_app
+import json
+import time
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, current_app, Response, stream_with_context
 from werkzeug.utils import secure_filename 
-import xml.etree.ElementTree as ET  # 添加 XML 解析库
-from app.models import Question
+from app.models import Question, PracticeRecord
+import app.extensions as ext
 from app.utils.response import Result
-from app.utils.xunfei import etree_to_dict,websocket_thread,decode_and_parse
+from app.utils.id_generator import gen_nanoid
+from app.utils.ise_pipeline import (evaluate_wav, evaluate_pcm, prepare_pcm, transcode_to_pcm,
+                                    EvaluationError, transcode_stats)
+from app.utils.audio import load_audio, AudioDecodeError, pcm16_to_wav
+from app.utils import audio_store
+from app.utils import vad, text_align, transcribe_cache, ise_cache
+from app.utils import whisper_model, whisper_client
+from app.utils.whisper_client import WhisperUnavailable
+from app.utils.audio_quality import rejection_stats
+from app.utils import ise_jobs
+from app.utils.ise_governor import queue_stats
+from app.utils.xunfei_pool import get_pool
+from app.utils.xunfei_async import breaker
+from app.views.session import get_current_user_id
 
 import warnings
 warnings.filterwarnings("ignore", message=".*weights_only=False.*", category=FutureWarning)
@@ -27,28 +39,42 @@ warnings.filterwarnings("ignore", message=".*weights_only=False.*", category=Fut
 
 eval_bp = Blueprint('evaluate', __name__, url_prefix='/api/evaluate')
 
-# 全局模型实例
-_model = None
+AUDIO_SUFFIXES = ('.wav', '.mp3', '.m4a', '.flac', '.mp4')
 
-def get_whisper_model():
+
+def _transcribe(samples, question=None):
     """
-    懒加载 Whisper 模型，并指定本地缓存目录：
-      - cache_dir: D:\whisper_cache
-      - download_root: Whisper 会把模型权重存放在此处
+    16kHz 单声道 float32 → (result, cached)
+    按题作答时固定英文并以题干引导解码；先查内容寻址缓存（app/utils/transcribe_cache.py），
+    未命中再调用 Whisper：默认进程内推理；WHISPER_BACKEND=server 时发给独立推理服务（与其他 worker 的请求合并成批），见 app/utils/whisper_server.py。
+    推理服务不可用或过载时抛出 WhisperUnavailable。
     """
-    global _model
-    if _model is None:
-        # 1. 确保缓存目录存在
-        cache_dir = r"D:\whisper_cache"
-        os.makedirs(cache_dir, exist_ok=True)
-
-        # 2. 加载模型并指定 download_root
-        model_name = current_app.config.get('WHISPER_MODEL', 'tiny')
-        _model = whisper.load_model(
-            model_name,
-            download_root=cache_dir
-        )
-    return _model
+    language, prompt = ('en', question.text) if question is not None else (None, None)
+    audio_hash = transcribe_cache.audio_digest(samples)
+    result = transcribe_cache.get(audio_hash, language, prompt)
+    if result is not None:
+        return result, True
+    result = whisper_client.transcribe(samples, language=language, initial_prompt=prompt)
+    transcribe_cache.put(audio_hash, result, language, prompt)
+    return result, False
+
+
+def _transcript_data(result: dict, cached: bool, question=None) -> dict:
+    data = {'text': result.get('text', ''), 'language': result.get('language'),
+            'model': result.get('model'), 'cached': cached}
+    if question is not None:
+        data['expected']  = question.text
+        data['alignment'] = text_align.compare(question.text, data['text'])
+    return data
+
+
+def _whisper_error(e: WhisperUnavailable):
+    current_app.logger.warning("Whisper server error: %s", e)
+    if e.code == 429:
+        # 过载保护：HTTP 429 + Retry-After，客户端按提示退避后重试
+        return Result.error(429, msg=str(e), data={'retry_after': e.retry_after}), \
+            429, {'Retry-After': str(e.retry_after)}
+    return Result.error(e.code, msg=str(e))
 
 
 @eval_bp.route('/transcribe', methods=['POST'])
@@ -56,7 +82,17 @@ def transcribe_audio():
     """
     POST /api/evaluate/transcribe
     - 接收 form-data 的音频文件（.wav/.mp3/.m4a/.flac/.mp4）
-    - 返回 JSON { code, msg, data: { text: 转写结果 } }
+    - 可选 question_id：按题作答模式。题干均为英文，转写固定为英文（跳过语种检测），
+      并以题干作为 initial_prompt 引导解码；结果附带与题干的逐词对齐（见 app/utils/text_align.py）
+    - 返回 JSON { code, msg, data: {
+        text: 转写结果,
+        audio: { duration, speech_duration, trim_start, trim_end },
+        language,
+        model: 实际使用的 Whisper 模型档位（负载高时自动降级，见 WHISPER_MODEL_TIERS）,
+        cached: 是否命中转写缓存（同一段录音重复提交不再推理）,
+        expected, alignment: { words, summary }    # 仅按题作答模式
+      } }
+    - 推理服务过载（预计完成时间超过 WHISPER_LATENCY_BUDGET）时返回 HTTP 429 + Retry-After
     """
     # 验证上传
     if 'file' not in request.files:
@@ -68,31 +104,73 @@ def transcribe_audio():
     # 校验格式
     filename = secure_filename(file.filename)
     suffix   = os.path.splitext(filename)[1].lower()
-    if suffix not in ('.wav', '.mp3', '.m4a', '.flac', '.mp4'):
+    if suffix not in AUDIO_SUFFIXES:
         return Result.error(400, msg="Unsupported audio format")
 
-    # 写入临时文件（兼容 Windows）
-    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
-    os.close(fd)
+    # 按题作答模式：查询题干
+    question = None
+    qid = request.form.get('question_id')
+    if qid:
+        question = Question.query.get(qid)
+        if not question:
+            return Result.error(404, msg="Question not found")
+
+    # 进程内解码为 16kHz 单声道 float32，直接交给 Whisper（不再写临时文件、由 Whisper fork ffmpeg）
     try:
-        file.save(tmp_path)
+        samples = load_audio(file.read())
+    except AudioDecodeError:
+        return Result.error(400, msg="Unable to decode audio")
 
-        # 调用 Whisper 转写
-        try:
-            model  = get_whisper_model()
-            result = model.transcribe(tmp_path, language=None, fp16=False)
-            text   = result.get('text', '').strip()
-        except Exception as e:
-            current_app.logger.exception("Whisper transcription failed")
-            return Result.error(500, msg=f"Transcription error: {e}")
+    # 裁掉首尾静音，减少 Whisper 解码时长
+    trimmed, span = vad.trim(samples, **vad.config_options())
+    if vad.enabled():
+        samples = trimmed
 
-        return Result.ok(data={'text': text})
+    # 调用 Whisper 转写（先查缓存）
+    try:
+        result, cached = _transcribe(samples, question)
+    except WhisperUnavailable as e:
+        return _whisper_error(e)
+    except Exception as e:
+        current_app.logger.exception("Whisper transcription failed")
+        return Result.error(500, msg=f"Transcription error: {e}")
+
+    return Result.ok(data=dict(_transcript_data(result, cached, question), audio=span.to_dict()))
 
-    finally:
+
+@eval_bp.route('/transcribe/status', methods=['GET'])
+def transcribe_status():
+    """
+    GET /api/evaluate/transcribe/status
+    WHISPER_BACKEND=local：
+      { models: { 模型名: { model, cache_dir, pid, load_seconds, warmup_seconds, rss_before_mb, rss_after_mb } },
+        current_pid, rss_mb }
+      pid 为加载模型的进程（--preload 时为 master），current_pid 为处理本请求的 worker。
+    WHISPER_BACKEND=server：推理服务各档位的批处理统计
+      { tiers: [ { model, max_latency, selected, requests, batches, batched_items, avg_batch, max_batch_seen,
+                   infer_seconds, errors, rejected, expired, queued, busy, workers, threads_per_job,
+                   latency_budget, estimated_seconds } ],
+        models: {...同上} }
+    两种模式都附带 cache: { hits, local_hits, misses, entries, local_entries, hit_rate }（转写缓存）
+    """
+    if current_app.config.get('WHISPER_BACKEND', 'local') == 'local':
+        data = whisper_model.stats()
+    else:
         try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
+            data = whisper_client.server_stats()
+        except WhisperUnavailable as e:
+            return Result.error(e.code, msg=str(e))
+    return Result.ok(data=dict(data, cache=transcribe_cache.stats()))
+
+
+def _client_id() -> str:
+    """公平排队维度：已登录用 user_id，否则用客户端 IP"""
+    return get_current_user_id() or request.remote_addr
+
+
+def _want_detail() -> bool:
+    """detail=1/true 时逐词返回音节、音素明细"""
+    return request.form.get('detail', '').lower() in ('1', 'true', 'yes')
 
 
 @eval_bp.route('/ise', methods=['POST'])
@@ -102,13 +180,15 @@ def ise_evaluate():
     form-data:
       - question_id: 题目 ID（string）
       - audio:       任意采样率／声道的 WAV 文件
-
-    后端流程：
-      1. 保存上传文件
-      2. 调用 FFmpeg 转码至 16kHz 单声道 WAV
-      3. 读取 PCM 数据并发给讯飞 WebSocket
-      4. Base64 解码并解析 XML → dict
-      5. 扁平化提取分数返回
+      - detail:      可选，1/true 时 words 中附带 syllables（含 phones）明细
+
+    后端流程（见 app/utils/ise_pipeline.py）：
+      1. 已是 16kHz 单声道 16 位 WAV 时直接取 PCM；否则进程内解码并重采样（特殊格式才回退 FFmpeg）
+      2. 质量预检（时长、音量、削波、语音占比），不合格直接返回 422 { reason, metrics }
+         裁掉首尾静音（VAD），先查内容寻址缓存
+      3. 未命中则发给讯飞 WebSocket
+      4. 流式解析 XML（ise_parser）提取分数与逐词结果，返回并写入缓存
+    返回 { summary, words, audio: { duration, speech_duration, trim_start, trim_end } }
     """
     # 1. 入参校验
     qid = request.form.get('question_id')
@@ -124,121 +204,350 @@ def ise_evaluate():
     question = Question.query.get(qid)
     if not question:
         return Result.error(404, msg="Question not found")
-    text = question.text
 
-    # 3. 保存并转码
+    # 3. 校验格式并读取上传内容
     filename = secure_filename(f.filename)
     if not filename.lower().endswith('.wav'):
         return Result.error(400, msg="Please upload a .wav file")
 
-    fd_src, src_path = tempfile.mkstemp(suffix='.wav')
-    fd_dst, dst_path = tempfile.mkstemp(suffix='.wav')
-    os.close(fd_src); os.close(fd_dst)
+    # 4. 转码 → 缓存 → 讯飞评测 → 解析
+    return run_ise(f.read(), question, _want_detail())
+
 
+def run_ise(data: bytes, question, detail: bool = False):
+    """评测一段录音并返回响应；/ise 与分片上传收尾（app/views/uploads.py）共用"""
     try:
-        # 保存上传的原始文件
-        f.save(src_path)
-
-        # FFmpeg 转码到 16kHz 单声道
-        cmd = (
-            f'ffmpeg -y '
-            f'-i "{src_path}" '
-            f'-ar 16000 '
-            f'-ac 1 '
-            f'"{dst_path}"'
-        )
-        subprocess.run(shlex.split(cmd), check=True)
+        result = evaluate_wav(data, question.text, _client_id(), detail)
+    except EvaluationError as e:
+        if e.code >= 500:
+            current_app.logger.error("ISE evaluation failed: %s", e.msg)
+        return Result.error(e.code, msg=e.msg, data=e.data)
+    except Exception as e:
+        current_app.logger.exception("ISE evaluation error")
+        return Result.error(500, msg=f"ISE error: {e}")
 
-        # 4. 用 wave 验证并读取 PCM
-        with wave.open(dst_path, 'rb') as wf:
-            if wf.getframerate() != 16000 or wf.getnchannels() != 1:
-                return Result.error(500, msg="Transcoding failed to produce 16kHz mono")
-            audio_bytes = wf.readframes(wf.getnframes())
+    return Result.ok(data=result)
 
-        # 5. 调用讯飞 WebSocket 评测
-        xml_b64_or_str = websocket_thread(audio_bytes, text)
-        if not xml_b64_or_str:
-            return Result.error(500, msg="Evaluation failed")
 
-        # 6. Base64 解码并解析 XML → dict
-        try:
-            parsed = decode_and_parse(xml_b64_or_str)
-        except Exception:
-            root = ET.fromstring(xml_b64_or_str)
-            parsed = etree_to_dict(root)
-
-        # —— 新增：自动拆掉最外层包装 ——
-        if 'read_sentence' not in parsed:
-            keys = list(parsed.keys())
-            if len(keys) == 1:
-                parsed = parsed[keys[0]]
-
-        # 7. 扁平化提取 summary & words
-        chapter = (
-            parsed
-            .get('read_sentence', {})
-            .get('rec_paper', {})
-            .get('read_chapter', {})
-        )
-        attrib = chapter.get('@attrib', {})
-
-        # summary 部分说明：
-        #   total_score     ：整句朗读的总分（满分 5.0）
-        #   standard_score  ：与标准发音的对比得分
-        #   fluency_score   ：流畅度得分
-        #   accuracy_score  ：发音准确度得分
-        #   integrity_score ：朗读完整度得分
-        summary = {
-            'total_score':     float(attrib.get('total_score', 0)),
-            'standard_score':  float(attrib.get('standard_score', 0)),
-            'fluency_score':   float(attrib.get('fluency_score', 0)),
-            'accuracy_score':  float(attrib.get('accuracy_score', 0)),
-            'integrity_score': float(attrib.get('integrity_score', 0)),
-        }
-
-        # words 部分说明：
-        #   每个元素代表一句话中某个单词的评测结果，包括：
-        #     text         ：词文本
-        #     score        ：此词总分
-        #     accuracy     ：发音准确度
-        #     fluency      ：流畅度
-        #     global_index ：在句子内的词序索引
-        words = []
-        sentence = chapter.get('sentence', {})
-        word_list = sentence.get('word', [])
-        if isinstance(word_list, dict):
-            word_list = [word_list]
-        for w in word_list:
-            w_at = w.get('@attrib', {})
-            words.append({
-                'text':         w_at.get('content', ''),
-                'score':        float(w_at.get('total_score', 0)),
-                'accuracy':     float(w_at.get('accuracy_score', 0)),
-                'fluency':      float(w_at.get('fluency_score', 0)),
-                'global_index': int(w_at.get('global_index', 0))
-            })
-
-        return Result.ok(data={
-            'summary': summary,
-            'words':   words
-        })
-
-    except subprocess.CalledProcessError:
-        current_app.logger.exception("FFmpeg transcoding error")
-        return Result.error(500, msg="Audio transcoding failed")
+def _timed(fn, *args):
+    """执行 fn，返回 (结果, 异常, 耗时 ms)；两个引擎互不影响，一个失败另一个照常返回"""
+    started = time.perf_counter()
+    try:
+        return fn(*args), None, round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        return None, e, round((time.perf_counter() - started) * 1000, 1)
+
+
+def _engine_error(e: Exception, engine: str) -> dict:
+    if isinstance(e, EvaluationError):
+        return {'code': e.code, 'msg': e.msg}
+    if isinstance(e, WhisperUnavailable):
+        return {'code': e.code, 'msg': str(e), 'retry_after': e.retry_after}
+    current_app.logger.error("%s engine failed", engine, exc_info=e)
+    return {'code': 500, 'msg': f"{engine} error: {e}"}
+
+
+@eval_bp.route('/combined', methods=['POST'])
+def combined_evaluate():
+    """
+    POST /api/evaluate/combined
+    一次上传同时拿到讯飞发音评分与 Whisper 转写（原先要分别调用 /ise 与 /transcribe，上传、解码各两次、串行执行）。
+    form-data:
+      - question_id: 题目 ID（string）
+      - audio:       音频文件（.wav/.mp3/.m4a/.flac/.mp4）
+      - detail:      可选，同 /api/evaluate/ise
+
+    流程：
+      1. 解码一次为 16kHz 单声道 PCM，质量预检与首尾静音裁剪同 /ise（不合格返回 422）
+      2. 讯飞评测在请求线程中执行，Whisper 转写（按题作答模式）在另一个线程中执行，共用同一份 PCM；
+         总耗时约为 max(讯飞, Whisper) 而不是两者之和
+      3. 任一引擎失败不影响另一个的结果，失败信息放在 errors 中；两个都失败时返回讯飞的错误码
+    返回 {
+      ise:        { summary, words } | null,
+      transcript: { text, language, model, cached, expected, alignment } | null,
+      errors:     { ise?: { code, msg }, whisper?: { code, msg, retry_after } },
+      audio:      { duration, speech_duration, trim_start, trim_end },
+      timings:    { decode_ms, ise_ms, whisper_ms, total_ms }
+    }
+    """
+    started = time.perf_counter()
+
+    # 1. 入参校验
+    qid = request.form.get('question_id')
+    if not qid:
+        return Result.error(400, msg="Missing question_id")
+    if 'audio' not in request.files:
+        return Result.error(400, msg="Missing audio file")
+    f = request.files['audio']
+    if not f.filename:
+        return Result.error(400, msg="Empty filename")
+    if os.path.splitext(secure_filename(f.filename))[1].lower() not in AUDIO_SUFFIXES:
+        return Result.error(400, msg="Unsupported audio format")
+
+    question = Question.query.get(qid)
+    if not question:
+        return Result.error(404, msg="Question not found")
+
+    # 2. 解码一次 → 质量预检 → 裁剪，两个引擎共用
+    try:
+        pcm, span = prepare_pcm(transcode_to_pcm(f.read()))
+    except EvaluationError as e:
+        return Result.error(e.code, msg=e.msg, data=e.data)
+    samples   = vad.pcm16_to_float(pcm)
+    decode_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    # 3. 两个引擎并发执行
+    app = current_app._get_current_object()
+
+    def run_whisper():
+        with app.app_context():
+            return _timed(_transcribe, samples, question)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        whisper_future = pool.submit(run_whisper)
+        ise_result, ise_exc, ise_ms = _timed(evaluate_pcm, pcm, question.text, _client_id(), _want_detail())
+        whisper_out, whisper_exc, whisper_ms = whisper_future.result()
+
+    # 4. 合并结果
+    errors = {}
+    if ise_exc is not None:
+        errors['ise'] = _engine_error(ise_exc, "ISE")
+    if whisper_exc is not None:
+        errors['whisper'] = _engine_error(whisper_exc, "Whisper")
+    if ise_exc is not None and whisper_exc is not None:
+        return Result.error(errors['ise']['code'], msg=errors['ise']['msg'], data={'errors': errors})
+
+    return Result.ok(data={
+        'ise':        ise_result,
+        'transcript': _transcript_data(*whisper_out, question) if whisper_out is not None else None,
+        'errors':     errors,
+        'audio':      span.to_dict(),
+        'timings': {
+            'decode_ms':  decode_ms,
+            'ise_ms':     ise_ms,
+            'whisper_ms': whisper_ms,
+            'total_ms':   round((time.perf_counter() - started) * 1000, 1),
+        },
+    })
+
+
+@eval_bp.route('/record', methods=['POST'])
+def evaluate_and_record():
+    """
+    POST /api/evaluate/record
+    评测并保存练习记录，一次上传完成原先 /api/evaluate/ise + /api/statistics/practice_records 两次请求。
+    form-data:
+      - user_id:     用户 ID（缺省时取当前登录用户）
+      - session_id:  练习会话 ID
+      - question_id: 题目 ID
+      - audio:       任意采样率／声道的 WAV 文件
+      - detail:      可选，同 /api/evaluate/ise
+
+    流程：
+      1. 转码 → 质量预检 → 裁剪 → 讯飞评测（同 /ise，含缓存与并发控制）
+      2. 转码后的 16kHz 单声道 WAV 写入本地暂存目录，PracticeRecord（五项分数）以 upload_status=pending 提交
+      3. Celery 后台上传 OBS（见 app/utils/audio_store.py），完成后回填 user_audio_key；不等待上传即返回
+    暂存目录已满时返回 503。
+    返回 201 { record_id, user_audio_key, upload: "pending", summary, words, audio }
+    """
+    # 1. 入参校验
+    user_id    = request.form.get('user_id') or get_current_user_id()
+    session_id = request.form.get('session_id')
+    qid        = request.form.get('question_id')
+    f          = request.files.get('audio')
+    if not all([user_id, session_id, qid, f]) or not f.filename:
+        return Result.error(400, msg="Missing user_id, session_id, question_id or audio")
+    if not secure_filename(f.filename).lower().endswith('.wav'):
+        return Result.error(400, msg="Please upload a .wav file")
+
+    question = Question.query.get(qid)
+    if not question:
+        return Result.error(404, msg="Question not found")
+
+    return run_record(user_id, session_id, question, f.read(), _want_detail())
+
+
+def run_record(user_id: str, session_id: str, question, data: bytes, detail: bool = False):
+    """评测并保存练习记录，返回响应；/record 与分片上传收尾（app/views/uploads.py）共用"""
+    # 2. 评测（保留未裁剪的完整 PCM 用于存档）
+    try:
+        full_pcm  = transcode_to_pcm(data)
+        pcm, span = prepare_pcm(full_pcm)
+        result    = evaluate_pcm(pcm, question.text, _client_id(), detail)
+    except EvaluationError as e:
+        if e.code >= 500:
+            current_app.logger.error("ISE evaluation failed: %s", e.msg)
+        return Result.error(e.code, msg=e.msg, data=e.data)
     except Exception as e:
         current_app.logger.exception("ISE evaluation error")
         return Result.error(500, msg=f"ISE error: {e}")
-    finally:
-        for path in (src_path, dst_path):
-            try:
-                os.remove(path)
-            except OSError:
-                pass
 
+    # 3. 写入练习记录
+    summary = result['summary']
+    record = PracticeRecord(
+        user_id         = user_id,
+        session_id      = session_id,
+        question_id     = question.question_id,
+        accuracy_score  = float(summary.get('accuracy_score',  0.0)),
+        fluency_score   = float(summary.get('fluency_score',   0.0)),
+        integrity_score = float(summary.get('integrity_score', 0.0)),
+        standard_score  = float(summary.get('standard_score',  0.0)),
+        total_score     = float(summary.get('total_score',     0.0)),
+    )
+    try:
+        ext.db.session.add(record)
+        ext.db.session.flush()
+        audio_store.stage(record, pcm16_to_wav(full_pcm))
+        ext.db.session.commit()
+    except audio_store.SpoolFull:
+        ext.db.session.rollback()
+        return Result.error(503, msg="Too many pending uploads, please retry later")
+    except Exception:
+        ext.db.session.rollback()
+        current_app.logger.exception("Failed to save practice record")
+        return Result.error(500, msg="Failed to save practice record")
+
+    # 4. 投递后台上传
+    audio_store.enqueue(record.record_id)
+
+    return Result.created(dict(result,
+                               record_id      = record.record_id,
+                               user_audio_key = audio_store.user_audio_key(record.record_id),
+                               upload         = "pending",
+                               audio          = span.to_dict()))
+
+
+@eval_bp.route('/ise/jobs', methods=['POST'])
+def submit_ise_job():
+    """
+    POST /api/evaluate/ise/jobs
+    form-data 与 /api/evaluate/ise 相同（question_id, audio, detail）。
+    只做参数校验并投递 Celery 任务，立即返回 job_id；
+    结果通过 GET /api/evaluate/jobs/<job_id> 轮询，或 /stream 以 SSE 推送。
+    """
+    qid = request.form.get('question_id')
+    if not qid:
+        return Result.error(400, msg="Missing question_id")
+    if 'audio' not in request.files:
+        return Result.error(400, msg="Missing audio file")
+    f = request.files['audio']
+    if not f.filename:
+        return Result.error(400, msg="Empty filename")
+    if not secure_filename(f.filename).lower().endswith('.wav'):
+        return Result.error(400, msg="Please upload a .wav file")
 
+    question = Question.query.get(qid)
+    if not question:
+        return Result.error(404, msg="Question not found")
 
+    job_id = gen_nanoid()
+    try:
+        ise_jobs.create_job(job_id, qid)
+        ext.celery.send_task(
+            "evaluate.ise",
+            args=[job_id, base64.b64encode(f.read()).decode('ascii'), question.text,
+                  _client_id(), _want_detail()]
+        )
+    except Exception:
+        current_app.logger.exception("Failed to enqueue ISE job")
+        return Result.error(500, msg="Failed to enqueue evaluation")
 
+    return Result.accepted(data={'job_id': job_id, 'status': 'queued'})
 
 
+@eval_bp.route('/ise/queue', methods=['GET'])
+def get_ise_queue():
+    """
+    GET /api/evaluate/ise/queue
+    返回集群评测并发配额使用情况：
+      { limit, active, waiting, waiting_users, avg_session_ms, rejected,
+        credentials: [ { appid, weight, healthy, cooldown, in_flight, successes, failures } ],
+        breaker: { name, state, failures },
+        transcode: { passthrough, transcoded, hit_rate },
+        cache: { hits, misses, entries, hit_rate },
+        quality_rejections: { reason: count } }
+    其中 credentials、breaker 为本进程内的状态。
+    """
+    try:
+        data = queue_stats()
+        data['credentials'] = get_pool().stats()
+        data['breaker']     = breaker.stats()
+        data['transcode']   = transcode_stats()
+        data['cache']       = ise_cache.stats()
+        data['quality_rejections'] = rejection_stats()
+        return Result.ok(data=data)
+    except Exception:
+        current_app.logger.exception("Failed to read ISE queue stats")
+        return Result.error(500, msg="Failed to read queue stats")
+
+
+@eval_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_ise_job(job_id):
+    """
+    GET /api/evaluate/jobs/<job_id>
+    返回 { job_id, status, result? , error?, code? }
+    status: queued / running / done / failed
+    """
+    job = ise_jobs.get_job(job_id)
+    if job is None:
+        return Result.error(404, msg="Job not found")
+    return Result.ok(data=job)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 
+@eval_bp.route('/jobs/<string:job_id>/stream', methods=['GET'])
+def stream_ise_job(job_id):
+    """
+    GET /api/evaluate/jobs/<job_id>/stream
+    Server-Sent Events：每次状态变化推送 event: status，
+    到达 done / failed 后推送最终快照并结束；超过 ISE_JOB_STREAM_TIMEOUT 推送 event: timeout。
+    """
+    if ise_jobs.get_job(job_id) is None:
+        return Result.error(404, msg="Job not found")
+
+    timeout   = float(current_app.config.get('ISE_JOB_STREAM_TIMEOUT', 120))
+    keepalive = 15.0
+
+    @stream_with_context
+    def generate():
+        pubsub = ext.redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(ise_jobs.channel(job_id))
+        try:
+            # 先订阅再读快照，避免错过两者之间发生的状态变化
+            job = ise_jobs.get_job(job_id)
+            last_status = job and job['status']
+            yield _sse('status', job)
+            if job is None or job['status'] in ise_jobs.FINAL_STATES:
+                return
+
+            deadline  = time.monotonic() + timeout
+            last_sent = time.monotonic()
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    if time.monotonic() - last_sent >= keepalive:
+                        last_sent = time.monotonic()
+                        yield ": keep-alive\n\n"
+                    continue
+
+                job = ise_jobs.get_job(job_id)
+                if job is None or job['status'] == last_status:
+                    continue
+                last_status = job['status']
+                last_sent   = time.monotonic()
+                yield _sse('status', job)
+                if job['status'] in ise_jobs.FINAL_STATES:
+                    return
+
+            yield _sse('timeout', {'job_id': job_id})
+        finally:
+            pubsub.close()
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -7,7 +7,7 @@ from ..models import PracticeRecord,Question,Topic
 from ..extensions import db
 from ..utils.presigned import get_user_audio_url
 from ..utils.response import Result
-from ..utils.obs_client import client   # 已初始化的 ObsClient 实例
+from ..utils import audio_store
 from sqlalchemy import func
 from datetime import datetime, timedelta
 
@@ -15,10 +15,28 @@ from datetime import datetime, timedelta
 stats_bp = Blueprint('statistics', __name__, url_prefix='/api/statistics')
 
 
+def _new_record(user_id, session_id, question_id, summary) -> PracticeRecord:
+    """按五项评分构造练习记录；summary 为 JSON 字符串或 dict，格式错误时抛出 ValueError / TypeError"""
+    if isinstance(summary, str):
+        summary = json.loads(summary)
+    return PracticeRecord(
+        user_id        = user_id,
+        session_id     = session_id,
+        question_id    = question_id,
+        accuracy_score = float(summary.get('accuracy_score',   0.0)),
+        fluency_score  = float(summary.get('fluency_score',     0.0)),
+        integrity_score= float(summary.get('integrity_score',   0.0)),
+        standard_score = float(summary.get('standard_score',    0.0)),
+        total_score    = float(summary.get('total_score',       0.0))
+    )
+
+
 @stats_bp.route('/practice_records', methods=['POST'])
 def create_practice_record():
     """
-    创建一条练习记录并上传用户音频到华为云 OBS（无需鉴权）。
+    创建一条练习记录，用户音频写入本地暂存目录后由 Celery 后台上传到华为云 OBS（无需鉴权）。
+    记录立即提交（upload_status=pending），请求耗时不再取决于 OBS；上传完成后回填 user_audio_key。
+    暂存目录已满时返回 503。
     前端需以 multipart/form-data 提交：
       - user_id     (str)
       - session_id  (str)
@@ -35,47 +53,148 @@ def create_practice_record():
     if not all([user_id, session_id, question_id, summary_str, audio_file]):
         return Result.error(400, '缺少必要参数或音频文件'), 400
 
+    return save_practice_record(user_id, session_id, question_id, summary_str, audio_file.read())
+
+
+def save_practice_record(user_id, session_id, question_id, summary, data: bytes):
+    """
+    保存练习记录并暂存录音，返回 (响应, 状态码)；
+    /practice_records 与分片上传收尾（app/views/uploads.py）共用
+    """
     try:
-        summary = json.loads(summary_str)
-        acc   = float(summary.get('accuracy_score',   0.0))
-        flu   = float(summary.get('fluency_score',     0.0))
-        integ = float(summary.get('integrity_score',   0.0))
-        std   = float(summary.get('standard_score',    0.0))
-        tot   = float(summary.get('total_score',       0.0))
-    except (ValueError, TypeError):
+        record = _new_record(user_id, session_id, question_id, summary)
+    except (ValueError, TypeError, AttributeError):
         return Result.error(400, 'summary 字段格式错误，应为合法 JSON'), 400
 
-    record = PracticeRecord(
-        user_id        = user_id,
-        session_id     = session_id,
-        question_id    = question_id,
-        accuracy_score = acc,
-        fluency_score  = flu,
-        integrity_score= integ,
-        standard_score = std,
-        total_score    = tot
-    )
     db.session.add(record)
     db.session.flush()
 
-    bucket     = current_app.config['OBS_BUCKET']
-    object_key = f"userVoice/{record.record_id}.wav"
     try:
-        client.putObject(bucket, object_key, audio_file.stream)
-    except Exception as e:
+        audio_store.stage(record, data)
+    except audio_store.SpoolFull:
         db.session.rollback()
-        current_app.logger.error(f"OBS 上传失败：{e}")
-        return Result.error(500, '音频上传失败，请稍后重试'), 500
+        return Result.error(503, '待上传音频过多，请稍后重试'), 503
+    except OSError as e:
+        db.session.rollback()
+        current_app.logger.error(f"音频暂存失败：{e}")
+        return Result.error(500, '音频保存失败，请稍后重试'), 500
+
+    db.session.commit()
+    audio_store.enqueue(record.record_id)
+
+    return Result.created({
+        "record_id":      record.record_id,
+        "user_audio_key": audio_store.user_audio_key(record.record_id),
+        "upload_status":  record.upload_status
+    }), 201
+
+
+
+@stats_bp.route('/practice_records/direct', methods=['POST'])
+def create_direct_practice_record():
+    """
+    创建一条练习记录并返回 OBS 直传签名 URL，录音字节不经过应用服务器（无需鉴权）。
+    记录以 upload_status=awaiting 提交；客户端 PUT 完成后调用
+    /practice_records/<record_id>/upload_complete，校验通过才回填 user_audio_key。
+    前端以 JSON 提交：
+      - user_id     (str)
+      - session_id  (str)
+      - question_id (str)
+      - summary     (object 或 JSON 字符串：五项评分)
+      - size        (int，可选：录音字节数，超过上限时直接拒绝)
+    返回：
+      { record_id, user_audio_key, upload_status,
+        upload: { url, method: "PUT", headers, expires_in } }
+    客户端 PUT 时必须带上 upload.headers 中的请求头（参与签名）。
+    """
+    data        = request.get_json(silent=True) or {}
+    user_id     = data.get('user_id')
+    session_id  = data.get('session_id')
+    question_id = data.get('question_id')
+    summary     = data.get('summary')
+
+    if not all([user_id, session_id, question_id, summary]):
+        return Result.error(400, '缺少必要参数'), 400
+
+    try:
+        size = int(data.get('size') or 0)
+        record = _new_record(user_id, session_id, question_id, summary)
+    except (ValueError, TypeError, AttributeError):
+        return Result.error(400, 'summary 或 size 字段格式错误'), 400
+    if size > audio_store.direct_max_bytes():
+        return Result.error(422, '录音文件过大'), 422
 
-    record.user_audio_key = object_key
+    record.upload_status = audio_store.STATUS_AWAITING
+    db.session.add(record)
+    db.session.flush()
+    try:
+        upload = audio_store.direct_upload(record.record_id)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"生成直传签名 URL 失败：{e}")
+        return Result.error(503, '存储服务暂不可用，请稍后重试'), 503
     db.session.commit()
 
     return Result.created({
         "record_id":      record.record_id,
-        "user_audio_key": object_key
+        "user_audio_key": audio_store.user_audio_key(record.record_id),
+        "upload_status":  record.upload_status,
+        "upload":         upload
     }), 201
 
 
+@stats_bp.route('/practice_records/<record_id>/upload_complete', methods=['POST'])
+def complete_direct_upload(record_id):
+    """
+    客户端直传完成回调：对 OBS 对象做 HEAD，大小须与声明一致，通过后记录置为 uploaded。
+    可重复调用；校验失败时记录保持 awaiting，客户端可重新 PUT 后再次回调。
+    前端以 JSON 提交：
+      - user_id (str，须与记录一致)
+      - size    (int：实际上传的字节数)
+    """
+    data    = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    try:
+        size = int(data.get('size'))
+    except (ValueError, TypeError):
+        return Result.error(400, '缺少 size 参数或格式错误'), 400
+
+    record = PracticeRecord.query.get(record_id)
+    if record is None:
+        return Result.error(404, '练习记录不存在'), 404
+    if record.user_id != user_id:
+        return Result.error(403, '无权操作该练习记录'), 403
+    if record.upload_status not in (audio_store.STATUS_AWAITING, audio_store.STATUS_UPLOADED):
+        return Result.error(400, '该练习记录不是直传记录'), 400
+
+    try:
+        actual = audio_store.complete_direct(record, size)
+    except audio_store.UploadMismatch as e:
+        return Result.error(422, str(e)), 422
+    except Exception as e:
+        current_app.logger.error(f"直传录音校验失败：{e}")
+        return Result.error(503, '存储服务暂不可用，请稍后重试'), 503
+    db.session.commit()
+
+    return Result.ok({
+        "record_id":      record.record_id,
+        "user_audio_key": record.user_audio_key,
+        "upload_status":  record.upload_status,
+        "size":           actual
+    })
+
+
+@stats_bp.route('/upload_queue', methods=['GET'])
+def get_upload_queue():
+    """
+    用户录音写后上传的背压指标：
+      files / bytes / oldest_seconds：暂存目录积压
+      inflight / concurrency：正在上传数与集群上限
+      spooled / uploaded / retries / throttled / failed / rejected：累计计数
+      direct_uploaded / direct_rejected：客户端直传校验通过 / 未通过次数
+    """
+    return Result.ok(audio_store.stats())
+
 
 @stats_bp.route('/sessions/<session_id>/practice_records', methods=['GET'])
 def get_records_by_session(session_id):
@@ -101,7 +220,10 @@ def get_records_by_session(session_id):
                 "standard_score":   rec.standard_score,
                 "total_score":      rec.total_score,
             },
+            # 录音尚未上传完成时 OBS 上没有对象，不返回签名 URL
+            "upload_status":  rec.upload_status,
             "audio_url": get_user_audio_url(rec.record_id)
+                         if rec.upload_status == audio_store.STATUS_UPLOADED else None
         })
 
     return Result.ok(data)
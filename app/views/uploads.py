@@ -0,0 +1,185 @@
+# 可续传的分片上传：创建、按偏移写入、查询进度、收尾交给评测 / 练习记录
+
+# app/views/uploads.py
+import json
+from flask import Blueprint, request, current_app, jsonify
+from app.models import Question
+from app.utils.response import Result
+from app.utils import resumable
+from app.views.session import get_current_user_id
+from app.views.evaluate import run_ise, run_record
+from app.views.statistics import save_practice_record
+
+
+upload_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+
+
+def _status(state: dict) -> dict:
+    return {
+        "upload_id":  state["upload_id"],
+        "purpose":    state["purpose"],
+        "offset":     state["offset"],
+        "length":     state["length"],
+        "complete":   state["offset"] == state["length"],
+        "status":     state["status"],
+        "chunk_size": resumable.chunk_max_bytes(),
+        "expires_in": state["expires_in"],
+    }
+
+
+def _offset_header(offset: int) -> dict:
+    return {'Upload-Offset': str(offset)}
+
+
+@upload_bp.route('', methods=['POST'])
+def create_upload():
+    """
+    创建一个分片上传（无需鉴权，record / practice_record 缺省 user_id 时取当前登录用户）。
+    前端以 JSON 提交：
+      - purpose     (str)：ise → 收尾时评测（同 /api/evaluate/ise）
+                           record → 收尾时评测并保存练习记录（同 /api/evaluate/record）
+                           practice_record → 收尾时按 summary 保存练习记录（同 /api/statistics/practice_records）
+      - length      (int)：录音总字节数
+      - question_id (str)
+      - session_id  (str：record / practice_record 必填)
+      - user_id     (str：record / practice_record)
+      - summary     (object 或 JSON 字符串：practice_record 必填)
+      - detail      (bool：ise / record 可选)
+    返回 201 { upload_id, purpose, offset, length, complete, status, chunk_size, expires_in }
+    """
+    data    = request.get_json(silent=True) or {}
+    purpose = data.get('purpose')
+    if purpose not in resumable.PURPOSES:
+        return Result.error(400, f"purpose 须为 {' / '.join(resumable.PURPOSES)}"), 400
+    try:
+        length = int(data.get('length'))
+    except (ValueError, TypeError):
+        return Result.error(400, '缺少 length 参数或格式错误'), 400
+    if length <= 0:
+        return Result.error(400, 'length 须为正整数'), 400
+    if length > resumable.max_bytes():
+        return Result.error(422, '录音文件过大'), 422
+
+    meta = {'question_id': data.get('question_id'), 'detail': bool(data.get('detail'))}
+    if purpose != 'ise':
+        meta['user_id']    = data.get('user_id') or get_current_user_id()
+        meta['session_id'] = data.get('session_id')
+    if not all(v for k, v in meta.items() if k != 'detail'):
+        return Result.error(400, '缺少必要参数'), 400
+
+    if purpose == 'practice_record':
+        summary = data.get('summary')
+        try:
+            summary = json.loads(summary) if isinstance(summary, str) else summary
+        except ValueError:
+            summary = None
+        if not isinstance(summary, dict):
+            return Result.error(400, 'summary 字段格式错误，应为合法 JSON'), 400
+        meta['summary'] = summary
+    elif Question.query.get(meta['question_id']) is None:
+        return Result.error(404, '题目不存在'), 404
+
+    try:
+        state = resumable.create(purpose, length, meta)
+    except resumable.UploadsFull:
+        return Result.error(503, '上传中的文件过多，请稍后重试'), 503
+    except OSError as e:
+        current_app.logger.error(f"创建分片上传失败：{e}")
+        return Result.error(500, '创建上传失败，请稍后重试'), 500
+
+    return Result.created(_status(state)), 201
+
+
+@upload_bp.route('/<upload_id>', methods=['PUT'])
+def put_chunk(upload_id):
+    """
+    写入一个分片，请求体为原始字节（application/offset+octet-stream 或 application/octet-stream）。
+    请求头 Upload-Offset 必须等于服务端已确认的偏移：
+      - 不一致时返回 409，data.offset 与响应头 Upload-Offset 为服务端偏移，客户端从该处继续
+      - 连接中途断开时已收到的字节照样确认，重新查询偏移后续传即可
+    返回 { upload_id, offset, length, complete, ... }，响应头 Upload-Offset 为新的偏移
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset'))
+    except (ValueError, TypeError):
+        return Result.error(400, '缺少 Upload-Offset 请求头或格式错误'), 400
+
+    try:
+        new_offset = resumable.write_chunk(upload_id, offset, request.stream, request.content_length)
+    except resumable.UploadNotFound:
+        return Result.error(404, '上传不存在或已过期'), 404
+    except resumable.OffsetMismatch as e:
+        return Result.error(409, '偏移不一致，请从服务端偏移处继续', data={'offset': e.offset}), \
+               409, _offset_header(e.offset)
+    except resumable.UploadBusy as e:
+        return Result.error(409, str(e)), 409
+    except ValueError:
+        return Result.error(400, f'分片超出声明的总长度或单片上限（{resumable.chunk_max_bytes()} 字节）'), 400
+    except OSError as e:
+        current_app.logger.error(f"分片写入失败：{e}")
+        return Result.error(500, '分片保存失败，请重试'), 500
+
+    return Result.ok(_status(resumable.get(upload_id))), 200, _offset_header(new_offset)
+
+
+@upload_bp.route('/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """查询上传进度（HEAD 只取响应头 Upload-Offset）；断线重连后据此决定从哪里续传"""
+    state = resumable.get(upload_id)
+    if state is None:
+        return Result.error(404, '上传不存在或已过期'), 404
+    return Result.ok(_status(state)), 200, _offset_header(state['offset'])
+
+
+def _hand_off(state: dict, data: bytes):
+    """按 purpose 交给原有的评测 / 记录代码，返回其响应"""
+    meta = state['meta']
+    if state['purpose'] == 'practice_record':
+        return save_practice_record(meta['user_id'], meta['session_id'], meta['question_id'],
+                                    meta['summary'], data)
+
+    question = Question.query.get(meta['question_id'])
+    if question is None:
+        return Result.error(404, '题目不存在'), 404
+    if state['purpose'] == 'ise':
+        return run_ise(data, question, meta['detail'])
+    return run_record(meta['user_id'], meta['session_id'], question, data, meta['detail'])
+
+
+@upload_bp.route('/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """
+    全部字节确认后收尾：把拼好的录音交给 purpose 对应的接口逻辑，响应与该接口一致。
+    成功后删除分片文件并保存响应，重复调用（例如客户端没收到响应）返回同一结果，不会重复建记录；
+    失败（录音质量不合格、评测服务繁忙等）时上传保持可收尾，稍后重试无需重传。
+    """
+    try:
+        state = resumable.begin_finalize(upload_id)
+    except resumable.UploadNotFound:
+        return Result.error(404, '上传不存在或已过期'), 404
+    except resumable.Incomplete:
+        state = resumable.get(upload_id)
+        if state is None:
+            return Result.error(404, '上传不存在或已过期'), 404
+        offset = state['offset']
+        return Result.error(409, '录音尚未上传完成', data={'offset': offset}), 409, _offset_header(offset)
+    except resumable.UploadBusy as e:
+        return Result.error(409, str(e)), 409
+
+    if state['status'] == resumable.STATUS_FINALIZED:
+        return jsonify(state['result']), state['result_status']
+
+    try:
+        rv = _hand_off(state, resumable.read(upload_id))
+    except Exception:
+        resumable.abort_finalize(upload_id)
+        current_app.logger.exception("Finalizing upload %s failed", upload_id)
+        return Result.error(500, '收尾失败，请稍后重试'), 500
+
+    resp, status = rv if isinstance(rv, tuple) else (rv, rv.status_code)
+    body = resp.get_json()
+    if body.get('code') in (200, 201):
+        resumable.finish(upload_id, body, status)
+    else:
+        resumable.abort_finalize(upload_id)
+    return resp, status
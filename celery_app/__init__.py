@@ -1 +1,22 @@
-# 创建 Celery 实例，读取 Flask 配置
\ No newline at end of file
+# 创建 Celery 实例，读取 Flask 配置
+
+# celery_app/__init__.py
+#
+# 启动 worker：
+#   celery -A celery_app worker -l info
+
+from app import create_app
+from app.extensions import celery
+
+flask_app = create_app()
+
+
+class ContextTask(celery.Task):
+    """让每个任务都运行在 Flask 应用上下文中（数据库、配置、Redis 客户端）"""
+
+    def __call__(self, *args, **kwargs):
+        with flask_app.app_context():
+            return self.run(*args, **kwargs)
+
+
+celery.Task = ContextTask
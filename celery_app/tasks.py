@@ -1 +1,85 @@
-# 异步任务
\ No newline at end of file
+# 异步任务
+
+# celery_app/tasks.py
+
+import base64
+import random
+from flask import current_app
+from app.extensions import celery, db
+from app.utils import ise_jobs, audio_store, resumable
+from app.utils.ise_pipeline import evaluate_wav, EvaluationError
+
+
+@celery.task(name="evaluate.ise")
+def evaluate_ise(job_id: str, audio_b64: str, text: str, client_id: str = None,
+                 detail: bool = False):
+    """
+    异步讯飞评测：与 /api/evaluate/ise 同一流水线，结果写入 ise_jobs。
+    音频以 Base64 随任务消息传递（task_serializer=json）。
+    """
+    ise_jobs.update_job(job_id, "running")
+    try:
+        result = evaluate_wav(base64.b64decode(audio_b64), text, client_id, detail)
+    except EvaluationError as e:
+        current_app.logger.error("ISE job %s failed: %s", job_id, e.msg)
+        ise_jobs.update_job(job_id, "failed", result=e.data, error=e.msg, code=e.code)
+        return
+    except Exception as e:
+        current_app.logger.exception("ISE job %s error", job_id)
+        ise_jobs.update_job(job_id, "failed", error=f"ISE error: {e}", code=500)
+        return
+
+    ise_jobs.update_job(job_id, "done", result=result)
+
+
+@celery.task(name="audio.upload", bind=True, max_retries=None, acks_late=True)
+def upload_user_audio(self, record_id: str, attempt: int = 0):
+    """
+    把暂存目录中的用户录音上传到 OBS（见 app/utils/audio_store.py）。
+    集群上传并发已满时短暂延后（不计入失败次数）；OBS 出错时按指数退避重试，
+    超过 AUDIO_UPLOAD_MAX_RETRIES 次后把记录标为 failed，暂存文件留给 audio.drain_spool。
+    """
+    cfg   = current_app.config
+    token = self.request.id or record_id
+    if not audio_store.acquire_slot(token):
+        audio_store.incr_stat("throttled")
+        raise self.retry(countdown=1 + random.random())
+
+    try:
+        audio_store.upload(record_id)
+    except Exception as e:
+        db.session.rollback()
+        if attempt >= int(cfg.get("AUDIO_UPLOAD_MAX_RETRIES", 8)):
+            current_app.logger.error("Upload of record %s failed after %d attempts: %s", record_id, attempt + 1, e)
+            audio_store.mark_failed(record_id)
+            return
+        audio_store.incr_stat("retries")
+        countdown = min(float(cfg.get("AUDIO_UPLOAD_RETRY_BASE", 2)) * 2 ** attempt, 600)
+        countdown *= 0.5 + random.random()
+        audio_store.schedule_retry(record_id, countdown)
+        raise self.retry(exc=e, args=[record_id], kwargs={"attempt": attempt + 1}, countdown=countdown)
+    finally:
+        audio_store.release_slot(token)
+
+
+@celery.task(name="audio.drain_spool")
+def drain_spool():
+    """
+    定时任务（由 celery beat 按 AUDIO_SPOOL_DRAIN_INTERVAL 调度）：
+    补投滞留在暂存目录中的录音，并收尾超过 AUDIO_DIRECT_AWAITING_TTL 仍未完成的直传记录
+    """
+    cfg    = current_app.config
+    result = audio_store.drain(float(cfg.get("AUDIO_SPOOL_RESCAN_AGE", 300)))
+    result.update(audio_store.expire_awaiting(float(cfg.get("AUDIO_DIRECT_AWAITING_TTL", 24 * 3600))))
+    if any(result.values()):
+        current_app.logger.info("Audio spool drained: %s", result)
+    return result
+
+
+@celery.task(name="uploads.cleanup")
+def cleanup_uploads():
+    """定时任务：删除已过期或已收尾的分片上传残留文件（由 celery beat 按 RESUMABLE_CLEANUP_INTERVAL 调度）"""
+    removed = resumable.cleanup(float(current_app.config.get("RESUMABLE_CLEANUP_INTERVAL", 3600)))
+    if removed:
+        current_app.logger.info("Removed %d expired resumable uploads", removed)
+    return removed
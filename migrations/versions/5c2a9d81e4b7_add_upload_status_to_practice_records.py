@@ -0,0 +1,28 @@
+"""Add upload_status to practice_records
+
+Revision ID: 5c2a9d81e4b7
+Revises: 0f5eff6f27c9
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2a9d81e4b7'
+down_revision = '0f5eff6f27c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有记录的录音均为同步上传，默认 uploaded
+    with op.batch_alter_table('practice_records', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_status', sa.String(length=16), nullable=False,
+                                      server_default='uploaded'))
+
+
+def downgrade():
+    with op.batch_alter_table('practice_records', schema=None) as batch_op:
+        batch_op.drop_column('upload_status')
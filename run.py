@@ -3,9 +3,13 @@
 from flask import Flask
 from flask_cors import CORS      # ← 新增
 from app import create_app
+from app.utils import whisper_model
 
 app = create_app()
 
+# 在 fork worker 之前加载并预热 Whisper（gunicorn --preload run:app 时各 worker 共享权重）
+whisper_model.preload(app)
+
 # 允许任意来源访问所有路由
 CORS(app, resources={r"/*": {"origins": "*"}})
 
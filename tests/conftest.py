@@ -0,0 +1,41 @@
+# 测试公共设置：导入 app 之前补齐必需的环境变量
+
+# tests/conftest.py
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("APP_ENV", "test")
+os.environ.setdefault("OBS_ENDPOINT", "obs.example.com")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASS", "test")
+os.environ.setdefault("DB_NAME", "test")
+
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def flask_app(tmp_path, monkeypatch):
+    """完整应用：SQLite 临时库 + fakeredis，暂存目录放在 tmp_path 下"""
+    from app.config import get_config
+    cfg = get_config()
+    monkeypatch.setattr(cfg, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(cfg, "AUDIO_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(cfg, "RESUMABLE_UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(cfg, "OBS_BUCKET", "bucket")
+
+    import app.extensions as ext
+    from app import create_app
+    application = create_app()
+    monkeypatch.setattr(ext, "redis_client", fakeredis.FakeRedis(decode_responses=True))
+    monkeypatch.setattr(ext.celery, "send_task", lambda *args, **kwargs: None)
+    with application.app_context():
+        ext.db.create_all()
+        yield application
+        ext.db.session.remove()
+        ext.db.drop_all()
@@ -0,0 +1,65 @@
+# app/utils/audio.py：进程内解码与多相重采样
+
+# tests/test_audio.py
+
+import numpy as np
+import pytest
+
+from app.utils import audio
+from app.utils.audio import (AudioDecodeError, decode, load_audio, passthrough_pcm16, pcm16_to_wav,
+                             resample, to_mono, to_pcm16)
+
+
+def sine(freq, rate, seconds=1.0, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("src", [8000, 22050, 44100, 48000])
+def test_resample_preserves_tone_and_phase(src):
+    y = resample(sine(1000, src), src, 16000)
+    assert len(y) == 16000 and y.dtype == np.float32
+    ref = sine(1000, 16000)
+    assert np.abs(y[200:-200] - ref[200:-200]).max() < 1e-3
+
+
+@pytest.mark.parametrize("src", [22050, 44100, 48000])
+def test_resample_filters_above_nyquist(src):
+    y = resample(sine(10000, src), src, 16000)
+    assert np.abs(y[200:-200]).max() < 1e-3
+
+
+def test_resample_output_length_rounds_up():
+    assert len(resample(np.zeros(441, np.float32), 44100, 16000)) == 160
+    assert len(resample(np.zeros(442, np.float32), 44100, 16000)) == 161
+    assert len(resample(np.zeros(0, np.float32), 44100, 16000)) == 0
+
+
+def test_load_audio_wav_round_trip():
+    stereo = np.stack([sine(440, 48000), sine(440, 48000)], axis=1)
+    wav = pcm16_to_wav(to_pcm16(to_mono(stereo)), rate=48000)
+    y = load_audio(wav)
+    assert len(y) == 16000
+    assert np.abs(y[200:-200] - sine(440, 16000)[200:-200]).max() < 1e-3
+
+
+TRUNCATED = [
+    pcm16_to_wav(b"\0" * 100)[:22],                      # fmt 块只剩 2 字节
+    b"RIFF\0\0\0\0WAVEfmt \x10\0\0\0\x01\0",
+    b"RIFF\xff\xff\xff\xffWAVEfmt \x28\0\0\0\xfe\xff\x01\0\x80\x3e\0\0\0\x7d\0\0\x02\0\x10\0",
+    b"RIFF\0\0\0\0WAVE" + bytes(range(256)),
+]
+
+
+@pytest.mark.parametrize("data", TRUNCATED)
+def test_truncated_header_is_decode_error(data):
+    with pytest.raises(AudioDecodeError):
+        decode(data)
+    assert passthrough_pcm16(data) is None
+
+
+def test_truncated_header_falls_back_to_ffmpeg(monkeypatch):
+    fallback = []
+    monkeypatch.setattr(audio, "_ffmpeg_decode", lambda data, rate: fallback.append(data) or np.zeros(0))
+    load_audio(TRUNCATED[0])
+    assert fallback == [TRUNCATED[0]]
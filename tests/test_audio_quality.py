@@ -0,0 +1,76 @@
+# app/utils/audio_quality.py：录音质量预检阈值
+
+# tests/test_audio_quality.py
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.utils import vad, audio_quality
+from tests.test_vad import RATE, noise, tone, clip
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    """assess 从 current_app.config 读取阈值，未配置时用默认值"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def assess(samples):
+    return audio_quality.assess(samples, vad.detect(samples))
+
+
+def test_normal_recording_passes():
+    report = assess(clip(0.5, 2.0, 0.5, -50, -20))
+    assert report.reason is None
+    assert report.speech_ratio == pytest.approx(2.0 / 3.0, abs=0.05)
+
+
+@pytest.mark.parametrize("level_db", [-55, -40, -30])
+def test_noise_only_is_silent(level_db):
+    report = assess(noise(3.0, level_db))
+    assert report.reason == "silent"
+    assert report.speech_seconds == 0.0
+
+
+def test_digital_silence_is_silent():
+    assert assess(np.zeros(2 * RATE, dtype=np.float32)).reason == "silent"
+
+
+def test_too_short():
+    assert assess(clip(0.1, 0.2, 0.1, -50, -20)).reason == "too_short"
+
+
+def test_short_speech_in_long_recording_is_too_short():
+    assert assess(clip(1.0, 0.1, 1.0, -60, -20)).reason == "too_short"
+
+
+def test_quiet_speech_is_too_quiet():
+    report = assess(clip(0.5, 1.5, 0.5, -80, -52))
+    assert report.speech_seconds > 1.0
+    assert report.reason == "too_quiet"
+    assert report.rms_db < -45
+
+
+def test_clipped_speech():
+    samples = clip(0.5, 1.5, 0.5, -50, -20)
+    samples[int(0.5 * RATE):int(2.0 * RATE)] = np.clip(
+        tone(1.5, 3.0), -1.0, 1.0)                 # 超过满量程后削顶
+    report = assess(samples)
+    assert report.reason == "clipped"
+    assert report.clipping_ratio > 0.01
+
+
+def test_low_speech_ratio(app_context):
+    app_context.config["QUALITY_MIN_SPEECH_RATIO"] = 0.2
+    report = assess(clip(4.0, 0.5, 4.0, -60, -20))
+    assert report.reason == "low_speech"
+    assert report.speech_ratio < 0.2
+
+
+def test_to_dict_metrics():
+    data = assess(clip(0.5, 1.0, 0.5, -50, -20)).to_dict()
+    assert data["reason"] is None
+    assert set(data["metrics"]) == {"duration", "speech_duration", "speech_ratio", "rms_db", "clipping_ratio"}
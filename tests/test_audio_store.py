@@ -0,0 +1,166 @@
+# app/utils/audio_store.py：暂存容量计数、上传与补投
+
+# tests/test_audio_store.py
+
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import app.extensions as ext
+from app.models import PracticeRecord
+from app.utils import audio_store
+from app.utils.dir_usage import DirectoryUsage
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    uploaded = []
+
+    def put_object(bucket, key, data):
+        uploaded.append((key, data))
+        return SimpleNamespace(status=200, errorMessage=None)
+
+    monkeypatch.setattr(audio_store.obs_client, "putObject", put_object)
+    return uploaded
+
+
+@pytest.fixture(autouse=True)
+def fresh_usage(monkeypatch):
+    monkeypatch.setattr(audio_store, "_usage",
+                        DirectoryUsage(lambda: sum(s for _, s, _ in audio_store._spool_entries())))
+
+
+def _record(**kwargs):
+    record = PracticeRecord(user_id="u", session_id="s", question_id="q", accuracy_score=0,
+                            fluency_score=0, integrity_score=0, standard_score=0, total_score=0, **kwargs)
+    ext.db.session.add(record)
+    ext.db.session.flush()
+    return record
+
+
+def test_directory_usage_counts_between_scans():
+    scans = []
+    usage = DirectoryUsage(lambda: scans.append(1) or 100)
+    assert usage.total(refresh=60) == 100
+    usage.add(50)
+    usage.add(-20)
+    assert usage.total(refresh=60) == 130
+    assert len(scans) == 1
+    usage.invalidate()
+    assert usage.total(refresh=60) == 100
+
+
+def test_spool_does_not_rescan_directory(flask_app, monkeypatch):
+    scans = []
+    monkeypatch.setattr(audio_store, "_usage", DirectoryUsage(lambda: scans.append(1) or 0))
+    for i in range(5):
+        audio_store.spool(f"r{i}", b"x" * 10)
+    assert audio_store.spool_bytes() == 50
+    audio_store.discard("r0")
+    assert audio_store.spool_bytes() == 40
+    assert len(scans) == 1
+
+
+def test_spool_rejects_when_full(flask_app):
+    flask_app.config["AUDIO_SPOOL_MAX_BYTES"] = 25
+    audio_store.spool("a", b"x" * 10)
+    audio_store.spool("b", b"x" * 10)
+    with pytest.raises(audio_store.SpoolFull):
+        audio_store.spool("c", b"x" * 10)
+    audio_store.discard("a")
+    audio_store.spool("c", b"x" * 10)
+
+
+def test_usage_recalibrates_from_disk(flask_app):
+    flask_app.config["AUDIO_SPOOL_USAGE_REFRESH"] = 0
+    audio_store.spool("a", b"x" * 10)
+    os.remove(audio_store.spool_path("a"))          # 其他进程删除
+    assert audio_store.spool_bytes() == 0
+
+
+def test_upload_updates_record(flask_app, puts):
+    record = _record()
+    audio_store.stage(record, b"RIFF")
+    ext.db.session.commit()
+    assert audio_store.upload(record.record_id) == audio_store.STATUS_UPLOADED
+    assert puts == [(audio_store.user_audio_key(record.record_id), b"RIFF")]
+    assert record.upload_status == audio_store.STATUS_UPLOADED
+    assert not os.path.exists(audio_store.spool_path(record.record_id))
+
+
+def test_upload_without_record_does_not_put(flask_app, puts):
+    audio_store.spool("ghost", b"RIFF")
+    assert audio_store.upload("ghost") == "orphaned"
+    assert puts == []
+    assert audio_store.drain(min_age=-1)["orphaned"] == 1
+    assert not os.path.exists(audio_store.spool_path("ghost"))
+
+
+def test_drain_requeues_pending(flask_app, monkeypatch):
+    sent = []
+    monkeypatch.setattr(ext.celery, "send_task", lambda name, args, **kw: sent.append((name, args)))
+    record = _record()
+    audio_store.stage(record, b"RIFF")
+    ext.db.session.commit()
+    assert audio_store.drain(min_age=-1) == {"requeued": 1, "orphaned": 0, "cleaned": 0, "backoff": 0}
+    assert sent == [("audio.upload", [record.record_id])]
+
+
+def test_drain_skips_records_in_retry_backoff(flask_app, monkeypatch):
+    sent = []
+    monkeypatch.setattr(ext.celery, "send_task", lambda name, args, **kw: sent.append(args[0]))
+    waiting, due = _record(), _record()
+    for record in (waiting, due):
+        audio_store.stage(record, b"RIFF")
+    ext.db.session.commit()
+    audio_store.schedule_retry(waiting.record_id, 300)
+    audio_store.schedule_retry(due.record_id, -1)
+
+    result = audio_store.drain(min_age=-1)
+    assert (result["requeued"], result["backoff"]) == (1, 1)
+    assert sent == [due.record_id]
+    assert ext.redis_client.zscore(audio_store.RETRY_KEY, due.record_id) is None
+
+
+def test_upload_clears_retry_marker(flask_app, puts):
+    record = _record()
+    audio_store.stage(record, b"RIFF")
+    ext.db.session.commit()
+    audio_store.schedule_retry(record.record_id, 300)
+    audio_store.upload(record.record_id)
+    assert ext.redis_client.zcard(audio_store.RETRY_KEY) == 0
+
+
+@pytest.fixture
+def heads(monkeypatch):
+    objects, deleted = {}, []
+
+    def get_object_metadata(bucket, key):
+        if key not in objects:
+            return SimpleNamespace(status=404, errorMessage="NoSuchKey")
+        return SimpleNamespace(status=200, body=SimpleNamespace(contentLength=objects[key]))
+
+    monkeypatch.setattr(audio_store.obs_client, "getObjectMetadata", get_object_metadata)
+    monkeypatch.setattr(audio_store.obs_client, "deleteObject", lambda bucket, key: deleted.append(key))
+    return objects, deleted
+
+
+def test_expire_awaiting_direct_records(flask_app, heads):
+    objects, deleted = heads
+    old = datetime.now() - timedelta(days=2)
+    lost_callback = _record(upload_status=audio_store.STATUS_AWAITING, attempted_at=old)
+    never_put     = _record(upload_status=audio_store.STATUS_AWAITING, attempted_at=old)
+    oversized     = _record(upload_status=audio_store.STATUS_AWAITING, attempted_at=old)
+    recent        = _record(upload_status=audio_store.STATUS_AWAITING)
+    ext.db.session.commit()
+    objects[audio_store.user_audio_key(lost_callback.record_id)] = 1000
+    objects[audio_store.user_audio_key(oversized.record_id)] = audio_store.direct_max_bytes() + 1
+
+    assert audio_store.expire_awaiting(24 * 3600) == {"adopted": 1, "expired": 2}
+    assert (lost_callback.upload_status, lost_callback.user_audio_key) == \
+           (audio_store.STATUS_UPLOADED, audio_store.user_audio_key(lost_callback.record_id))
+    assert never_put.upload_status == oversized.upload_status == audio_store.STATUS_FAILED
+    assert deleted == [audio_store.user_audio_key(oversized.record_id)]
+    assert recent.upload_status == audio_store.STATUS_AWAITING
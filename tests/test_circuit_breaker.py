@@ -0,0 +1,137 @@
+# app/utils/circuit_breaker.py：状态转换，以及讯飞调用链上的熔断
+
+# tests/test_circuit_breaker.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import circuit_breaker, xunfei_async
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, cooldown=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_failures(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, cooldown=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats() == {"name": "t", "state": "closed", "failures": 0}
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("t", failure_threshold=5, cooldown=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 9
+    assert breaker.state == "open"
+
+
+@pytest.fixture
+def failing_ise(monkeypatch, clock):
+    calls = []
+
+    async def prepare(audio_bytes, encoding):
+        return None
+
+    async def attempt(payload, text, extra_slots=None):
+        calls.append(1)
+        return None, -1
+
+    monkeypatch.setattr(xunfei_async, "_prepare_payload", prepare)
+    monkeypatch.setattr(xunfei_async, "_hedged_attempt", attempt)
+    monkeypatch.setattr(xunfei_async, "RETRIES", 0)
+    monkeypatch.setattr(xunfei_async, "breaker", CircuitBreaker("xunfei-ise", failure_threshold=2, cooldown=30))
+    return calls
+
+
+def test_ise_fails_fast_when_open(failing_ise):
+    for _ in range(2):
+        assert asyncio.run(xunfei_async._evaluate_resilient(b"", "t")) is None
+    with pytest.raises(xunfei_async.IseUnavailable):
+        asyncio.run(xunfei_async._evaluate_resilient(b"", "t"))
+    assert len(failing_ise) == 2
+
+
+def test_non_retryable_error_does_not_trip(failing_ise, monkeypatch):
+    code = next(iter(xunfei_async.NON_RETRYABLE_CODES))
+
+    async def attempt(payload, text, extra_slots=None):
+        return None, code
+
+    monkeypatch.setattr(xunfei_async, "_hedged_attempt", attempt)
+    for _ in range(3):
+        assert asyncio.run(xunfei_async._evaluate_resilient(b"", "t")) is None
+    assert xunfei_async.breaker.state == "closed"
+
+
+def test_neutral_releases_half_open_probe(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call()
+    breaker.record_neutral()
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_throttling_does_not_trip(failing_ise, monkeypatch):
+    async def attempt(payload, text, extra_slots=None):
+        return None, 11203
+
+    monkeypatch.setattr(xunfei_async, "_hedged_attempt", attempt)
+    for _ in range(3):
+        assert asyncio.run(xunfei_async._evaluate_resilient(b"", "t")) is None
+    assert xunfei_async.breaker.state == "closed"
+
+
+def test_cancellation_does_not_trip(failing_ise, monkeypatch):
+    async def attempt(payload, text, extra_slots=None):
+        await asyncio.sleep(60)
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(xunfei_async._evaluate_resilient(b"", "t"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(xunfei_async, "_hedged_attempt", attempt)
+    for _ in range(3):
+        asyncio.run(cancel_soon())
+    assert xunfei_async.breaker.stats()["failures"] == 0
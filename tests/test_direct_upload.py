@@ -0,0 +1,126 @@
+# 客户端直传 OBS：签名 URL 与完成回调校验（/api/statistics/practice_records/direct）
+
+# tests/test_direct_upload.py
+
+from types import SimpleNamespace
+
+import pytest
+
+import app.extensions as ext
+from app.models import PracticeRecord
+from app.utils import audio_store, presigned
+
+SUMMARY = {"total_score": 4.0, "accuracy_score": 3.5}
+
+
+@pytest.fixture
+def obs(monkeypatch):
+    """假 OBS：objects 为 key → 大小，signed 记录签名调用"""
+    state = SimpleNamespace(objects={}, signed=[], deleted=[])
+
+    def create_signed_url(method, bucketName, objectKey, expires, headers):
+        state.signed.append((method, objectKey, expires, headers))
+        return SimpleNamespace(signedUrl=f"https://obs/{objectKey}?sig")
+
+    def get_object_metadata(bucket, key):
+        if key not in state.objects:
+            return SimpleNamespace(status=404, errorMessage="NoSuchKey")
+        return SimpleNamespace(status=200, body=SimpleNamespace(contentLength=state.objects[key]))
+
+    def delete_object(bucket, key):
+        state.deleted.append(key)
+        state.objects.pop(key, None)
+
+    monkeypatch.setattr(presigned.obs_client, "createSignedUrl", create_signed_url)
+    monkeypatch.setattr(audio_store.obs_client, "getObjectMetadata", get_object_metadata)
+    monkeypatch.setattr(audio_store.obs_client, "deleteObject", delete_object)
+    return state
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+def _create(client, **kwargs):
+    body = dict(user_id="u1", session_id="s", question_id="q", summary=SUMMARY)
+    body.update(kwargs)
+    return client.post("/api/statistics/practice_records/direct", json=body)
+
+
+def _complete(client, record_id, size, user_id="u1"):
+    return client.post(f"/api/statistics/practice_records/{record_id}/upload_complete",
+                       json={"user_id": user_id, "size": size})
+
+
+def test_create_returns_signed_put(client, obs):
+    rv = _create(client, size=1000)
+    assert rv.status_code == 201
+    data = rv.get_json()["data"]
+    key  = audio_store.user_audio_key(data["record_id"])
+    assert data["upload_status"] == audio_store.STATUS_AWAITING and data["user_audio_key"] == key
+    assert data["upload"] == {"url": f"https://obs/{key}?sig", "method": "PUT",
+                              "headers": {"Content-Type": "audio/wav"}, "expires_in": 900}
+    assert obs.signed == [("PUT", key, 900, {"Content-Type": "audio/wav"})]
+    record = PracticeRecord.query.get(data["record_id"])
+    assert record.user_audio_key is None and record.total_score == 4.0
+
+
+def test_create_validates(client, obs, flask_app):
+    assert _create(client, summary=None).status_code == 400
+    assert _create(client, summary="{not json").status_code == 400
+    assert _create(client, size="big").status_code == 400
+    flask_app.config["AUDIO_DIRECT_MAX_BYTES"] = 100
+    assert _create(client, size=101).status_code == 422
+    assert PracticeRecord.query.count() == 0
+
+
+def test_signing_failure_rolls_back(client, obs, monkeypatch):
+    def boom(**kwargs):
+        raise RuntimeError("obs down")
+
+    monkeypatch.setattr(presigned.obs_client, "createSignedUrl", boom)
+    assert _create(client).status_code == 503
+    assert PracticeRecord.query.count() == 0
+
+
+def test_complete_checks_object(client, obs):
+    record_id = _create(client).get_json()["data"]["record_id"]
+    key = audio_store.user_audio_key(record_id)
+
+    assert _complete(client, "missing", 1000).status_code == 404
+    assert _complete(client, record_id, 1000, user_id="other").status_code == 403
+    assert _complete(client, record_id, None).status_code == 400
+    assert _complete(client, record_id, 1000).status_code == 422          # 还没 PUT
+
+    obs.objects[key] = 999
+    assert _complete(client, record_id, 1000).status_code == 422          # 大小不符
+    assert PracticeRecord.query.get(record_id).upload_status == audio_store.STATUS_AWAITING
+
+    obs.objects[key] = 1000
+    rv = _complete(client, record_id, 1000)
+    assert rv.status_code == 200
+    assert rv.get_json()["data"] == {"record_id": record_id, "user_audio_key": key,
+                                     "upload_status": audio_store.STATUS_UPLOADED, "size": 1000}
+    assert _complete(client, record_id, 1000).status_code == 200          # 重复回调
+    stats = ext.redis_client.hgetall(audio_store.STATS_KEY)
+    assert (stats["direct_uploaded"], stats["direct_rejected"]) == ("1", "1")
+
+
+@pytest.mark.parametrize("size", [audio_store.WAV_HEADER_BYTES, 101])
+def test_out_of_range_object_is_deleted(client, obs, flask_app, size):
+    flask_app.config["AUDIO_DIRECT_MAX_BYTES"] = 100
+    record_id = _create(client).get_json()["data"]["record_id"]
+    key = audio_store.user_audio_key(record_id)
+    obs.objects[key] = size
+    assert _complete(client, record_id, size).status_code == 422
+    assert obs.deleted == [key]
+
+
+def test_complete_rejects_spooled_records(client, obs, flask_app):
+    record = PracticeRecord(user_id="u1", session_id="s", question_id="q", accuracy_score=0, fluency_score=0,
+                            integrity_score=0, standard_score=0, total_score=0,
+                            upload_status=audio_store.STATUS_PENDING)
+    ext.db.session.add(record)
+    ext.db.session.commit()
+    assert _complete(client, record.record_id, 1000).status_code == 400
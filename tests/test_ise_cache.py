@@ -0,0 +1,68 @@
+# app/utils/ise_cache.py：内容寻址缓存键、TTL 与条目上限淘汰
+
+# tests/test_ise_cache.py
+
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from flask import Flask
+
+import app.extensions as ext
+from app.utils import ise_cache
+from app.utils.xunfei import ISE_PARAMS
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(ext, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def app_context(redis):
+    app = Flask(__name__)
+    app.config.update(ISE_CACHE_TTL=60, ISE_CACHE_MAX_ENTRIES=3)
+    with app.app_context():
+        yield app
+
+
+def test_key_depends_on_audio_text_and_params():
+    base = ise_cache.make_key(b"pcm", "hello")
+    assert base == ise_cache.make_key(b"pcm", "hello", dict(ISE_PARAMS))
+    assert base != ise_cache.make_key(b"pcm2", "hello")
+    assert base != ise_cache.make_key(b"pcm", "hello.")
+    assert base != ise_cache.make_key(b"pcm", "hello", dict(ISE_PARAMS, rst="plain"))
+    # 分隔符防止拼接歧义
+    assert ise_cache.make_key(b"ab", "c") != ise_cache.make_key(b"a", "bc")
+
+
+def test_key_ignores_param_order():
+    assert ise_cache.make_key(b"x", "t", {"a": 1, "b": 2}) == ise_cache.make_key(b"x", "t", {"b": 2, "a": 1})
+
+
+def test_round_trip_with_ttl_and_stats(app_context, redis):
+    assert ise_cache.get("d1") is None
+    ise_cache.put("d1", {"summary": {"total_score": 4.2}, "words": []})
+    assert ise_cache.get("d1") == {"summary": {"total_score": 4.2}, "words": []}
+    assert 0 < redis.ttl(ise_cache.KEY_PREFIX + "d1") <= 60
+    assert ise_cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "hit_rate": 0.5}
+
+
+def test_evicts_oldest_over_limit(app_context, redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ise_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    for i in range(5):
+        now[0] += 1
+        ise_cache.put(f"d{i}", {"n": i})
+    assert redis.zrange(ise_cache.INDEX_KEY, 0, -1) == ["d2", "d3", "d4"]
+    assert ise_cache.get("d0") is None and ise_cache.get("d1") is None
+    assert ise_cache.get("d4") == {"n": 4}
+
+
+def test_disabled_cache_is_bypassed(app_context, redis):
+    app_context.config["ISE_CACHE_ENABLED"] = False
+    ise_cache.put("d1", {"n": 1})
+    assert ise_cache.get("d1") is None
+    assert redis.dbsize() == 0
@@ -0,0 +1,126 @@
+# app/utils/ise_governor.py：集群并发许可与对冲额外许可
+
+# tests/test_ise_governor.py
+
+import asyncio
+import fakeredis
+import pytest
+from flask import Flask
+
+import app.extensions as ext
+from app.utils import ise_governor, xunfei_async
+from app.utils.ise_governor import ise_slot, SlotUnavailable, HOLDERS_KEY, WAITING_KEY
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(ext, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def app_context(redis):
+    app = Flask(__name__)
+    app.config.update(XUNFEI_MAX_CONCURRENCY=2, ISE_QUEUE_TIMEOUT=0.2, ISE_SLOT_LEASE=60)
+    with app.app_context():
+        yield app
+
+
+def test_slot_is_released(app_context, redis):
+    with ise_slot("u1") as slot:
+        assert redis.zcard(HOLDERS_KEY) == 1
+        assert slot.limit == 2
+    assert redis.zcard(HOLDERS_KEY) == 0
+
+
+def test_limit_is_enforced(app_context, redis):
+    with ise_slot("u1"), ise_slot("u2"):
+        with pytest.raises(SlotUnavailable):
+            with ise_slot("u3"):
+                pass
+    assert redis.zcard(WAITING_KEY) == 0
+    assert redis.hget(ise_governor.USER_WAITING_KEY, "u3") == "0"
+
+
+@pytest.mark.parametrize("user", ["a|b", "|", None])
+def test_user_waiting_count_balances(app_context, redis, user):
+    with ise_slot("u1"), ise_slot("u2"):
+        with pytest.raises(SlotUnavailable):
+            with ise_slot(user):
+                pass
+    with ise_slot(user):
+        pass
+    assert all(v == "0" for v in redis.hgetall(ise_governor.USER_WAITING_KEY).values())
+    assert ise_governor.queue_stats()["waiting_users"] == 0
+
+
+def test_extra_slot_counts_against_limit(app_context, redis):
+    with ise_slot("u1") as slot:
+        ticket = slot.try_extra()
+        assert ticket is not None
+        assert redis.zcard(HOLDERS_KEY) == 2
+        assert slot.try_extra() is None            # 已满
+        with pytest.raises(SlotUnavailable):
+            with ise_slot("u2"):
+                pass
+        slot.release_extra(ticket)
+        assert redis.zcard(HOLDERS_KEY) == 1
+    assert redis.zcard(HOLDERS_KEY) == 0
+
+
+def test_extra_slot_does_not_jump_the_queue(app_context, redis):
+    with ise_slot("u1") as slot:
+        redis.zadd(WAITING_KEY, {"u2|waiting": 1})
+        redis.zadd(ise_governor.DEADLINES_KEY, {"u2|waiting": ise_governor._now_ms() + 60000})
+        assert slot.try_extra() is None
+
+
+def test_governor_disabled_yields_none(app_context):
+    app_context.config["ISE_GOVERNOR_ENABLED"] = False
+    with ise_slot("u1") as slot:
+        assert slot is None
+
+
+class _Slots:
+    def __init__(self, grant):
+        self.grant, self.released = grant, []
+
+    def try_extra(self):
+        return "t" if self.grant else None
+
+    def release_extra(self, ticket):
+        self.released.append(ticket)
+
+
+@pytest.fixture
+def slow_primary(monkeypatch):
+    """主请求很慢、对冲请求很快；记录发起的会话数"""
+    calls = []
+
+    async def attempt(payload, text):
+        calls.append(len(calls))
+        await asyncio.sleep(0.3 if len(calls) == 1 else 0.01)
+        return f"xml{len(calls)}", 0
+
+    monkeypatch.setattr(xunfei_async, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(xunfei_async._latency, "p95", lambda: 0.01)
+    monkeypatch.setattr(xunfei_async, "_upload_seconds", lambda payload: 0.0)
+    monkeypatch.setattr(xunfei_async, "_attempt", attempt)
+    return calls
+
+
+def test_hedge_uses_extra_slot(slow_primary):
+    slots = _Slots(grant=True)
+    xml, _ = asyncio.run(xunfei_async._hedged_attempt(None, "t", slots))
+    assert len(slow_primary) == 2
+    assert xml == "xml2"
+    assert slots.released == ["t"]
+
+
+def test_hedge_skipped_without_free_slot(slow_primary):
+    slots = _Slots(grant=False)
+    xml, _ = asyncio.run(xunfei_async._hedged_attempt(None, "t", slots))
+    assert len(slow_primary) == 1
+    assert xml == "xml1"
+    assert slots.released == []
@@ -0,0 +1,138 @@
+# app/utils/ise_jobs.py + /api/evaluate/ise/jobs：异步评测任务状态与 SSE 推送
+
+# tests/test_ise_jobs.py
+
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import app.extensions as ext
+from app.models import Question, Topic
+from app.utils import ise_jobs
+from app.utils.audio import pcm16_to_wav
+from app.utils.ise_pipeline import EvaluationError
+from celery_app import tasks
+
+
+@pytest.fixture
+def client(flask_app):
+    topic = Topic(name="t")
+    ext.db.session.add(topic)
+    ext.db.session.flush()
+    ext.db.session.add(Question(question_id="q1", text="hello world", topic_id=topic.topic_id))
+    ext.db.session.commit()
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def events(flask_app):
+    """events(job_id) 订阅任务事件频道，返回读取函数：取出目前收到的状态列表"""
+    subscriptions = []
+
+    def subscribe(job_id):
+        pubsub = ext.redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(ise_jobs.channel(job_id))
+        subscriptions.append(pubsub)
+
+        def read():
+            out, deadline = [], time.monotonic() + 0.3
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=0.05)
+                if message is not None:
+                    out.append(message["data"])
+            return out
+        return read
+
+    yield subscribe
+    for pubsub in subscriptions:
+        pubsub.close()
+
+
+def _sse_events(resp) -> list:
+    events = []
+    for block in b"".join(resp.response).decode("utf-8").split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_submit_queues_job(client, monkeypatch):
+    sent = []
+    monkeypatch.setattr(ext.celery, "send_task", lambda name, args, **kw: sent.append((name, args)))
+    wav = pcm16_to_wav(b"\0\0" * 1600)
+    rv = client.post("/api/evaluate/ise/jobs", data={"question_id": "q1", "audio": (io.BytesIO(wav), "a.wav")})
+    body = rv.get_json()
+    assert body["code"] == 202 and body["data"]["status"] == "queued"
+    job_id = body["data"]["job_id"]
+    assert sent[0][0] == "evaluate.ise" and sent[0][1][0] == job_id and sent[0][1][2] == "hello world"
+    assert client.get(f"/api/evaluate/jobs/{job_id}").get_json()["data"] == \
+           {"job_id": job_id, "status": "queued", "question_id": "q1"}
+
+
+def test_submit_validates(client):
+    assert client.post("/api/evaluate/ise/jobs", data={}).get_json()["code"] == 400
+    rv = client.post("/api/evaluate/ise/jobs",
+                     data={"question_id": "nope", "audio": (io.BytesIO(b"x"), "a.wav")})
+    assert rv.get_json()["code"] == 404
+    assert client.get("/api/evaluate/jobs/missing").get_json()["code"] == 404
+
+
+def test_task_transitions_to_done(flask_app, events, monkeypatch):
+    monkeypatch.setattr(tasks, "evaluate_wav", lambda data, text, cid, detail: {"summary": {}, "words": []})
+    ise_jobs.create_job("j1", "q1")
+    read = events("j1")
+    tasks.evaluate_ise.run("j1", "", "hello")
+    assert read() == ["running", "done"]
+    job = ise_jobs.get_job("j1")
+    assert job["status"] == "done" and job["result"] == {"summary": {}, "words": []}
+
+
+def test_task_records_evaluation_error(flask_app, events, monkeypatch):
+    def reject(*args):
+        raise EvaluationError(422, "Recording is silent", data={"reason": "silent"})
+
+    monkeypatch.setattr(tasks, "evaluate_wav", reject)
+    ise_jobs.create_job("j2", "q1")
+    read = events("j2")
+    tasks.evaluate_ise.run("j2", "", "hello")
+    assert read() == ["running", "failed"]
+    job = ise_jobs.get_job("j2")
+    assert (job["status"], job["code"], job["error"], job["result"]) == \
+           ("failed", 422, "Recording is silent", {"reason": "silent"})
+
+
+def test_stream_ends_immediately_for_finished_job(client):
+    ise_jobs.create_job("j3", "q1")
+    ise_jobs.update_job("j3", "done", result={"summary": {}})
+    events = _sse_events(client.get("/api/evaluate/jobs/j3/stream"))
+    assert [(e, d["status"]) for e, d in events] == [("status", "done")]
+
+
+def test_stream_follows_updates_until_final(client, flask_app):
+    ise_jobs.create_job("j4", "q1")
+
+    def worker():
+        time.sleep(0.3)
+        with flask_app.app_context():
+            ise_jobs.update_job("j4", "running")
+            ise_jobs.update_job("j4", "failed", error="boom", code=500)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    events = _sse_events(client.get("/api/evaluate/jobs/j4/stream"))
+    thread.join()
+    statuses = [d["status"] for _, d in events]
+    assert statuses[0] == "queued" and statuses[-1] == "failed"
+    assert events[-1][1]["error"] == "boom"
+
+
+def test_stream_times_out(client, flask_app):
+    flask_app.config["ISE_JOB_STREAM_TIMEOUT"] = 0.2
+    ise_jobs.create_job("j5", "q1")
+    events = _sse_events(client.get("/api/evaluate/jobs/j5/stream"))
+    assert [e for e, _ in events] == ["status", "timeout"]
+    assert client.get("/api/evaluate/jobs/missing/stream").get_json()["code"] == 404
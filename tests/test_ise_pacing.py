@@ -0,0 +1,49 @@
+# app/utils/ise_pacing.py：上传节奏与配置来源
+
+# tests/test_ise_pacing.py
+
+import pytest
+
+from app.config import get_config
+from app.utils import ise_pacing
+from app.utils.ise_pacing import Pacer
+
+
+def test_realtime_interval_matches_audio_duration():
+    pacer = Pacer("realtime", frame_bytes=1280)
+    assert pacer.interval() == pytest.approx(0.04)
+    assert pacer.delay(2.0) == pytest.approx(2.0)
+
+
+def test_burst_speedup():
+    pacer = Pacer("burst", burst_speedup=4)
+    assert pacer.delay(2.0) == pytest.approx(0.5)
+    pacer.record_failure()                          # 固定模式不受反馈影响
+    assert pacer.speedup == 4
+
+
+def test_adaptive_aimd():
+    pacer = Pacer("adaptive", burst_speedup=2, step=0.5)
+    assert pacer.speedup == 1.0
+    pacer.record_success()
+    pacer.record_success()
+    pacer.record_success()
+    assert pacer.speedup == 2.0                     # 不超过 burst 上限
+    pacer.record_failure()
+    assert pacer.speedup == 1.0
+    pacer.record_failure()
+    assert pacer.speedup == 1.0                     # 不低于实时
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Pacer("warp")
+
+
+def test_get_pacer_reads_app_config(monkeypatch):
+    cfg = get_config()
+    monkeypatch.setattr(cfg, "XUNFEI_PACING_MODE", "burst")
+    monkeypatch.setattr(cfg, "XUNFEI_BURST_SPEEDUP", 3.0)
+    monkeypatch.setattr(ise_pacing, "_pacer", None)
+    pacer = ise_pacing.get_pacer()
+    assert (pacer.mode, pacer.speedup) == ("burst", 3.0)
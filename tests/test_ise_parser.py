@@ -0,0 +1,92 @@
+# app/utils/ise_parser.py：讯飞评测 XML → IseResult
+
+# tests/test_ise_parser.py
+
+import base64
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.utils import ise_parser
+from app.utils.ise_parser import IseResult, Phone, Summary
+
+CHAPTER = ('<read_chapter total_score="4.1" standard_score="3.9" fluency_score="3.2" accuracy_score="4.5" '
+           'integrity_score="5.0" is_rejected="{rejected}" except_info="{info}">{sentences}</read_chapter>')
+
+SENTENCE = '<sentence index="{index}" content="s">{words}</sentence>'
+
+WORD = ('<word content="{text}" global_index="{gi}" total_score="{score}" accuracy_score="4" fluency_score="3" '
+        'dp_message="{dp}" beg_pos="{beg}" end_pos="{end}">'
+        '<syll content="{text}" syll_score="3.5" beg_pos="{beg}" end_pos="{end}">'
+        '<phone content="hh" dp_message="0" beg_pos="{beg}" end_pos="{mid}"/>'
+        '<phone content="ax" dp_message="128" beg_pos="{mid}" end_pos="{end}"/>'
+        '</syll></word>')
+
+
+def _word(text, gi, score=4.0, dp=0):
+    beg = gi * 50
+    return WORD.format(text=text, gi=gi, score=score, dp=dp, beg=beg, mid=beg + 20, end=beg + 40)
+
+
+def _xml(sentences, rejected="false", info=0):
+    body = "".join(SENTENCE.format(index=i, words="".join(words)) for i, words in enumerate(sentences))
+    chapter = CHAPTER.format(rejected=rejected, info=info, sentences=body)
+    return f'<?xml version="1.0"?><xml_result><read_sentence><rec_paper>{chapter}</rec_paper></read_sentence></xml_result>'
+
+
+TWO_SENTENCES = _xml([[_word("hello", 0), _word("world", 1, dp=16)], [_word("bye", 2, score=2.5)]])
+
+
+def test_multi_sentence_chapter():
+    result = ise_parser.parse(TWO_SENTENCES)
+    assert result.summary == Summary(4.1, 3.9, 3.2, 4.5, 5.0, False, 0)
+    assert [(w.content, w.global_index, w.sentence_index) for w in result.words] == \
+           [("hello", 0, 0), ("world", 1, 0), ("bye", 2, 1)]
+    assert result.words[1].dp_message == 16
+    assert result.words[2].total_score == 2.5
+    assert result.words[0].syllables[0].phones == (Phone("hh", 0, 20, 0), Phone("ax", 20, 40, 128))
+
+
+@pytest.mark.parametrize("encode", [
+    lambda x: x,
+    lambda x: x.encode("utf-8"),
+    lambda x: base64.b64encode(x.encode("utf-8")).decode("ascii"),
+    lambda x: base64.b64encode(x.encode("utf-8")),
+])
+def test_base64_and_raw_inputs_agree(encode):
+    assert ise_parser.parse(encode(TWO_SENTENCES)) == ise_parser.parse(TWO_SENTENCES)
+
+
+def test_rejected_result_is_flagged():
+    result = ise_parser.parse(_xml([[_word("hello", 0)]], rejected="true", info=28676))
+    assert result.summary.is_rejected is True
+    assert result.summary.except_info == 28676
+    assert result.to_dict()["summary"]["is_rejected"] is True
+
+
+def test_missing_chapter_and_bad_xml():
+    empty = ise_parser.parse("<xml_result><read_sentence><rec_paper/></read_sentence></xml_result>")
+    assert empty == IseResult(Summary(0.0, 0.0, 0.0, 0.0, 0.0), ())
+    with pytest.raises(ET.ParseError):
+        ise_parser.parse("<xml_result><unclosed>")
+
+
+def test_bad_numbers_default_to_zero():
+    result = ise_parser.parse(_xml([[_word("hi", 0)]]).replace('total_score="4.0"', 'total_score="n/a"'))
+    assert result.words[0].total_score == 0.0
+
+
+def test_to_dict_shapes():
+    plain = ise_parser.parse(TWO_SENTENCES, detail=False)
+    assert plain.words[0].syllables == ()
+    assert plain.to_dict()["words"][0] == \
+           {"text": "hello", "score": 4.0, "accuracy": 4.0, "fluency": 3.0, "global_index": 0}
+
+    word = ise_parser.parse(TWO_SENTENCES).to_dict(detail=True)["words"][2]
+    assert word["sentence_index"] == 1
+    assert (word["dp_message"], word["beg_pos"], word["end_pos"]) == (0, 100, 140)
+    assert word["syllables"] == [{
+        "content": "bye", "score": 3.5, "beg_pos": 100, "end_pos": 140,
+        "phones": [{"content": "hh", "beg_pos": 100, "end_pos": 120, "dp_message": 0},
+                   {"content": "ax", "beg_pos": 120, "end_pos": 140, "dp_message": 128}],
+    }]
@@ -0,0 +1,79 @@
+# 16kHz 单声道 16 位 WAV 快速路径：audio.passthrough_pcm16 与 ise_pipeline.transcode_to_pcm
+
+# tests/test_passthrough.py
+
+import struct
+
+import fakeredis
+import numpy as np
+import pytest
+from flask import Flask
+
+import app.extensions as ext
+from app.utils import ise_pipeline
+from app.utils.audio import (WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM,
+                             passthrough_pcm16)
+
+PCM = np.arange(-800, 800, dtype='<i2').tobytes()
+
+
+def wav(data=PCM, rate=16000, channels=1, bits=16, tag=WAVE_FORMAT_PCM, sub_tag=None,
+        data_size=None, extra_chunks=b""):
+    """按参数拼 RIFF/WAVE；sub_tag 不为 None 时写 WAVE_FORMAT_EXTENSIBLE 的 40 字节 fmt"""
+    block = channels * bits // 8
+    fmt = struct.pack('<HHIIHH', tag, channels, rate, rate * block, block, bits)
+    if sub_tag is not None:
+        fmt += struct.pack('<HHI', 22, bits, 0) + struct.pack('<H', sub_tag) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+    size = len(data) if data_size is None else data_size
+    body = b"WAVE" + b"fmt " + struct.pack('<I', len(fmt)) + fmt + extra_chunks + b"data" + struct.pack('<I', size) + data
+    return b"RIFF" + struct.pack('<I', len(body)) + body
+
+
+@pytest.mark.parametrize("upload", [
+    wav(),
+    wav(tag=WAVE_FORMAT_EXTENSIBLE, sub_tag=WAVE_FORMAT_PCM),
+    wav(extra_chunks=b"LIST" + struct.pack('<I', 5) + b"INFO!" + b"\0"),    # 奇数长度块补齐
+    wav(data_size=0),                                                       # 流式写出的 WAV
+    wav(data_size=0xFFFFFFFF),
+])
+def test_accepts_16k_mono_pcm16(upload):
+    assert passthrough_pcm16(upload) == PCM
+
+
+@pytest.mark.parametrize("upload", [
+    wav(rate=8000),
+    wav(rate=44100),
+    wav(data=PCM + PCM, channels=2),
+    wav(data=PCM[:len(PCM) // 2 * 2], bits=8),
+    wav(data=PCM + PCM, bits=32),
+    wav(data=PCM + PCM, bits=32, tag=WAVE_FORMAT_IEEE_FLOAT),
+    wav(tag=WAVE_FORMAT_EXTENSIBLE, sub_tag=WAVE_FORMAT_IEEE_FLOAT),
+    b"ID3\x03" + PCM,                                                       # MP3
+    b"fLaC" + PCM,
+    b"",
+])
+def test_rejects_other_formats(upload):
+    assert passthrough_pcm16(upload) is None
+
+
+def test_odd_data_length_is_trimmed_to_whole_samples():
+    assert passthrough_pcm16(wav(data=PCM + b"\x01")) == PCM
+
+
+def test_declared_size_is_clamped_to_upload():
+    assert passthrough_pcm16(wav(data_size=len(PCM) // 2)) == PCM[:len(PCM) // 2]
+    assert passthrough_pcm16(wav(data_size=len(PCM) + 1000)) == PCM
+
+
+@pytest.fixture
+def app_context(monkeypatch):
+    monkeypatch.setattr(ext, "redis_client", fakeredis.FakeRedis(decode_responses=True))
+    with Flask(__name__).app_context():
+        yield
+
+
+def test_transcode_counts_fast_path(app_context):
+    assert ise_pipeline.transcode_to_pcm(wav()) == PCM
+    resampled = ise_pipeline.transcode_to_pcm(wav(data=PCM * 2, rate=32000))
+    assert len(resampled) == len(PCM)
+    assert ise_pipeline.transcode_stats() == {"passthrough": 1, "transcoded": 1, "hit_rate": 0.5}
@@ -0,0 +1,188 @@
+# app/utils/resumable.py + app/views/uploads.py：分片上传状态机
+
+# tests/test_resumable.py
+
+import os
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+
+import app.extensions as ext
+from app.models import PracticeRecord, Question, Topic
+from app.utils import resumable
+from app.utils.dir_usage import DirectoryUsage
+
+
+PAYLOAD = os.urandom(2500)
+
+
+@pytest.fixture
+def client(flask_app, monkeypatch):
+    flask_app.config["RESUMABLE_CHUNK_MAX_BYTES"] = 1000
+    monkeypatch.setattr(resumable, "_usage", DirectoryUsage(resumable._scan_usage))
+    topic = Topic(name="t")
+    ext.db.session.add(topic)
+    ext.db.session.flush()
+    ext.db.session.add(Question(question_id="q1", text="hi", topic_id=topic.topic_id))
+    ext.db.session.commit()
+    return flask_app.test_client()
+
+
+def _create(client, length=len(PAYLOAD), **kwargs):
+    body = dict(purpose="practice_record", length=length, question_id="q1", session_id="s",
+                user_id="u", summary={"total_score": 3})
+    body.update(kwargs)
+    return client.post("/api/uploads", json=body)
+
+
+def _put(client, upload_id, offset, data):
+    return client.put(f"/api/uploads/{upload_id}", data=data, headers={"Upload-Offset": str(offset)})
+
+
+class _Flaky:
+    """读到 cut 字节后模拟客户端断开"""
+
+    def __init__(self, data, cut):
+        self.data, self.cut, self.pos = data, cut, 0
+
+    def read(self, size):
+        if self.pos >= self.cut:
+            raise ClientDisconnected()
+        block = self.data[self.pos:self.pos + min(size, 100)]
+        self.pos += len(block)
+        return block
+
+
+def test_create_validates(client):
+    assert client.post("/api/uploads", json={"purpose": "x", "length": 10}).status_code == 400
+    assert _create(client, length=0).status_code == 400
+    assert _create(client, length=10 ** 9).status_code == 422
+    assert _create(client, purpose="record", question_id="nope").status_code == 404
+    assert _create(client, summary="not json").status_code == 400
+    assert client.get("/api/uploads/missing").status_code == 404
+
+
+def test_chunks_offsets_and_finalize(client):
+    rv = _create(client)
+    assert rv.status_code == 201
+    upload_id = rv.get_json()["data"]["upload_id"]
+
+    rv = _put(client, upload_id, 0, PAYLOAD[:1000])
+    assert rv.status_code == 200 and rv.headers["Upload-Offset"] == "1000"
+
+    rv = _put(client, upload_id, 0, PAYLOAD[:1000])                 # 重发的旧分片
+    assert rv.status_code == 409
+    assert rv.get_json()["data"]["offset"] == 1000 and rv.headers["Upload-Offset"] == "1000"
+
+    assert _put(client, upload_id, 1000, PAYLOAD[1000:2001]).status_code == 400
+
+    rv = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert rv.status_code == 409 and rv.headers["Upload-Offset"] == "1000"
+
+    _put(client, upload_id, 1000, PAYLOAD[1000:2000])
+    rv = _put(client, upload_id, 2000, PAYLOAD[2000:])
+    assert rv.get_json()["data"]["complete"] is True
+
+    first = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert first.status_code == 201
+    again = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert again.status_code == 201 and again.get_json() == first.get_json()
+    assert PracticeRecord.query.count() == 1
+    assert not os.path.exists(resumable.part_path(upload_id))
+    assert _put(client, upload_id, 2500, b"x").status_code == 409
+
+
+def test_disconnect_keeps_received_bytes(client, flask_app):
+    upload_id = _create(client).get_json()["data"]["upload_id"]
+    _put(client, upload_id, 0, PAYLOAD[:1000])
+    with flask_app.test_request_context():
+        assert resumable.write_chunk(upload_id, 1000, _Flaky(PAYLOAD[1000:2000], 600), 1000) == 1600
+
+    rv = client.head(f"/api/uploads/{upload_id}")
+    assert rv.headers["Upload-Offset"] == "1600"
+    _put(client, upload_id, 1600, PAYLOAD[1600:2600])
+    with open(resumable.part_path(upload_id), "rb") as fp:
+        assert fp.read() == PAYLOAD
+
+
+def test_unconfirmed_tail_is_truncated(client):
+    upload_id = _create(client).get_json()["data"]["upload_id"]
+    _put(client, upload_id, 0, PAYLOAD[:1000])
+    with open(resumable.part_path(upload_id), "ab") as fp:       # 崩溃时写了一半、偏移未推进
+        fp.write(b"junk" * 50)
+    _put(client, upload_id, 1000, PAYLOAD[1000:2000])
+    assert os.path.getsize(resumable.part_path(upload_id)) == 2000
+
+
+def test_failed_handoff_stays_finalizable(client, monkeypatch):
+    import app.views.uploads as uploads
+    upload_id = _create(client, length=10).get_json()["data"]["upload_id"]
+    _put(client, upload_id, 0, b"0123456789")
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("db down")
+
+    save = uploads.save_practice_record
+    monkeypatch.setattr(uploads, "save_practice_record", boom)
+    assert client.post(f"/api/uploads/{upload_id}/finalize").status_code == 500
+    assert client.get(f"/api/uploads/{upload_id}").get_json()["data"]["status"] == resumable.STATUS_UPLOADING
+
+    monkeypatch.setattr(uploads, "save_practice_record", save)
+    assert client.post(f"/api/uploads/{upload_id}/finalize").status_code == 201
+
+
+def test_concurrent_finalize_is_busy(client):
+    upload_id = _create(client, length=10).get_json()["data"]["upload_id"]
+    _put(client, upload_id, 0, b"0123456789")
+    resumable.begin_finalize(upload_id)
+    assert client.post(f"/api/uploads/{upload_id}/finalize").status_code == 409
+    assert _put(client, upload_id, 10, b"").status_code == 409
+
+
+def test_quota_reserves_declared_length(client, flask_app, monkeypatch):
+    flask_app.config["RESUMABLE_UPLOAD_DIR_MAX_BYTES"] = 3000
+    first = _create(client).get_json()["data"]["upload_id"]       # 预留 2500，尚未写入
+
+    scans = []
+    monkeypatch.setattr(resumable, "_part_entries", lambda: scans.append(1) or [])
+    assert _create(client, length=501).status_code == 503
+    assert _create(client, length=500).status_code == 201
+    assert _create(client, length=1).status_code == 503
+    assert scans == []
+
+    _put(client, first, 0, PAYLOAD[:1000])
+    _put(client, first, 1000, PAYLOAD[1000:2000])
+    _put(client, first, 2000, PAYLOAD[2000:])
+    assert client.post(f"/api/uploads/{first}/finalize").status_code == 201
+    assert _create(client, length=2500).status_code == 201
+
+
+def test_rescan_counts_reservations(client, flask_app):
+    upload_id = _create(client, length=1000).get_json()["data"]["upload_id"]
+    _put(client, upload_id, 0, PAYLOAD[:400])
+    stale = resumable.part_path("stale")
+    with open(stale, "wb") as fp:
+        fp.write(b"x" * 300)
+    assert resumable._scan_usage() == 1300
+
+
+def test_finalize_after_expiry_is_not_found(client, monkeypatch):
+    upload_id = _create(client, length=10).get_json()["data"]["upload_id"]
+
+    def expire_then_incomplete(upload_id):
+        ext.redis_client.delete(resumable._state_key(upload_id))
+        raise resumable.Incomplete(upload_id)
+
+    monkeypatch.setattr(resumable, "begin_finalize", expire_then_incomplete)
+    assert client.post(f"/api/uploads/{upload_id}/finalize").status_code == 404
+
+
+def test_cleanup_removes_expired_parts(client, flask_app):
+    upload_id = _create(client, length=10).get_json()["data"]["upload_id"]
+    stale = resumable.part_path("stale")
+    open(stale, "wb").close()
+    os.utime(stale, (0, 0))
+    os.utime(resumable.part_path(upload_id), (0, 0))
+    assert resumable.cleanup(60) == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(resumable.part_path(upload_id))
@@ -0,0 +1,54 @@
+# app/utils/text_align.py：转写文本与题干逐词对齐
+
+# tests/test_text_align.py
+
+from app.utils.text_align import compare, normalize_words
+
+
+def _ops(result):
+    return [(w["op"], w["expected"], w["actual"]) for w in result["words"]]
+
+
+def test_exact_match():
+    result = compare("I like apples", "I like apples")
+    assert [op for op, _, _ in _ops(result)] == ["equal"] * 3
+    assert result["summary"] == {"expected_words": 3, "correct": 3, "replaced": 0, "missing": 0,
+                                 "extra": 0, "word_error_rate": 0.0}
+
+
+def test_substitution():
+    result = compare("I like apples", "I love apples")
+    assert _ops(result) == [("equal", "i", "i"), ("replace", "like", "love"), ("equal", "apples", "apples")]
+    assert result["summary"]["replaced"] == 1
+    assert result["summary"]["word_error_rate"] == 0.3333
+
+
+def test_insertion():
+    result = compare("I like apples", "I really like apples")
+    assert ("insert", None, "really") in _ops(result)
+    assert result["summary"]["extra"] == 1 and result["summary"]["correct"] == 3
+
+
+def test_deletion():
+    result = compare("I like green apples", "I like apples")
+    assert _ops(result)[2] == ("delete", "green", None)
+    assert result["summary"]["missing"] == 1 and result["summary"]["correct"] == 3
+
+
+def test_punctuation_case_and_hyphens_are_normalized():
+    assert normalize_words("Don’t STOP, well-known! 42.") == ["don't", "stop", "well", "known", "42"]
+    result = compare("Don't stop believing.", "don’t Stop believing")
+    assert result["summary"]["correct"] == 3
+
+
+def test_empty_transcript_misses_every_word():
+    result = compare("I like apples", "")
+    assert [op for op, _, _ in _ops(result)] == ["delete"] * 3
+    assert result["summary"]["word_error_rate"] == 1.0
+
+
+def test_empty_expected_text():
+    assert compare("", "")["summary"]["word_error_rate"] == 0.0
+    result = compare("...", "hello")
+    assert _ops(result) == [("insert", None, "hello")]
+    assert result["summary"]["word_error_rate"] == 1.0
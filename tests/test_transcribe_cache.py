@@ -0,0 +1,110 @@
+# app/utils/transcribe_cache.py：转写缓存的键、两级命中与档位选择
+
+# tests/test_transcribe_cache.py
+
+import io
+from collections import OrderedDict
+
+import fakeredis
+import numpy as np
+import pytest
+from flask import Flask
+
+import app.extensions as ext
+from app.models import Question, Topic
+from app.utils import transcribe_cache, whisper_client
+from app.utils.audio import pcm16_to_wav, to_pcm16
+from tests.test_vad import clip
+
+SAMPLES = np.linspace(-0.5, 0.5, 16000, dtype=np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fresh_local(monkeypatch):
+    monkeypatch.setattr(transcribe_cache, "_local", OrderedDict())
+
+
+@pytest.fixture
+def app_context(monkeypatch):
+    monkeypatch.setattr(ext, "redis_client", fakeredis.FakeRedis(decode_responses=True))
+    app = Flask(__name__)
+    app.config.update(WHISPER_BACKEND="local", WHISPER_MODEL="base", TRANSCRIBE_CACHE_LOCAL_ENTRIES=0)
+    with app.app_context():
+        yield app
+
+
+def _result(model="base", text="hello world"):
+    return {"text": text, "language": "en", "model": model}
+
+
+def test_hit_requires_same_audio_language_and_prompt(app_context):
+    digest = transcribe_cache.audio_digest(SAMPLES)
+    assert transcribe_cache.get(digest, "en", "Hello world.") is None
+    transcribe_cache.put(digest, _result(), "en", "Hello world.")
+    assert transcribe_cache.get(digest, "en", "Hello world.") == _result()
+    assert transcribe_cache.get(digest, "en", "Another question.") is None
+    assert transcribe_cache.get(digest, None, None) is None
+    assert transcribe_cache.get(transcribe_cache.audio_digest(SAMPLES[1:]), "en", "Hello world.") is None
+    stats = transcribe_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 4, 1)
+
+
+def test_digest_ignores_dtype_and_layout():
+    assert transcribe_cache.audio_digest(SAMPLES) == transcribe_cache.audio_digest(SAMPLES.astype(np.float64))
+    assert transcribe_cache.audio_digest(SAMPLES[::2]) == transcribe_cache.audio_digest(SAMPLES[::2].copy())
+
+
+def test_local_lru_serves_repeats(app_context):
+    app_context.config["TRANSCRIBE_CACHE_LOCAL_ENTRIES"] = 2
+    digests = [transcribe_cache.audio_digest(SAMPLES * k) for k in (0.1, 0.2, 0.3)]
+    for d in digests:
+        transcribe_cache.put(d, _result())
+    assert len(transcribe_cache._local) == 2
+    assert transcribe_cache.get(digests[2]) == _result()
+    assert transcribe_cache.get(digests[0]) == _result()        # 已被挤出 LRU，从 Redis 取回
+    stats = transcribe_cache.stats()
+    assert (stats["local_hits"], stats["hits"]) == (1, 1)
+
+
+def test_prefers_most_accurate_tier(app_context):
+    app_context.config.update(WHISPER_BACKEND="server", WHISPER_MODEL_TIERS="small:1,base:2,tiny")
+    digest = transcribe_cache.audio_digest(SAMPLES)
+    transcribe_cache.put(digest, _result("tiny", "hello word"))
+    transcribe_cache.put(digest, _result("base"))
+    assert transcribe_cache.get(digest)["model"] == "base"
+
+
+def test_result_without_model_is_not_cached(app_context):
+    digest = transcribe_cache.audio_digest(SAMPLES)
+    transcribe_cache.put(digest, {"text": "x"})
+    assert transcribe_cache.get(digest) is None
+
+
+def test_endpoint_caches_per_question(flask_app, monkeypatch):
+    topic = Topic(name="t")
+    ext.db.session.add(topic)
+    ext.db.session.flush()
+    ext.db.session.add_all([Question(question_id="q1", text="Hello world.", topic_id=topic.topic_id),
+                            Question(question_id="q2", text="Good morning.", topic_id=topic.topic_id)])
+    ext.db.session.commit()
+    flask_app.config.update(WHISPER_BACKEND="local", WHISPER_MODEL="base")
+
+    calls = []
+
+    def transcribe(samples, language=None, initial_prompt=None):
+        calls.append(initial_prompt)
+        return _result()
+
+    monkeypatch.setattr(whisper_client, "transcribe", transcribe)
+    wav    = pcm16_to_wav(to_pcm16(clip(0.5, 1.0, 0.5, noise_db=-60, speech_db=-20)))
+    client = flask_app.test_client()
+
+    def post(qid):
+        rv = client.post("/api/evaluate/transcribe",
+                         data={"question_id": qid, "file": (io.BytesIO(wav), "a.wav")})
+        return rv.get_json()["data"]
+
+    assert post("q1")["cached"] is False
+    assert post("q1")["cached"] is True
+    assert post("q2")["cached"] is False
+    assert calls == ["Hello world.", "Good morning."]
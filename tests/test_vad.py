@@ -0,0 +1,75 @@
+# app/utils/vad.py：噪声 + 语音段的阈值与裁剪边界
+
+# tests/test_vad.py
+
+import numpy as np
+import pytest
+
+from app.utils import vad
+
+RATE = 16000
+
+
+def noise(seconds, level_db, seed=0):
+    """RMS 为 level_db dBFS 的高斯噪声"""
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * RATE)) * 10 ** (level_db / 20)).astype(np.float32)
+
+
+def tone(seconds, level_db, freq=220.0):
+    """RMS 为 level_db dBFS 的正弦（代替语音段）"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (np.sqrt(2) * 10 ** (level_db / 20) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def clip(lead, speech, tail, noise_db, speech_db):
+    """lead 秒噪声 + speech 秒（语音 + 噪声）+ tail 秒噪声"""
+    total = noise(lead + speech + tail, noise_db)
+    start = int(lead * RATE)
+    total[start:start + int(speech * RATE)] += tone(speech, speech_db)
+    return total
+
+
+FRAME = vad.FRAME_MS / 1000
+PAD   = vad.PADDING_MS / 1000
+
+
+@pytest.mark.parametrize("noise_db", [-50, -45, -40])
+@pytest.mark.parametrize("speech_db", [-20, -15])
+def test_trims_noise_around_speech(noise_db, speech_db):
+    span = vad.detect(clip(1.0, 1.5, 1.0, noise_db, speech_db))
+    assert span.start / RATE == pytest.approx(1.0 - PAD, abs=FRAME)
+    assert span.end / RATE == pytest.approx(2.5 + PAD, abs=FRAME)
+    assert span.speech_seconds == pytest.approx(1.5, abs=2 * FRAME)
+    assert span.total_seconds == pytest.approx(3.5)
+
+
+def test_threshold_stays_above_noise_floor():
+    energy = vad.frame_energy_db(clip(1.0, 1.0, 1.0, -40, -25), RATE * vad.FRAME_MS // 1000)
+    voiced = vad.speech_frames(energy)
+    assert voiced[:30].sum() == 0 and voiced[-30:].sum() == 0
+
+
+@pytest.mark.parametrize("level_db", [-60, -40, -25])
+def test_noise_only_has_no_speech(level_db):
+    samples = noise(3.0, level_db)
+    span = vad.detect(samples)
+    assert span.speech_seconds == 0.0
+    assert (span.start, span.end) == (0, len(samples))
+
+
+def test_digital_silence_has_no_speech():
+    assert vad.detect(np.zeros(RATE, dtype=np.float32)).speech_seconds == 0.0
+
+
+def test_quiet_speech_over_silence_is_detected():
+    span = vad.detect(clip(0.5, 1.0, 0.5, -90, -50))
+    assert span.speech_seconds == pytest.approx(1.0, abs=2 * FRAME)
+
+
+def test_trim_pcm16_matches_float_span():
+    samples = clip(1.0, 1.0, 1.0, -45, -20)
+    pcm = (samples * 32767).astype('<i2').tobytes()
+    trimmed, span = vad.trim_pcm16(pcm)
+    assert len(trimmed) == (span.end - span.start) * 2
+    assert span.start / RATE == pytest.approx(1.0 - PAD, abs=FRAME)
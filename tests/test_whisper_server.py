@@ -0,0 +1,165 @@
+# app/utils/whisper_server.py：微批处理与档位调度
+
+# tests/test_whisper_server.py
+
+import asyncio
+import numpy as np
+import pytest
+
+from app.utils import whisper_server
+from app.utils.whisper_server import MicroBatcher, TieredScheduler
+
+INF = float("inf")
+
+
+@pytest.fixture(autouse=True)
+def fake_inference(monkeypatch):
+    """不加载 whisper：按批返回固定文本，并记录每批大小"""
+    batches = []
+
+    def infer_with(self, model, jobs):
+        batches.append(len(jobs))
+        return [{'text': f"{model}:{len(job.samples)}", 'language': job.language} for job in jobs]
+
+    monkeypatch.setattr(MicroBatcher, "_infer_with", infer_with)
+    monkeypatch.setattr(whisper_server, "_set_threads", lambda threads: None)
+    return batches
+
+
+def _samples(n=1600):
+    return np.zeros(n, dtype=np.float32)
+
+
+async def _with_scheduler(scheduler, coro):
+    runner = asyncio.ensure_future(scheduler.run())
+    try:
+        return await coro
+    finally:
+        runner.cancel()
+        scheduler.tiers[0][2].executor.shutdown(wait=False)
+
+
+def test_idle_tier_does_not_hold_shared_worker():
+    """三个档位共享一个 worker：被路由到非首档的连续请求不能被空闲档位饿死"""
+    async def scenario():
+        scheduler = TieredScheduler([("small", "small", 0.5), ("base", "base", 5.0), ("tiny", "tiny", INF)],
+                                    window=0.001, workers=1)
+        scheduler.tiers[0][2].avg_batch_seconds = 10.0      # small 预计太慢 → 选 base
+
+        async def sequential():
+            return [await asyncio.wait_for(scheduler.submit(_samples(), language="en"), 2) for _ in range(3)]
+
+        return await _with_scheduler(scheduler, sequential())
+
+    results = asyncio.run(scenario())
+    assert [r['model'] for r in results] == ["base"] * 3
+    assert results[0]['text'] == "base:1600"
+
+
+def test_two_tiers_share_one_worker_concurrently():
+    """两个档位共享一个 worker，同时有请求时都能完成，且同时推理的批次不超过 worker 数"""
+    async def scenario():
+        scheduler = TieredScheduler([("base", "base", 5.0), ("tiny", "tiny", INF)],
+                                    window=0.001, workers=1)
+        base, tiny = scheduler.tiers[0][2], scheduler.tiers[1][2]
+        peak = {"busy": 0}
+        original = MicroBatcher._process
+
+        async def tracked(self, batch):
+            peak["busy"] = max(peak["busy"], base.busy + tiny.busy + 1)
+            await original(self, batch)
+
+        MicroBatcher._process = tracked
+        try:
+            jobs = [base.submit(_samples(), "en") for _ in range(3)] + \
+                   [tiny.submit(_samples(), "en") for _ in range(3)]
+            results = await _with_scheduler(scheduler, asyncio.wait_for(asyncio.gather(*jobs), 2))
+        finally:
+            MicroBatcher._process = original
+        return results, peak["busy"]
+
+    results, peak = asyncio.run(scenario())
+    assert [r['text'] for r in results] == ["base:1600"] * 3 + ["tiny:1600"] * 3
+    assert peak == 1
+
+
+def test_requests_arriving_while_busy_join_next_batch(fake_inference):
+    async def scenario():
+        batcher = MicroBatcher("m", max_batch=8, window=0.05, workers=1)
+        runner  = asyncio.ensure_future(batcher.run())
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(_samples(), "en") for _ in range(5))), 2)
+        finally:
+            runner.cancel()
+            batcher.executor.shutdown(wait=False)
+
+    results = asyncio.run(scenario())
+    assert len(results) == 5
+    assert fake_inference == [5]
+
+
+def test_overloaded_when_estimate_exceeds_budget():
+    async def scenario():
+        batcher = MicroBatcher("m", max_batch=1, latency_budget=1.0)
+        batcher.avg_batch_seconds = 2.0
+        try:
+            await batcher.submit(_samples())
+        finally:
+            batcher.executor.shutdown(wait=False)
+
+    with pytest.raises(whisper_server.Overloaded) as exc:
+        asyncio.run(scenario())
+    assert exc.value.retry_after >= 1
+
+
+def test_expired_job_is_dropped():
+    async def scenario():
+        batcher = MicroBatcher("m", window=0.001)
+        runner  = asyncio.ensure_future(batcher.run())
+        try:
+            return await asyncio.wait_for(batcher.submit(_samples(), timeout=1e-9), 2)
+        finally:
+            runner.cancel()
+            batcher.executor.shutdown(wait=False)
+
+    with pytest.raises(whisper_server.DeadlineExceeded):
+        asyncio.run(scenario())
+
+
+def _transcribe_request():
+    samples = _samples()
+    return whisper_server.pack({"op": "transcribe", "language": "en"}, samples.astype('<f4').tobytes())
+
+
+def test_disconnected_client_job_is_skipped(fake_inference):
+    """排队期间客户端断开：请求被取消，调度开始后不再推理"""
+    async def scenario():
+        scheduler = TieredScheduler([("tiny", "tiny", INF)], window=0.001)
+        server    = await asyncio.start_server(whisper_server.WhisperServer(scheduler).handle, "127.0.0.1", 0)
+        port      = server.sockets[0].getsockname()[1]
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(_transcribe_request())
+            await writer.drain()
+            await asyncio.sleep(0.05)               # 已入队，调度尚未启动
+            writer.close()
+            await asyncio.sleep(0.05)
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(_transcribe_request())
+            await writer.drain()
+
+            async def read_response():
+                json_len, _ = whisper_server.HEADER.unpack(await reader.readexactly(whisper_server.HEADER.size))
+                return await reader.readexactly(json_len)
+
+            response = await _with_scheduler(scheduler, asyncio.wait_for(read_response(), 2))
+            writer.close()
+            return response
+        finally:
+            server.close()
+
+    response = asyncio.run(scenario())
+    assert b"tiny:1600" in response
+    assert fake_inference == [1]
@@ -0,0 +1,52 @@
+# app/utils/xunfei.py：build_payload 的编码与回退
+
+# tests/test_xunfei_payload.py
+
+import base64
+import json
+
+from app.utils import speex, xunfei
+from app.utils.xunfei import build_payload, CHUNK_SIZE, PCM_BYTES_PER_SECOND
+
+PCM = bytes(range(256)) * 125          # 1 秒 16kHz 16 位单声道
+
+
+def _audio(frame: str) -> bytes:
+    return base64.b64decode(json.loads(frame)["data"]["data"])
+
+
+def test_raw_payload():
+    payload = build_payload(PCM, "raw")
+    assert payload.params["aue"] == "raw"
+    assert payload.duration == 1.0
+    assert payload.frame_seconds == CHUNK_SIZE / PCM_BYTES_PER_SECOND
+    assert b"".join(_audio(f) for f in payload.frames) == PCM
+    assert json.loads(payload.frames[0])["business"]["aus"] == 1
+    assert json.loads(payload.frames[1])["business"]["aus"] == 2
+
+
+def test_speex_payload(monkeypatch):
+    frames = [bytes([i]) * 60 for i in range(50)]       # 50 帧 × 20ms
+    monkeypatch.setattr(speex, "encode_wb", lambda pcm, quality: frames)
+    payload = build_payload(PCM, "speex-wb")
+    assert payload.params["aue"] == f"speex-wb;{xunfei.SPEEX_QUALITY}"
+    assert payload.frame_seconds == 2 * speex.FRAME_SECONDS
+    assert _audio(payload.frames[0]) == bytes([60]) + frames[0] + bytes([60]) + frames[1]
+    assert payload.audio_bytes == 50 * 61
+
+
+def test_falls_back_to_raw_when_encoder_fails(monkeypatch):
+    def fail(pcm, quality):
+        raise speex.SpeexEncodeError("no libspeex")
+
+    monkeypatch.setattr(speex, "encode_wb", fail)
+    payload = build_payload(PCM, "speex-wb")
+    assert payload.params["aue"] == "raw"
+    assert b"".join(_audio(f) for f in payload.frames) == PCM
+
+
+def test_falls_back_to_raw_when_frame_too_long(monkeypatch):
+    monkeypatch.setattr(speex, "encode_wb", lambda pcm, quality: [b"x" * 300])
+    payload = build_payload(PCM, "speex-wb")
+    assert payload.params["aue"] == "raw"
+    assert payload.audio_bytes == len(PCM)
@@ -0,0 +1,106 @@
+# app/utils/xunfei_pool.py：平滑加权轮询、冷却与故障转移
+
+# tests/test_xunfei_pool.py
+
+import asyncio
+from types import SimpleNamespace
+from collections import Counter
+
+import pytest
+
+from app.utils import xunfei_async, xunfei_pool
+from app.utils.xunfei_pool import Credential, CredentialPool
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(xunfei_pool, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _pool(*weights, **kwargs):
+    return CredentialPool([Credential(f"app{i}", "k", "s", weight=w) for i, w in enumerate(weights)],
+                          **kwargs)
+
+
+def test_smooth_weighted_round_robin(clock):
+    pool  = _pool(5, 1, 1)
+    picks = []
+    for _ in range(7):
+        cred = pool.acquire()
+        picks.append(cred.appid)
+        pool.release(cred, ok=True)
+    assert Counter(picks) == {"app0": 5, "app1": 1, "app2": 1}
+    assert picks == ["app0", "app0", "app1", "app0", "app2", "app0", "app0"]
+
+
+def test_quota_error_cools_down(clock):
+    pool = _pool(1, 1, quota_cooldown=60)
+    cred = pool.acquire()
+    pool.release(cred, ok=False, error_code=11203)
+    assert all(pool.acquire() is not cred for _ in range(4))
+    clock[0] += 60
+    assert cred in {pool.acquire() for _ in range(2)}
+
+
+def test_repeated_failures_cool_down(clock):
+    pool = _pool(1, failure_cooldown=15)
+    cred = pool.credentials[0]
+    for _ in range(xunfei_pool.FAILURE_THRESHOLD - 1):
+        pool.release(pool.acquire(), ok=False)
+    assert cred.healthy(clock[0])
+    pool.release(pool.acquire(), ok=False)
+    assert not cred.healthy(clock[0])
+    assert pool.acquire() is cred               # 全部冷却时仍有去处
+
+
+def test_cancelled_release_is_neutral(clock):
+    pool = _pool(1)
+    cred = pool.acquire()
+    pool.release(cred, ok=None)
+    assert (cred.in_flight, cred.failures, cred.failures_total) == (0, 0, 0)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    pool = _pool(1, 1)
+    monkeypatch.setattr(xunfei_async, "get_pool", lambda: pool)
+    return pool
+
+
+def test_failover_to_next_credential_on_quota(session, monkeypatch):
+    async def run(payload, text, cred):
+        return (None, 11203) if cred is session.credentials[0] else ("xml", None)
+
+    monkeypatch.setattr(xunfei_async, "_run_session", run)
+    session.credentials[0].current_weight = 10      # 先选中 app0
+    assert asyncio.run(xunfei_async._evaluate_with_failover(None, "t", 5)) == ("xml", None)
+    assert session.credentials[0].failures == 1 and session.credentials[1].failures == 0
+
+
+def test_hedge_loser_is_not_a_credential_failure(session, monkeypatch):
+    async def run(payload, text, cred):
+        await asyncio.sleep(60)
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(xunfei_async._evaluate_with_failover(None, "t", 30))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(xunfei_async, "_run_session", run)
+    asyncio.run(cancel_soon())
+    assert [(c.in_flight, c.failures) for c in session.credentials] == [(0, 0), (0, 0)]
+
+
+def test_session_timeout_is_a_credential_failure(session, monkeypatch):
+    async def run(payload, text, cred):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(xunfei_async, "_run_session", run)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(xunfei_async._evaluate_with_failover(None, "t", 0.01))
+    assert sum(c.failures for c in session.credentials) == 1
+    assert sum(c.in_flight for c in session.credentials) == 0